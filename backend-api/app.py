@@ -0,0 +1,292 @@
+import asyncio
+import json
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import List
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+import settings
+from batcher import MicroBatcher, QueueFullError
+from cache import ResponseCache, cache_key, model_version
+from windowing import assemble_fix, prepare_windows  # model-training/windowing.py
+
+
+class FixRequest(BaseModel):
+    code: str = Field(..., min_length=1, max_length=settings.MAX_CODE_CHARS, description="Buggy code")
+
+
+class FileFixRequest(BaseModel):
+    code: str = Field(..., min_length=1, max_length=settings.MAX_FILE_CHARS, description="Whole Java file")
+    lines: List[int] = Field(..., min_length=1, description="Cursor/edited lines (1-based)")
+    path: str = Field("file.java", description="File path for the patch header")
+
+
+class SimilarRequest(BaseModel):
+    code: str = Field(..., min_length=1, max_length=settings.MAX_CODE_CHARS, description="Buggy code")
+    k: int = Field(settings.config.RETRIEVAL_TOP_K, ge=1, le=settings.MAX_SIMILAR_RESULTS)
+
+
+class FixResponse(BaseModel):
+    fixed_code: str
+    latency_ms: float
+    cached: bool = False
+
+
+def load_evaluator(model_path=settings.MODEL_PATH):
+    """Load the trained model for serving"""
+    from evaluate import ModelEvaluator
+
+    if not model_path.exists():
+        raise FileNotFoundError(f"Model not found at {model_path}. Train the model first.")
+    return ModelEvaluator(str(model_path))
+
+
+def load_retrieval_index(index_dir=settings.RETRIEVAL_INDEX_DIR):
+    """Open the historical fix index, or None if it hasn't been built"""
+    from retrieval import RetrievalIndex
+
+    if not (index_dir / "meta.json").exists():
+        print(f"⚠️  No retrieval index at {index_dir} (build it with model-training/retrieval.py build)")
+        return None
+    try:
+        index = RetrievalIndex(index_dir)
+    except ValueError as e:
+        print(f"⚠️  {e}")
+        return None
+    index.search("warm up", k=1)  # Page in the band keys before the first real query
+    return index
+
+
+def create_app(evaluator=None, cache=None):
+    """
+    Build the inference service
+    Args:
+        evaluator: Already-loaded ModelEvaluator, or None to load it in the background on startup
+        cache: ResponseCache to use, or None for one built from settings (if CACHE_ENABLED)
+    Returns: FastAPI app
+    """
+    if cache is None and settings.CACHE_ENABLED:
+        cache = ResponseCache()
+
+    state = {"evaluator": None, "batcher": None, "load_error": None,
+             "cache": cache, "model_version": None, "retrieval": None,
+             "streams": {"active": 0, "completed": 0, "cancelled": 0}}
+
+    def set_evaluator(loaded):
+        state["evaluator"] = loaded
+        state["model_version"] = model_version(loaded)
+        state["batcher"].generate_batch = loaded.generate_fixes
+
+    async def load_in_background():
+        try:
+            loaded = await asyncio.to_thread(load_evaluator)
+        except Exception as e:
+            state["load_error"] = str(e)
+            print(f"❌ Failed to load model: {e}")
+            return
+        set_evaluator(loaded)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        state["batcher"] = MicroBatcher(None)
+        state["batcher"].start()
+
+        loader = None
+        state["retrieval"] = await asyncio.to_thread(load_retrieval_index)
+
+        if evaluator is not None:
+            set_evaluator(evaluator)
+        else:
+            # Serve /health while the model loads; /ready reports when it's done
+            loader = asyncio.create_task(load_in_background())
+
+        yield
+
+        if loader is not None:
+            loader.cancel()
+        await state["batcher"].stop()
+        if state["cache"] is not None:
+            state["cache"].close()
+
+    app = FastAPI(title="Bug Fix Recommender", lifespan=lifespan)
+
+    def is_ready():
+        return state["evaluator"] is not None and state["batcher"].generate_batch is not None
+
+    async def suggest(code):
+        """
+        Fix for one snippet through the response cache and the micro-batcher
+        Returns: Tuple of (fixed code, cache source: "hit", "coalesced" or "miss")
+        """
+        cache = state["cache"]
+        if cache is None:
+            return await state["batcher"].submit(code), "miss"
+
+        key = cache_key(code, state["model_version"], state["evaluator"].generation_policy.to_dict())
+        return await cache.get_or_compute(key, code, lambda: state["batcher"].submit(code))
+
+    @app.get("/health")
+    async def health():
+        """Liveness: the process is up and serving requests"""
+        return {"status": "ok"}
+
+    @app.get("/ready")
+    async def ready():
+        """Readiness: the model is loaded and the queue has room"""
+        batcher = state["batcher"]
+        body = {
+            "ready": is_ready(),
+            "queue_depth": batcher.queue_depth(),
+            "max_queue_size": batcher.max_queue_size,
+            "stats": batcher.stats,
+        }
+        if state["load_error"]:
+            body["error"] = state["load_error"]
+        if not is_ready() or batcher.queue_depth() >= batcher.max_queue_size:
+            return JSONResponse(status_code=503, content=body)
+        return body
+
+    @app.post("/fix", response_model=FixResponse)
+    async def fix(request: FixRequest):
+        """Suggest a fix for a buggy code snippet"""
+        if not is_ready():
+            raise HTTPException(status_code=503, detail="Model is not loaded yet")
+
+        start = time.perf_counter()
+        try:
+            fixed_code, source = await suggest(request.code)
+        except QueueFullError as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+        return FixResponse(fixed_code=fixed_code, latency_ms=(time.perf_counter() - start) * 1000,
+                           cached=source != "miss")
+
+    @app.post("/fix/file")
+    async def fix_file(request: FileFixRequest):
+        """
+        Suggest a fix for a whole file, regenerating only the methods (or line
+        windows) around the cursor/edited lines; returns a unified diff
+        """
+        if not is_ready():
+            raise HTTPException(status_code=503, detail="Model is not loaded yet")
+
+        start = time.perf_counter()
+        target_lines = [line - 1 for line in request.lines]
+        windows, texts, fitting = await asyncio.to_thread(
+            prepare_windows, state["evaluator"].tokenizer, request.code, target_lines
+        )
+        if len(windows) > settings.MAX_FILE_WINDOWS:
+            raise HTTPException(status_code=422,
+                                detail=f"Lines span {len(windows)} windows (max {settings.MAX_FILE_WINDOWS})")
+
+        # Windows go through the batcher together, so they share one generate() call
+        try:
+            generated = await asyncio.gather(*(
+                suggest(text) for text, ok in zip(texts, fitting) if ok
+            ))
+        except QueueFullError as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+        result = assemble_fix(request.code, windows, texts, fitting,
+                              [fixed_code for fixed_code, _ in generated], request.path)
+        result["latency_ms"] = (time.perf_counter() - start) * 1000
+        return result
+
+    @app.post("/fix/stream")
+    async def fix_stream(request: FixRequest, http_request: Request):
+        """
+        Stream a greedy fix as server-sent events:
+        "token" events with text as it is generated, then one "done" event with
+        the full fixed code (or an "error" event). Generation stops when the
+        client disconnects.
+        """
+        if not is_ready():
+            raise HTTPException(status_code=503, detail="Model is not loaded yet")
+        streams = state["streams"]
+        if streams["active"] >= settings.MAX_CONCURRENT_STREAMS:
+            raise HTTPException(status_code=503, detail="Too many streams in progress",
+                                headers={"Retry-After": "1"})
+        # Counted at admission (no await before this), so concurrent requests
+        # can't all pass the check before any of them starts streaming
+        streams["active"] += 1
+        released = []
+
+        def release(finished):
+            if not released:
+                released.append(True)
+                streams["active"] -= 1
+                streams["completed" if finished else "cancelled"] += 1
+
+        evaluator = state["evaluator"]
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+        cancel_event = threading.Event()
+
+        def send(kind, data):
+            loop.call_soon_threadsafe(events.put_nowait, (kind, data))
+
+        def generate():
+            chunks = []
+            outcome = {}
+            try:
+                for text in evaluator.stream_fix(request.code, cancel_event, outcome):
+                    chunks.append(text)
+                    send("token", {"text": text})
+                fixed_code = evaluator.to_fixed_code(request.code, "".join(chunks), outcome.get("complete", True))
+                send("done", {"fixed_code": fixed_code})
+            except Exception as e:
+                send("error", {"detail": str(e)})
+
+        async def event_stream():
+            finished = False
+            threading.Thread(target=generate, name="stream", daemon=True).start()
+            try:
+                while True:
+                    if await http_request.is_disconnected():
+                        break
+                    kind, data = await events.get()
+                    yield f"event: {kind}\ndata: {json.dumps(data)}\n\n"
+                    if kind != "token":
+                        finished = True
+                        break
+            finally:
+                # Also reached when the server cancels the response on disconnect
+                cancel_event.set()
+                release(finished)
+
+        body = event_stream()
+        # Releases the slot if the response is dropped before streaming starts
+        weakref.finalize(body, release, False)
+        return StreamingResponse(body, media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache"})
+
+    @app.post("/similar")
+    async def similar(request: SimilarRequest):
+        """Most similar historical bugs with their fixes (no model involved)"""
+        index = state["retrieval"]
+        if index is None:
+            raise HTTPException(status_code=503, detail="Retrieval index has not been built")
+
+        start = time.perf_counter()
+        results = index.search(request.code, k=request.k)
+        return {"results": results, "latency_ms": (time.perf_counter() - start) * 1000}
+
+    @app.get("/metrics")
+    async def metrics():
+        """Batching counters and current queue depth"""
+        batcher = state["batcher"]
+        return {
+            "queue_depth": batcher.queue_depth(),
+            "max_queue_size": batcher.max_queue_size,
+            "max_batch_size": batcher.max_batch_size,
+            "mean_batch_size": batcher.stats["batched_requests"] / batcher.stats["batches"] if batcher.stats["batches"] else 0.0,
+            **batcher.stats,
+            "cache": state["cache"].metrics() if state["cache"] is not None else None,
+            "streams": state["streams"],
+        }
+
+    app.state.service = state
+    return app
@@ -0,0 +1,129 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+import settings
+
+
+class QueueFullError(Exception):
+    """Raised when the request queue is at capacity (backpressure)"""
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent fix requests into batched generate calls
+    Requests wait up to max_wait_ms for others to arrive, then up to
+    max_batch_size of them run as one batch on a dedicated worker thread
+    so generation never blocks the event loop.
+    """
+    def __init__(self, generate_batch,
+                 max_batch_size=settings.MAX_BATCH_SIZE,
+                 max_wait_ms=settings.MAX_WAIT_MS,
+                 max_queue_size=settings.MAX_QUEUE_SIZE):
+        """
+        Args:
+            generate_batch: Function taking a list of inputs and returning a list of outputs
+            max_batch_size: Max requests per batch
+            max_wait_ms: Max time to wait for a batch to fill up
+            max_queue_size: Max requests waiting (submit raises QueueFullError beyond it)
+        """
+        self.generate_batch = generate_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue_size = max_queue_size
+
+        self.queue = None
+        self.worker = None
+        # Requests taken off the queue whose results are not set yet
+        self.current_batch = []
+        # One thread: batches run one after another, each using all intra-op threads
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="generate")
+
+        self.stats = {"requests": 0, "batches": 0, "batched_requests": 0, "rejected": 0, "failed": 0}
+
+    def start(self):
+        """Start the batching loop (call from a running event loop)"""
+        self.queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self.worker = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Stop the batching loop and fail the batch in progress and anything still queued"""
+        if self.worker is not None:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except asyncio.CancelledError:
+                pass
+
+        pending = list(self.current_batch)
+        self.current_batch = []
+        while self.queue is not None and not self.queue.empty():
+            pending.append(self.queue.get_nowait())
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("Server shutting down"))
+        self.executor.shutdown(wait=False)
+
+    def queue_depth(self):
+        """Requests currently waiting"""
+        return self.queue.qsize() if self.queue is not None else 0
+
+    async def submit(self, item):
+        """
+        Queue one request and wait for its result
+        Raises: QueueFullError if the queue is at capacity
+        """
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((item, future))
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            raise QueueFullError(f"Request queue is full ({self.max_queue_size} waiting)")
+
+        self.stats["requests"] += 1
+        return await future
+
+    async def next_batch(self):
+        """Wait for a request, then gather more until the batch is full or max_wait passes"""
+        # Kept on self so stop() can fail requests taken off the queue
+        self.current_batch = batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        # Drop requests whose callers already went away
+        self.current_batch = [(item, future) for item, future in batch if not future.done()]
+        return self.current_batch
+
+    async def run(self):
+        """Batching loop"""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = await self.next_batch()
+            if not batch:
+                continue
+
+            items = [item for item, _ in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, self.generate_batch, items)
+            except Exception as e:
+                self.stats["failed"] += len(batch)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                self.current_batch = []
+                continue
+
+            self.stats["batches"] += 1
+            self.stats["batched_requests"] += len(batch)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+            self.current_batch = []
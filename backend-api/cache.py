@@ -0,0 +1,265 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+import settings
+from code_text import normalize_code  # shared/code_text.py
+from edit_script import apply_edit_script, make_edit_script, parse_edit_script  # model-training/edit_script.py
+
+# Files whose contents identify a trained model
+MODEL_VERSION_FILES = ["config.json", "model.safetensors", "pytorch_model.bin",
+                       "adapter_model.safetensors", "adapter_model.bin"]
+# Exported graphs (encoder/decoder/decoder_with_past) and their external weights
+MODEL_VERSION_PATTERNS = ["*.onnx", "*.onnx_data"]
+
+# Bumped when the stored entry layout changes, so old disk entries never match
+CACHE_FORMAT = 2
+
+
+def model_version(evaluator):
+    """
+    Identify the loaded model: its weight files plus how it is run
+    Args:
+        evaluator: ModelEvaluator
+    Returns: Short hex digest
+    """
+    digest = hashlib.sha256()
+    model_path = Path(evaluator.model_path)
+    paths = [model_path / name for name in MODEL_VERSION_FILES]
+    for pattern in MODEL_VERSION_PATTERNS:
+        paths.extend(sorted(model_path.glob(pattern)))
+    for path in paths:
+        if path.exists():
+            stat = path.stat()
+            digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    digest.update(f"{evaluator.backend}:{evaluator.quantize}".encode())
+    return digest.hexdigest()[:16]
+
+
+def reuse_fix(source, fixed, code):
+    """
+    Carry a cached fix over to code that only differs from its source in
+    comments and whitespace (same cache key)
+    The source -> fixed edit script is applied to the caller's own code, so
+    their comments and formatting outside the fix are kept. It is only reused
+    when every line the fix replaces (and the lines around an insertion) is
+    identical in both, so the edit lands on the same code.
+    Args:
+        source: Code the cached fix was generated for
+        fixed: Cached fixed code
+        code: Code of the current request
+    Returns: Fixed code for the request, or None if the fix can't be carried over
+    """
+    if code == source:
+        return fixed
+
+    source_lines = source.split('\n')
+    code_lines = code.split('\n')
+    if len(source_lines) != len(code_lines):
+        return None
+
+    script = make_edit_script(source, fixed)
+    for start, count, _ in parse_edit_script(script):
+        first, last = (start, start + count) if count else (max(start - 1, 0), start + 1)
+        if source_lines[first:last] != code_lines[first:last]:
+            return None
+
+    return apply_edit_script(code, script)
+
+
+def cache_key(code, version, generation_settings):
+    """
+    Cache key for one request
+    Args:
+        code: Buggy code as submitted
+        version: model_version() of the serving model
+        generation_settings: GenerationPolicy.to_dict()
+    Returns: Hex digest
+    """
+    payload = json.dumps({
+        "format": CACHE_FORMAT,
+        "code": normalize_code(code),
+        "model": version,
+        "generation": generation_settings,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class DiskCache:
+    """
+    SQLite tier behind the in-memory cache (survives restarts)
+    """
+    def __init__(self, path, ttl_seconds):
+        """
+        Args:
+            path: SQLite database file
+            ttl_seconds: Entries older than this are ignored and pruned
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl_seconds
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT, created REAL)"
+        )
+        self.connection.commit()
+        self.prune()
+
+    def get(self, key):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return row[0], row[1]
+
+    def set(self, key, value, created):
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created) VALUES (?, ?, ?)",
+                (key, value, created)
+            )
+            self.connection.commit()
+
+    def prune(self):
+        """Delete expired entries"""
+        with self.lock:
+            self.connection.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+            self.connection.commit()
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+class ResponseCache:
+    """
+    Fix suggestions keyed by normalized input, model version and generation settings
+    Each entry keeps the code it was generated for, so a fix is only handed to
+    a different caller after reuse_fix() has carried it over to their code.
+    In-memory LRU with TTL, an optional SQLite tier, and single-flight: concurrent
+    requests for the same key wait on one generation instead of starting their own.
+    """
+    def __init__(self, max_entries=settings.CACHE_MAX_ENTRIES,
+                 ttl_seconds=settings.CACHE_TTL_SECONDS,
+                 disk_path=settings.CACHE_DISK_PATH):
+        """
+        Args:
+            max_entries: In-memory entries kept (least recently used evicted first)
+            ttl_seconds: Entry lifetime
+            disk_path: SQLite file for the disk tier, or None for memory only
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.entries = OrderedDict()  # key -> (entry, created); entry = {"source", "fixed"}
+        self.in_flight = {}           # key -> future shared by concurrent requests
+        self.disk = DiskCache(disk_path, ttl_seconds) if disk_path else None
+
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0,
+                      "unverified": 0, "evictions": 0, "expired": 0}
+
+    def lookup(self, key):
+        """
+        Cached entry, memory first, then disk
+        Returns: Tuple of (entry dictionary, "hits" or "disk_hits"), or (None, None)
+        """
+        cached = self.entries.get(key)
+        if cached is not None:
+            entry, created = cached
+            if time.time() - created <= self.ttl:
+                self.entries.move_to_end(key)
+                return entry, "hits"
+            del self.entries[key]
+            self.stats["expired"] += 1
+
+        if self.disk is not None:
+            cached = self.disk.get(key)
+            if cached is not None:
+                value, created = cached
+                entry = json.loads(value)
+                self.store_in_memory(key, entry, created)
+                return entry, "disk_hits"
+
+        return None, None
+
+    def store_in_memory(self, key, entry, created):
+        self.entries[key] = (entry, created)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    async def get_or_compute(self, key, code, compute):
+        """
+        Return the cached fix for key, or await compute() once for all concurrent callers
+        Cached fixes are carried over to the caller's own code with reuse_fix();
+        when that isn't possible the fix is generated for this code instead.
+        Args:
+            key: cache_key() of the request
+            code: Buggy code as submitted
+            compute: Coroutine function producing the fixed code
+        Returns: Tuple of (fixed code, source) where source is "hit", "coalesced" or "miss"
+        """
+        entry, tier = self.lookup(key)
+        if entry is not None:
+            fixed = reuse_fix(entry["source"], entry["fixed"], code)
+            if fixed is not None:
+                self.stats[tier] += 1
+                return fixed, "hit"
+            self.stats["unverified"] += 1
+            return (await self.fill(key, code, compute))["fixed"], "miss"
+
+        if key in self.in_flight:
+            entry = await asyncio.shield(self.in_flight[key])
+            fixed = reuse_fix(entry["source"], entry["fixed"], code)
+            if fixed is not None:
+                self.stats["coalesced"] += 1
+                return fixed, "coalesced"
+            self.stats["unverified"] += 1
+            return (await self.fill(key, code, compute))["fixed"], "miss"
+
+        self.stats["misses"] += 1
+        task = asyncio.ensure_future(self.fill(key, code, compute))
+        self.in_flight[key] = task
+
+        def finished(task):
+            self.in_flight.pop(key, None)
+            # Retrieve the error so it isn't logged as never retrieved when
+            # every caller has gone away (each caller awaits it through shield)
+            if not task.cancelled():
+                task.exception()
+
+        task.add_done_callback(finished)
+        # shield: one caller disconnecting must not cancel the shared generation
+        return (await asyncio.shield(task))["fixed"], "miss"
+
+    async def fill(self, key, code, compute):
+        """Compute a fix and store it (runs even if the requesting caller goes away)"""
+        entry = {"source": code, "fixed": await compute()}
+        created = time.time()
+        self.store_in_memory(key, entry, created)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, json.dumps(entry), created)
+        return entry
+
+    def metrics(self):
+        """Counters plus hit rate and size"""
+        lookups = self.stats["hits"] + self.stats["disk_hits"] + self.stats["misses"] + self.stats["coalesced"]
+        served = self.stats["hits"] + self.stats["disk_hits"] + self.stats["coalesced"]
+        return {
+            **self.stats,
+            "hit_rate": served / lookups if lookups else 0.0,
+            "entries": len(self.entries),
+            "in_flight": len(self.in_flight),
+            "disk": str(self.disk.path) if self.disk is not None else None,
+        }
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
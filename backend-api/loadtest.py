@@ -0,0 +1,284 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+import settings
+from benchmark import percentile  # model-training/benchmark.py
+
+config = settings.config
+
+
+def load_snippets(data_file=config.TEST_FILE, limit=None):
+    """Buggy code inputs to replay"""
+    with open(data_file, 'r', encoding='utf-8') as f:
+        snippets = [item['input'] for item in json.load(f)]
+    return snippets[:limit] if limit else snippets
+
+
+class HttpTarget:
+    """
+    Sends snippets to a running service (POST /fix)
+    Requests are async, so every scheduled arrival gets its own task and the
+    client never has to wait for a free worker thread before sending
+    """
+    def __init__(self, url, max_connections, timeout):
+        """
+        Args:
+            url: Base URL of the service, e.g. http://127.0.0.1:8000
+            max_connections: Max open connections (None: no limit)
+            timeout: Per-request timeout in seconds
+        """
+        import httpx
+
+        self.url = url.rstrip('/')
+        self.client = httpx.AsyncClient(
+            base_url=self.url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+        self.name = f"http {self.url}"
+
+    async def request(self, code):
+        """One request; returns None on success or an error label"""
+        import httpx
+
+        try:
+            response = await self.client.post("/fix", json={"code": code})
+        except httpx.TimeoutException:
+            return "timeout"
+        except httpx.TransportError:
+            return "connection_error"
+        if response.status_code != 200:
+            return f"http_{response.status_code}"
+        return None
+
+    async def server_metrics(self):
+        """The service's /metrics (batching and cache counters), if reachable"""
+        try:
+            return (await self.client.get("/metrics")).json()
+        except Exception:
+            return None
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class InProcessTarget:
+    """
+    Calls ModelEvaluator.generate_fix directly
+    One model, one worker thread: concurrent requests queue up exactly as
+    they would in front of a single unbatched model
+    """
+    def __init__(self, evaluator):
+        self.evaluator = evaluator
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="generate")
+        self.name = f"in-process {evaluator.model_path}"
+
+    def send(self, code):
+        try:
+            self.evaluator.generate_fix(code)
+        except Exception as e:
+            return type(e).__name__
+        return None
+
+    async def request(self, code):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.send, code)
+
+    async def server_metrics(self):
+        return None
+
+    async def close(self):
+        self.executor.shutdown(wait=False)
+
+
+async def timed_request(target, code, scheduled, results):
+    """
+    Send one request and record (latency from scheduled start, error, send lag)
+    Latency counts from when the request was due, not when it was sent, so
+    queueing anywhere, including in this client, can't hide (coordinated omission);
+    send lag is how late the client itself was in sending it
+    """
+    send_lag = time.perf_counter() - scheduled
+    error = await target.request(code)
+    results.append((time.perf_counter() - scheduled, error, send_lag))
+
+
+async def run_open_loop(target, snippets, rate, duration, seed=42):
+    """
+    Poisson arrivals at a fixed rate, independent of how fast responses come back
+    Args:
+        target: HttpTarget or InProcessTarget
+        snippets: Inputs to replay (cycled)
+        rate: Mean requests per second
+        duration: Seconds to keep sending
+    Returns: List of (latency seconds, error, send lag seconds) tuples
+    """
+    rng = random.Random(seed)
+    results, tasks = [], []
+    start = time.perf_counter()
+    next_send = start
+    i = 0
+
+    while next_send - start < duration:
+        delay = next_send - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(
+            timed_request(target, snippets[i % len(snippets)], next_send, results)
+        ))
+        i += 1
+        next_send += rng.expovariate(rate)
+
+    await asyncio.gather(*tasks)
+    return results
+
+
+async def run_closed_loop(target, snippets, concurrency, duration):
+    """
+    Fixed number of users, each sending its next request when the last one returns
+    Args:
+        target: HttpTarget or InProcessTarget
+        snippets: Inputs to replay (cycled)
+        concurrency: Simultaneous users
+        duration: Seconds to keep sending
+    Returns: List of (latency seconds, error, send lag seconds) tuples
+    """
+    results = []
+    deadline = time.perf_counter() + duration
+    counter = iter(range(10 ** 12))
+
+    async def user():
+        while time.perf_counter() < deadline:
+            i = next(counter)
+            await timed_request(target, snippets[i % len(snippets)], time.perf_counter(), results)
+
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    return results
+
+
+def summarize(results, elapsed):
+    """
+    Throughput, latency percentiles and error rate of a run
+    Latency percentiles cover successful requests only
+    """
+    latencies = [latency * 1000 for latency, error, _ in results if error is None]
+    errors = Counter(error for _, error, _ in results if error is not None)
+    send_lags = [send_lag * 1000 for _, _, send_lag in results]
+
+    return {
+        "requests": len(results),
+        "successes": len(latencies),
+        "errors": sum(errors.values()),
+        "error_rate": sum(errors.values()) / len(results) if results else 0.0,
+        "errors_by_type": dict(errors),
+        "elapsed_s": elapsed,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "mean_latency_ms": sum(latencies) / len(latencies) if latencies else 0.0,
+        "p50_latency_ms": percentile(latencies, 50),
+        "p90_latency_ms": percentile(latencies, 90),
+        "p99_latency_ms": percentile(latencies, 99),
+        "max_latency_ms": max(latencies) if latencies else 0.0,
+        "p99_send_lag_ms": percentile(send_lags, 99),
+    }
+
+
+def print_summary(report):
+    """Print a load test report"""
+    summary = report["summary"]
+    profile = report["profile"]
+
+    print("\n" + "="*60)
+    print("LOAD TEST RESULTS")
+    print("="*60)
+    print(f"\nTarget: {report['target']}")
+    if profile["mode"] == "open":
+        print(f"Profile: open loop, {profile['rate']} req/s for {profile['duration']}s")
+    else:
+        print(f"Profile: closed loop, {profile['concurrency']} users for {profile['duration']}s")
+
+    print(f"\nRequests: {summary['requests']} ({summary['successes']} ok, {summary['errors']} failed, "
+          f"{summary['error_rate'] * 100:.1f}% errors)")
+    for error, count in summary["errors_by_type"].items():
+        print(f"  {error}: {count}")
+    print(f"Throughput: {summary['throughput_rps']:.2f} req/s")
+    print(f"Latency: p50 {summary['p50_latency_ms']:.0f}ms, p90 {summary['p90_latency_ms']:.0f}ms, "
+          f"p99 {summary['p99_latency_ms']:.0f}ms, max {summary['max_latency_ms']:.0f}ms")
+    print(f"Client send lag: p99 {summary['p99_send_lag_ms']:.0f}ms (time past schedule before sending)")
+
+
+async def run_load_test(target, snippets, mode, rate, concurrency, duration):
+    """Run one profile and build the report"""
+    print(f"\nWarming up ({target.name})...")
+    await target.request(snippets[0])
+
+    print(f"Running {mode}-loop load for {duration}s...")
+    start = time.perf_counter()
+    if mode == "open":
+        results = await run_open_loop(target, snippets, rate, duration)
+    else:
+        results = await run_closed_loop(target, snippets, concurrency, duration)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
+        "target": target.name,
+        "profile": {"mode": mode, "rate": rate, "concurrency": concurrency,
+                    "duration": duration, "snippets": len(snippets)},
+        "summary": summarize(results, elapsed),
+        "server_metrics": await target.server_metrics(),
+    }
+
+
+async def run_and_close(target, *args):
+    """run_load_test, then close the target on the same event loop"""
+    try:
+        return await run_load_test(target, *args)
+    finally:
+        await target.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the fix suggestion path")
+    parser.add_argument("--url", default=f"http://{settings.HOST}:{settings.PORT}",
+                        help="Service to test (ignored with --in-process)")
+    parser.add_argument("--in-process", action="store_true",
+                        help="Call ModelEvaluator.generate_fix directly instead of HTTP")
+    parser.add_argument("--mode", choices=["open", "closed"], default="closed")
+    parser.add_argument("--rate", type=float, default=2.0, help="Open loop: requests per second")
+    parser.add_argument("--concurrency", type=int, default=4, help="Closed loop: simultaneous users")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load")
+    parser.add_argument("--samples", type=int, default=None, help="Use only the first N test snippets")
+    parser.add_argument("--timeout", type=float, default=120.0, help="HTTP request timeout (seconds)")
+    parser.add_argument("--label", default=None, help="Name of this run (e.g. 'int8+cache')")
+    parser.add_argument("--output", default=None, help="JSON report file")
+    args = parser.parse_args()
+
+    snippets = load_snippets(limit=args.samples)
+
+    if args.in_process:
+        from app import load_evaluator
+        target = InProcessTarget(load_evaluator())
+    else:
+        # Open loop: no connection cap, every arrival is sent when it is due
+        max_connections = args.concurrency if args.mode == "closed" else None
+        target = HttpTarget(args.url, max_connections, args.timeout)
+
+    report = asyncio.run(run_and_close(
+        target, snippets, args.mode, args.rate, args.concurrency, args.duration
+    ))
+
+    report["label"] = args.label
+    print_summary(report)
+
+    output_file = Path(args.output) if args.output else (
+        config.MODEL_OUTPUT_DIR / "loadtests" / f"loadtest_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, 'w') as f:
+        json.dump(report, indent=2, fp=f)
+    print(f"\n📁 Report saved to: {output_file}")
@@ -0,0 +1,25 @@
+import argparse
+import uvicorn
+import settings
+from app import create_app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve bug fix suggestions over HTTP")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes; more than 1 loads the model once and forks (Linux/macOS)")
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        from prefork import serve
+        serve(num_workers=args.workers)
+    else:
+        print("="*60)
+        print("BUG FIX RECOMMENDER API")
+        print("="*60)
+        print(f"Model: {settings.MODEL_PATH}")
+        print(f"Batching: up to {settings.MAX_BATCH_SIZE} requests, {settings.MAX_WAIT_MS:.0f}ms wait, "
+              f"{settings.MAX_QUEUE_SIZE} queued max")
+
+        # One process: the model is loaded once and shared by all requests
+        uvicorn.run(create_app(), host=settings.HOST, port=settings.PORT, workers=1)
@@ -0,0 +1,273 @@
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import settings
+
+
+def read_memory(pid):
+    """
+    Memory of one process from /proc/<pid>/smaps_rollup (Linux)
+    Returns: Dictionary of rss/pss/uss in MB, or None if unavailable
+    USS (private pages) is what the process costs on its own; shared
+    copy-on-write model weights only show up in RSS and (split) in PSS.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", 'r') as f:
+            fields = {}
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                    fields[parts[0][:-1]] = int(parts[1]) / 1024  # kB -> MB
+    except OSError:
+        return None
+
+    return {
+        "rss_mb": fields.get("Rss", 0.0),
+        "pss_mb": fields.get("Pss", 0.0),
+        "uss_mb": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+    }
+
+
+def print_memory_report(parent_pid, worker_pids):
+    """Print RSS/PSS/USS of the parent and every worker"""
+    print("\n" + "="*60)
+    print("MEMORY PER PROCESS")
+    print("="*60)
+    print(f"{'Process':<16} {'PID':>8} {'RSS MB':>10} {'PSS MB':>10} {'USS MB':>10}")
+
+    total_pss = 0.0
+    for name, pid in [("parent", parent_pid)] + [(f"worker {i}", pid) for i, pid in worker_pids.items()]:
+        memory = read_memory(pid)
+        if memory is None:
+            print(f"{name:<16} {pid:>8}   (no /proc/{pid}/smaps_rollup)")
+            continue
+        total_pss += memory["pss_mb"]
+        print(f"{name:<16} {pid:>8} {memory['rss_mb']:>10.0f} {memory['pss_mb']:>10.0f} {memory['uss_mb']:>10.0f}")
+
+    print(f"\nTotal PSS (actual RAM used by the server): {total_pss:.0f} MB")
+
+
+def cpu_assignment(num_workers, threads_per_worker):
+    """
+    CPUs each worker is pinned to
+    Returns: List of CPU sets (None entries mean no pinning: not enough CPUs or no affinity API)
+    """
+    if not hasattr(os, "sched_getaffinity"):
+        return [None] * num_workers
+
+    cpus = sorted(os.sched_getaffinity(0))
+    if len(cpus) < num_workers * threads_per_worker:
+        return [None] * num_workers
+    return [set(cpus[i * threads_per_worker:(i + 1) * threads_per_worker]) for i in range(num_workers)]
+
+
+class RestartBackoff:
+    """
+    Restart delays per worker slot
+    A worker that exits within fast_failure seconds of starting failed fast:
+    each consecutive fast failure doubles the slot's delay, and after
+    max_fast_failures the supervisor gives up. A worker that stayed up longer
+    resets its slot and is restarted immediately.
+    """
+    def __init__(self, base_delay=settings.WORKER_RESTART_BACKOFF,
+                 max_delay=settings.WORKER_MAX_RESTART_BACKOFF,
+                 fast_failure=settings.WORKER_FAST_FAILURE,
+                 max_fast_failures=settings.WORKER_MAX_FAST_FAILURES):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.fast_failure = fast_failure
+        self.max_fast_failures = max_fast_failures
+        self.fast_failures = {}  # index -> consecutive fast failures
+
+    def record_exit(self, index, uptime):
+        """
+        Args:
+            index: Worker slot
+            uptime: Seconds the worker ran
+        Returns: Seconds to wait before restarting the slot, or None to give up
+        """
+        if uptime >= self.fast_failure:
+            self.fast_failures[index] = 0
+            return 0.0
+
+        failures = self.fast_failures.get(index, 0) + 1
+        self.fast_failures[index] = failures
+        if failures >= self.max_fast_failures:
+            return None
+        return min(self.base_delay * 2 ** (failures - 1), self.max_delay)
+
+
+def listen_socket(host, port):
+    """Bound listening socket shared by all workers (the kernel spreads accepted connections)"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(index, evaluator, sock, threads, cpus):
+    """
+    Body of a forked worker: pin threads/CPUs and serve on the inherited socket
+    Never returns
+    """
+    import torch
+    import uvicorn
+    from app import create_app
+
+    torch.set_num_threads(threads)
+    if cpus is not None:
+        os.sched_setaffinity(0, cpus)
+
+    # Restore default signal handling; uvicorn installs its own shutdown handlers
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+
+    print(f"  Worker {index} (pid {os.getpid()}): {threads} threads"
+          + (f", CPUs {sorted(cpus)}" if cpus is not None else ""))
+
+    server = uvicorn.Server(uvicorn.Config(create_app(evaluator), log_level="warning"))
+    server.run(sockets=[sock])
+    os._exit(0)
+
+
+def serve(num_workers=settings.NUM_WORKERS, threads_per_worker=settings.THREADS_PER_WORKER,
+          host=settings.HOST, port=settings.PORT):
+    """
+    Load the model once, then fork workers that share its weights copy-on-write
+    Loading can itself run parallel ops (e.g. int8 quantization), and an OpenMP
+    pool started before fork() is unusable in the children. The parent therefore
+    loads with a single intra-op thread, and each worker only sets its own
+    thread count after the fork.
+    Args:
+        num_workers: Worker processes
+        threads_per_worker: Intra-op threads per worker (torch.set_num_threads)
+        host, port: Address to listen on
+    """
+    print("="*60)
+    print("BUG FIX RECOMMENDER API (PRE-FORK)")
+    print("="*60)
+
+    if not hasattr(os, "fork"):
+        print("❌ Pre-fork serving needs os.fork() (Linux/macOS). Use main.py without --workers.")
+        return
+
+    import torch
+    from app import load_evaluator
+
+    # Single-threaded in the parent so no intra-op thread pool exists at fork()
+    torch.set_num_threads(1)
+    evaluator = load_evaluator()
+    if evaluator.backend == "onnx":
+        # ONNX Runtime sessions own thread pools that are not fork-safe
+        print("❌ Pre-fork serving supports the PyTorch backend only")
+        return
+
+    # Freeze everything loaded so far: the collector no longer writes to these
+    # objects' headers, so their pages stay shared after fork()
+    gc.collect()
+    gc.freeze()
+
+    sock = listen_socket(host, port)
+    cpu_sets = cpu_assignment(num_workers, threads_per_worker)
+    print(f"\nListening on http://{host}:{port} with {num_workers} workers")
+
+    workers = {}  # index -> pid
+    started_at = {}  # index -> monotonic start time
+    restarts = {}  # index -> monotonic time the slot is due to restart
+    backoff = RestartBackoff()
+
+    def spawn(index):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(index, evaluator, sock, threads_per_worker, cpu_sets[index])
+            finally:
+                os._exit(1)
+        workers[index] = pid
+        started_at[index] = time.monotonic()
+
+    for index in range(num_workers):
+        spawn(index)
+
+    stopping = False
+    failed = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        restarts.clear()
+        for pid in workers.values():
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: print_memory_report(os.getpid(), workers))
+
+    report_at = time.monotonic() + settings.MEMORY_REPORT_DELAY
+
+    # Supervise: restart workers that die (backing off while they keep failing
+    # fast), report memory once they're warm
+    while workers or restarts:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG) if workers else (0, 0)
+        except ChildProcessError:
+            break
+
+        if pid == 0:
+            now = time.monotonic()
+            for index, due in list(restarts.items()):
+                if now >= due:
+                    del restarts[index]
+                    spawn(index)
+            if report_at is not None and now >= report_at:
+                print_memory_report(os.getpid(), workers)
+                report_at = None
+            time.sleep(0.5)
+            continue
+
+        index = next((i for i, p in workers.items() if p == pid), None)
+        if index is None:
+            continue
+        del workers[index]
+        if stopping:
+            continue
+
+        uptime = time.monotonic() - started_at[index]
+        delay = backoff.record_exit(index, uptime)
+        if delay is None:
+            print(f"❌ Worker {index} (pid {pid}) exited with status {status} "
+                  f"{backoff.max_fast_failures} times in a row within {backoff.fast_failure:.0f}s "
+                  f"of starting, shutting down")
+            failed = True
+            stop(None, None)
+            continue
+        print(f"⚠️  Worker {index} (pid {pid}) exited with status {status} after {uptime:.1f}s, "
+              f"restarting" + (f" in {delay:.1f}s" if delay else ""))
+        restarts[index] = time.monotonic() + delay
+
+    sock.close()
+    if failed:
+        sys.exit(1)
+    print("✅ All workers stopped")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-fork multi-worker serving")
+    parser.add_argument("--workers", type=int, default=settings.NUM_WORKERS)
+    parser.add_argument("--threads", type=int, default=settings.THREADS_PER_WORKER,
+                        help="Intra-op threads per worker")
+    args = parser.parse_args()
+
+    serve(num_workers=args.workers, threads_per_worker=args.threads)
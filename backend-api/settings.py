@@ -0,0 +1,53 @@
+import os
+import sys
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Get project root directory (one level up from backend-api/)
+PROJECT_ROOT = Path(__file__).parent.parent
+load_dotenv(PROJECT_ROOT / '.env')
+
+# The service reuses ModelEvaluator and config from model-training/
+MODEL_TRAINING_DIR = PROJECT_ROOT / "model-training"
+sys.path.insert(0, str(MODEL_TRAINING_DIR))
+
+import config  # noqa: E402  (model-training/config.py)
+
+# Model
+MODEL_PATH = Path(os.getenv('MODEL_PATH', config.MODEL_OUTPUT_DIR / "final"))
+
+# Server
+HOST = os.getenv('HOST', "127.0.0.1")
+PORT = int(os.getenv('PORT', 8000))
+
+# Micro-batching
+MAX_BATCH_SIZE = int(os.getenv('MAX_BATCH_SIZE', 8))       # Requests per generate() call
+MAX_WAIT_MS = float(os.getenv('MAX_WAIT_MS', 10))          # Wait for more requests before running a batch
+MAX_QUEUE_SIZE = int(os.getenv('MAX_QUEUE_SIZE', 64))      # Reject with 503 beyond this many waiting requests
+
+# Requests
+MAX_CODE_CHARS = 20000   # Reject larger snippets (the model only reads MAX_INPUT_LENGTH tokens)
+MAX_FILE_CHARS = 2000000  # Whole files for /fix/file (only windows around the edited lines are generated)
+MAX_FILE_WINDOWS = 8      # Windows regenerated per /fix/file request
+
+# Response cache
+CACHE_ENABLED = os.getenv('CACHE_ENABLED', "1") == "1"
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 1024))
+CACHE_TTL_SECONDS = float(os.getenv('CACHE_TTL_SECONDS', 24 * 3600))
+CACHE_DISK_PATH = os.getenv('CACHE_DISK_PATH') or None   # e.g. models/response_cache.sqlite
+
+# Similar historical fixes
+RETRIEVAL_INDEX_DIR = Path(os.getenv('RETRIEVAL_INDEX_DIR', config.RETRIEVAL_INDEX_DIR))
+MAX_SIMILAR_RESULTS = 20
+
+# Streaming
+MAX_CONCURRENT_STREAMS = int(os.getenv('MAX_CONCURRENT_STREAMS', 2))  # Each stream runs its own generate()
+
+# Pre-fork serving (prefork.py / main.py --workers)
+THREADS_PER_WORKER = int(os.getenv('THREADS_PER_WORKER', 2))   # torch intra-op threads per worker
+NUM_WORKERS = int(os.getenv('NUM_WORKERS', max(1, (os.cpu_count() or 1) // THREADS_PER_WORKER)))
+MEMORY_REPORT_DELAY = 10   # Seconds after startup before printing per-worker memory
+WORKER_RESTART_BACKOFF = 1.0      # Seconds before restarting a worker after its first fast failure (doubles after each)
+WORKER_MAX_RESTART_BACKOFF = 60.0  # Cap on the restart delay
+WORKER_FAST_FAILURE = 10.0        # A worker that exits within this many seconds of starting failed fast
+WORKER_MAX_FAST_FAILURES = 5      # Consecutive fast failures of one worker before the server gives up
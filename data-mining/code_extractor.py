@@ -130,5 +130,13 @@ class CodeExtractor:
 
 
 if __name__ == "__main__":
-    extractor = CodeExtractor()
-    extractor.process_bug_fixes()
\ No newline at end of file
+    import argparse
+    from profiler import add_profile_argument, profiled
+    
+    parser = argparse.ArgumentParser(description="Extract buggy/fixed code pairs from bug fix commits")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    
+    with profiled("code_extractor", args, config.PROFILE_DIR):
+        extractor = CodeExtractor()
+        extractor.process_bug_fixes()
\ No newline at end of file
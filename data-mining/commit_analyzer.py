@@ -114,5 +114,13 @@ class CommitAnalyzer:
 
 
 if __name__ == "__main__":
-    analyzer = CommitAnalyzer()
-    analyzer.run()
\ No newline at end of file
+    import argparse
+    from profiler import add_profile_argument, profiled
+    
+    parser = argparse.ArgumentParser(description="Find bug fix commits in the cloned repositories")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    
+    with profiled("commit_analyzer", args, config.PROFILE_DIR):
+        analyzer = CommitAnalyzer()
+        analyzer.run()
\ No newline at end of file
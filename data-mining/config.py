@@ -1,4 +1,5 @@
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -6,6 +7,9 @@ from dotenv import load_dotenv
 PROJECT_ROOT = Path(__file__).parent.parent
 load_dotenv(PROJECT_ROOT / '.env')
 
+# Helpers shared by all stages (shared/profiler.py)
+sys.path.append(str(PROJECT_ROOT / "shared"))
+
 # GitHub API
 GITHUB_TOKEN = os.getenv('GITHUB_TOKEN')
 if not GITHUB_TOKEN:
@@ -21,6 +25,7 @@ BUG_FIX_KEYWORDS = ["fix", "bug", "issue", "error", "crash", "patch"]
 DATA_DIR = PROJECT_ROOT / "data"
 REPOS_DIR = DATA_DIR / "repos"
 PROCESSED_DATA_DIR = DATA_DIR / "processed"
+PROFILE_DIR = DATA_DIR / "profiles"  # Collapsed-stack profiles (--profile)
 
 # File filters (only analyze Java files)
 FILE_EXTENSIONS = [".java"]
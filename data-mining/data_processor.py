@@ -2,6 +2,23 @@ import json
 import random
 from pathlib import Path
 import config
+from code_text import sample_key  # shared/code_text.py
+
+
+def split_name(item, train_ratio=0.8, val_ratio=0.1):
+    """
+    Split of a sample, from a hash of its key
+    The same pair lands in the same split every time the data is re-mined, so
+    samples an incremental run already trained on never move into val/test.
+    Returns: "train", "validation" or "test"
+    """
+    bucket = int(sample_key(item)[:8], 16) / 0x100000000
+    if bucket < train_ratio:
+        return "train"
+    if bucket < train_ratio + val_ratio:
+        return "validation"
+    return "test"
+
 
 class DataProcessor:
     def __init__(self):
@@ -79,18 +96,19 @@ class DataProcessor:
         
         print(f"After cleaning: {len(processed_data)} valid pairs")
         
-        # Shuffle data
+        # Shuffle data (order only; split membership comes from the sample key)
         random.seed(42)
         random.shuffle(processed_data)
         
         # Split into train/val/test (80/10/10)
         total = len(processed_data)
-        train_size = int(0.8 * total)
-        val_size = int(0.1 * total)
+        splits = {"train": [], "validation": [], "test": []}
+        for item in processed_data:
+            splits[split_name(item)].append(item)
         
-        train_data = processed_data[:train_size]
-        val_data = processed_data[train_size:train_size + val_size]
-        test_data = processed_data[train_size + val_size:]
+        train_data = splits["train"]
+        val_data = splits["validation"]
+        test_data = splits["test"]
         
         print(f"\nDataset split:")
         print(f"  Train: {len(train_data)} samples")
@@ -98,14 +116,8 @@ class DataProcessor:
         print(f"  Test: {len(test_data)} samples")
         
         # Save splits
-        splits = {
-            "train": train_data,
-            "validation": val_data,
-            "test": test_data
-        }
-        
-        for split_name, split_data in splits.items():
-            output_file = self.processed_dir / f"{split_name}.json"
+        for name, split_data in splits.items():
+            output_file = self.processed_dir / f"{name}.json"
             with open(output_file, 'w', encoding='utf-8') as f:
                 json.dump(split_data, indent=2, fp=f, ensure_ascii=False)
             print(f"  Saved: {output_file}")
@@ -133,5 +145,13 @@ class DataProcessor:
 
 
 if __name__ == "__main__":
-    processor = DataProcessor()
-    processor.prepare_dataset()
\ No newline at end of file
+    import argparse
+    from profiler import add_profile_argument, profiled
+    
+    parser = argparse.ArgumentParser(description="Clean and split the extracted code pairs")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    
+    with profiled("data_processor", args, config.PROFILE_DIR):
+        processor = DataProcessor()
+        processor.prepare_dataset()
\ No newline at end of file
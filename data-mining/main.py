@@ -1,14 +1,21 @@
+import argparse
 import sys
 from repo_finder import RepoFinder
 from repo_cloner import RepoCloner
 from commit_analyzer import CommitAnalyzer
 from code_extractor import CodeExtractor
 from data_processor import DataProcessor
+import config
+from profiler import add_profile_argument, profiled
 
 def main():
     """
     Run the complete data mining pipeline
     """
+    parser = argparse.ArgumentParser(description="Run the complete data mining pipeline")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    
     print("\n" + "="*60)
     print("BUG FIX DATA MINING PIPELINE")
     print("="*60)
@@ -30,28 +37,33 @@ def main():
     try:
         # Step 1: Find repositories
         print("\n[STEP 1/5] Finding repositories...")
-        finder = RepoFinder()
-        finder.run()
+        with profiled("repo_finder", args, config.PROFILE_DIR):
+            finder = RepoFinder()
+            finder.run()
         
         # Step 2: Clone repositories
         print("\n[STEP 2/5] Cloning repositories...")
-        cloner = RepoCloner()
-        cloner.run()
+        with profiled("repo_cloner", args, config.PROFILE_DIR):
+            cloner = RepoCloner()
+            cloner.run()
         
         # Step 3: Analyze commits
         print("\n[STEP 3/5] Analyzing commits...")
-        analyzer = CommitAnalyzer()
-        analyzer.run()
+        with profiled("commit_analyzer", args, config.PROFILE_DIR):
+            analyzer = CommitAnalyzer()
+            analyzer.run()
         
         # Step 4: Extract code
         print("\n[STEP 4/5] Extracting code pairs...")
-        extractor = CodeExtractor()
-        extractor.process_bug_fixes()
+        with profiled("code_extractor", args, config.PROFILE_DIR):
+            extractor = CodeExtractor()
+            extractor.process_bug_fixes()
         
         # Step 5: Process data
         print("\n[STEP 5/5] Processing dataset...")
-        processor = DataProcessor()
-        processor.prepare_dataset()
+        with profiled("data_processor", args, config.PROFILE_DIR):
+            processor = DataProcessor()
+            processor.prepare_dataset()
         
         print("\n" + "="*60)
         print("✅ PIPELINE COMPLETE!")
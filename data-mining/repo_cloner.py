@@ -73,5 +73,13 @@ class RepoCloner:
 
 
 if __name__ == "__main__":
-    cloner = RepoCloner()
-    cloner.run()
\ No newline at end of file
+    import argparse
+    from profiler import add_profile_argument, profiled
+    
+    parser = argparse.ArgumentParser(description="Clone the found repositories")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    
+    with profiled("repo_cloner", args, config.PROFILE_DIR):
+        cloner = RepoCloner()
+        cloner.run()
\ No newline at end of file
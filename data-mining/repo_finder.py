@@ -65,5 +65,13 @@ class RepoFinder:
 
 
 if __name__ == "__main__":
-    finder = RepoFinder()
-    finder.run()
\ No newline at end of file
+    import argparse
+    from profiler import add_profile_argument, profiled
+    
+    parser = argparse.ArgumentParser(description="Find Java repositories on GitHub")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    
+    with profiled("repo_finder", args, config.PROFILE_DIR):
+        finder = RepoFinder()
+        finder.run()
\ No newline at end of file
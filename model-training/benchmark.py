@@ -0,0 +1,163 @@
+import json
+import math
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+# Weight files a model is loaded from (first match of each group counts)
+WEIGHT_FILES = [["model.safetensors", "pytorch_model.bin"], ["*.onnx"], ["*.onnx_data"]]
+
+
+def current_rss_mb():
+    """
+    Resident memory of this process in MB
+    Falls back to peak RSS where /proc is not available
+    """
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * resource.getpagesize() / 1e6
+    except (OSError, IndexError, ValueError):
+        # ru_maxrss is in KB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def saved_weights_mb(model_path):
+    """Size of the weight files in a model directory in MB, or None if there are none"""
+    total, found = 0, False
+    for patterns in WEIGHT_FILES:
+        for pattern in patterns:
+            paths = sorted(Path(model_path).glob(pattern))
+            if paths:
+                total += sum(path.stat().st_size for path in paths)
+                found = True
+                break
+    return total / 1e6 if found else None
+
+
+def model_size_mb(evaluator):
+    """
+    On-disk size of the evaluator's weights in MB
+    Weights that only exist in memory (int8-quantized, merged adapters) are
+    saved to a temporary file and measured there
+    """
+    import torch
+
+    model_path = getattr(evaluator, 'model_path', None)
+    if not getattr(evaluator, 'quantize', False) and model_path is not None:
+        size = saved_weights_mb(model_path)
+        if size is not None:
+            return size
+
+    model = getattr(evaluator, 'model', None)
+    if not isinstance(model, torch.nn.Module):
+        return None
+    with tempfile.TemporaryDirectory() as directory:
+        weights_file = Path(directory) / "weights.pt"
+        torch.save(model.state_dict(), weights_file)
+        return weights_file.stat().st_size / 1e6
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def benchmark_evaluator(evaluator, samples, label):
+    """
+    Run generate_fix over samples and collect latency/quality numbers
+    Args:
+        evaluator: ModelEvaluator (or anything with generate_fix)
+        samples: List of test items with 'input' and 'target'
+        label: Name of this variant in the report
+    Returns: Dictionary of results (predictions included)
+    """
+    print(f"\nBenchmarking '{label}' on {len(samples)} samples...")
+
+    latencies = []
+    predictions = []
+    correct = 0
+
+    for sample in samples:
+        start = time.perf_counter()
+        predicted_fix = evaluator.generate_fix(sample['input'])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        predictions.append(predicted_fix)
+        if predicted_fix.strip() == sample['target'].strip():
+            correct += 1
+
+    return {
+        "label": label,
+        "samples": len(samples),
+        "mean_latency_ms": sum(latencies) / len(latencies) if latencies else 0.0,
+        "p50_latency_ms": percentile(latencies, 50),
+        "p90_latency_ms": percentile(latencies, 90),
+        "exact_match": correct / len(samples) * 100 if samples else 0.0,
+        "model_size_mb": model_size_mb(evaluator),
+        "load_rss_mb": getattr(evaluator, 'load_rss_mb', None),
+        "predictions": predictions
+    }
+
+
+def print_comparison(results):
+    """
+    Print benchmark results side by side, with deltas against the first entry
+    Args:
+        results: List of dictionaries from benchmark_evaluator
+    """
+    baseline = results[0]
+    metrics = [
+        ("mean_latency_ms", "Mean latency (ms)"),
+        ("p50_latency_ms", "p50 latency (ms)"),
+        ("p90_latency_ms", "p90 latency (ms)"),
+        ("exact_match", "Exact match (%)"),
+        ("edit_similarity", "Edit similarity (%)"),
+        ("bleu", "BLEU-4"),
+        ("model_size_mb", "Model size (MB)"),
+        ("load_rss_mb", "RSS on load (MB)"),
+    ]
+
+    print("\n" + "="*60)
+    print("BENCHMARK COMPARISON")
+    print("="*60)
+
+    for result in results:
+        print(f"\n{result['label']} ({result['samples']} samples)")
+        print("-" * 60)
+        for key, name in metrics:
+            value = result.get(key)
+            if value is None:
+                continue
+            line = f"  {name:<20} {value:10.2f}"
+            if result is not baseline and baseline.get(key):
+                delta = value - baseline[key]
+                line += f"  ({delta:+.2f}, {delta / baseline[key] * 100:+.1f}%)"
+            print(line)
+
+    # Outputs that differ from the baseline variant
+    for result in results[1:]:
+        changed = sum(
+            1 for a, b in zip(baseline['predictions'], result['predictions'])
+            if a.strip() != b.strip()
+        )
+        print(f"\n{result['label']}: {changed}/{result['samples']} predictions differ from {baseline['label']}")
+
+    print("\n" + "="*60)
+
+
+def save_report(results, output_file):
+    """Save benchmark results (without predictions) as JSON"""
+    report = [
+        {key: value for key, value in result.items() if key != 'predictions'}
+        for result in results
+    ]
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, 'w') as f:
+        json.dump(report, indent=2, fp=f)
+    print(f"📁 Report saved to: {output_file}")
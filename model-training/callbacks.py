@@ -0,0 +1,188 @@
+import json
+import resource
+import time
+import torch
+from transformers import TrainerCallback
+import config
+from benchmark import percentile
+
+
+class ThroughputCallback(TrainerCallback):
+    """
+    Records training throughput and where step time goes
+    Pass collate() as the Trainer's data_collator so real/padded token counts
+    and dataloader wait can be measured (assumes dataloader_num_workers=0,
+    where batches are built in the training process between steps).
+    Writes one JSON line per logging window and prints a summary at the end.
+    """
+    def __init__(self, data_collator, metrics_file=config.THROUGHPUT_METRICS_FILE):
+        """
+        Args:
+            data_collator: Collator the Trainer would otherwise use
+            metrics_file: JSON lines file for per-window metrics
+        """
+        self.data_collator = data_collator
+        self.metrics_file = metrics_file
+
+        self.tracking = False
+        self.last_compute_end = None
+        self.batch_ready = None
+        self.step_start = None
+
+        self.window = self.new_window()
+        self.totals = self.new_window()
+
+    @staticmethod
+    def new_window():
+        """Empty set of counters for one logging window"""
+        return {
+            "start": time.perf_counter(),
+            "samples": 0,
+            "real_tokens": 0,
+            "padded_tokens": 0,
+            "dataloader_wait": 0.0,
+            "compute": 0.0,
+            "step_times": [],
+        }
+
+    def collate(self, features):
+        """Data collator wrapper: builds the batch and counts its tokens"""
+        batch = self.data_collator(features)
+        now = time.perf_counter()
+
+        if self.tracking:
+            # Time since the model (or the previous fetch) last finished is
+            # spent fetching/tokenizing
+            self.add("dataloader_wait", now - self.idle_since())
+            self.add("samples", len(features))
+
+            for key in ("attention_mask", "labels"):
+                if key not in batch:
+                    continue
+                tensor = batch[key]
+                real = int((tensor != -100).sum()) if key == "labels" else int(tensor.sum())
+                self.add("real_tokens", real)
+                self.add("padded_tokens", tensor.numel() - real)
+
+            self.batch_ready = now
+
+        return batch
+
+    def idle_since(self):
+        """
+        When the training process last finished other work
+        The dataloader may fetch one batch ahead, so the latest batch can be
+        ready before the model finished the previous one
+        """
+        if self.batch_ready is None:
+            return self.last_compute_end
+        return max(self.last_compute_end, self.batch_ready)
+
+    def add(self, key, value):
+        """Add to a counter of both the current window and the whole run"""
+        self.window[key] += value
+        self.totals[key] += value
+
+    @staticmethod
+    def peak_memory_mb():
+        """Peak GPU memory if training on GPU, otherwise peak process RSS"""
+        if torch.cuda.is_available():
+            return torch.cuda.max_memory_allocated() / 1e6
+        # ru_maxrss is in KB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+    def summarize(self, counters):
+        """Derived metrics for a set of counters"""
+        elapsed = max(time.perf_counter() - counters["start"], 1e-9)
+        total_tokens = counters["real_tokens"] + counters["padded_tokens"]
+        step_times = [t * 1000 for t in counters["step_times"]]
+        busy = counters["dataloader_wait"] + counters["compute"]
+
+        return {
+            "elapsed_s": elapsed,
+            "steps": len(step_times),
+            "samples_per_s": counters["samples"] / elapsed,
+            "real_tokens_per_s": counters["real_tokens"] / elapsed,
+            "padded_tokens_per_s": counters["padded_tokens"] / elapsed,
+            "padding_fraction": counters["padded_tokens"] / total_tokens if total_tokens else 0.0,
+            "dataloader_wait_s": counters["dataloader_wait"],
+            "compute_s": counters["compute"],
+            "dataloader_fraction": counters["dataloader_wait"] / busy if busy else 0.0,
+            "step_time_p50_ms": percentile(step_times, 50),
+            "step_time_p90_ms": percentile(step_times, 90),
+            "step_time_p99_ms": percentile(step_times, 99),
+            "peak_memory_mb": self.peak_memory_mb(),
+        }
+
+    def on_train_begin(self, args, state, control, **kwargs):
+        self.metrics_file.parent.mkdir(parents=True, exist_ok=True)
+        self.metrics_file.write_text("")
+
+        self.window = self.new_window()
+        self.totals = self.new_window()
+        self.last_compute_end = time.perf_counter()
+        self.batch_ready = None
+        self.tracking = True
+
+    def on_step_begin(self, args, state, control, **kwargs):
+        # The step starts once the model is idle, i.e. including data loading
+        self.step_start = self.last_compute_end
+
+    def on_substep_end(self, args, state, control, **kwargs):
+        now = time.perf_counter()
+        self.add("compute", now - self.idle_since())
+        self.last_compute_end = now
+
+    def on_step_end(self, args, state, control, **kwargs):
+        now = time.perf_counter()
+        self.add("compute", now - self.idle_since())
+        if self.step_start is not None:
+            step_time = now - self.step_start
+            self.window["step_times"].append(step_time)
+            self.totals["step_times"].append(step_time)
+        self.last_compute_end = now
+
+        # Evaluation batches go through the same collator; don't count them
+        if control.should_evaluate:
+            self.tracking = False
+
+    def on_evaluate(self, args, state, control, **kwargs):
+        self.last_compute_end = time.perf_counter()
+        self.tracking = True
+
+    def on_save(self, args, state, control, **kwargs):
+        # Checkpoint writing is neither data loading nor compute
+        self.last_compute_end = time.perf_counter()
+
+    def on_log(self, args, state, control, logs=None, **kwargs):
+        if not logs or "loss" not in logs:
+            return
+
+        metrics = {"step": state.global_step, "epoch": state.epoch, "loss": logs["loss"]}
+        metrics.update(self.summarize(self.window))
+
+        with open(self.metrics_file, 'a') as f:
+            f.write(json.dumps(metrics) + "\n")
+
+        self.window = self.new_window()
+        self.last_compute_end = time.perf_counter()
+
+    def on_train_end(self, args, state, control, **kwargs):
+        self.tracking = False
+        summary = self.summarize(self.totals)
+
+        print("\n" + "="*60)
+        print("TRAINING THROUGHPUT")
+        print("="*60)
+        print(f"\nSteps: {summary['steps']} in {summary['elapsed_s']:.1f}s")
+        print(f"Samples/s: {summary['samples_per_s']:.2f}")
+        print(f"Tokens/s: {summary['real_tokens_per_s']:.0f} real, "
+              f"{summary['padded_tokens_per_s']:.0f} padding "
+              f"({summary['padding_fraction'] * 100:.1f}% of tokens are padding)")
+        print(f"Dataloader wait: {summary['dataloader_wait_s']:.1f}s "
+              f"({summary['dataloader_fraction'] * 100:.1f}% of step time), "
+              f"forward/backward: {summary['compute_s']:.1f}s")
+        print(f"Step time: p50 {summary['step_time_p50_ms']:.0f}ms, "
+              f"p90 {summary['step_time_p90_ms']:.0f}ms, p99 {summary['step_time_p99_ms']:.0f}ms")
+        print(f"Peak memory: {summary['peak_memory_mb']:.0f} MB")
+        print(f"📁 Per-window metrics: {self.metrics_file}")
@@ -1,8 +1,12 @@
+import sys
 from pathlib import Path
 
 # Get project root
 PROJECT_ROOT = Path(__file__).parent.parent
 
+# Helpers shared by all stages (shared/profiler.py)
+sys.path.append(str(PROJECT_ROOT / "shared"))
+
 # Data paths
 DATA_DIR = PROJECT_ROOT / "data" / "processed"
 TRAIN_FILE = DATA_DIR / "train.json"
@@ -13,23 +17,94 @@ TEST_FILE = DATA_DIR / "test.json"
 MODELS_DIR = PROJECT_ROOT / "models"
 MODELS_DIR.mkdir(exist_ok=True)
 MODEL_OUTPUT_DIR = MODELS_DIR / "bug-fix-model"
+ONNX_OUTPUT_DIR = MODEL_OUTPUT_DIR / "onnx"  # Exported encoder/decoder graphs
+MERGED_MODEL_DIR = MODEL_OUTPUT_DIR / "merged"  # LoRA adapter merged into base weights
 
 # Model configuration
 MODEL_NAME = "Salesforce/codet5-base"  # Pre-trained CodeT5
 MAX_INPUT_LENGTH = 512   # Max tokens for buggy code
 MAX_TARGET_LENGTH = 512  # Max tokens for fixed code
 
+# Target format
+TARGET_FORMAT = "full"        # "full" (whole fixed file) or "edit_script" (line hunks against the input)
+MAX_EDIT_SCRIPT_LENGTH = 128  # Max tokens for edit script targets
+FULL_REWRITE_MODEL_DIR = None  # Full-code model for rejected edit scripts (None: keep the input unchanged)
+
 # Training hyperparameters
 BATCH_SIZE = 4           # Small batch for GPU memory
+GRADIENT_ACCUMULATION_STEPS = 2  # Effective batch size = batch size x accumulation steps
 LEARNING_RATE = 5e-5     # Standard for fine-tuning
 NUM_EPOCHS = 10          # Number of training passes
 WARMUP_STEPS = 100       # Gradual learning rate increase
 SAVE_STEPS = 100         # Save checkpoint every N steps
 EVAL_STEPS = 100         # Evaluate every N steps
 LOGGING_STEPS = 50       # Log metrics every N steps
+THROUGHPUT_METRICS_FILE = MODEL_OUTPUT_DIR / "throughput_metrics.jsonl"  # Per-window throughput
+PROFILE_DIR = MODEL_OUTPUT_DIR / "profiles"  # Collapsed-stack profiles (--profile)
+
+# Parameter-efficient fine-tuning (LoRA)
+USE_LORA = False         # Train low-rank adapters instead of all weights
+LORA_R = 16              # Rank of the adapter matrices
+LORA_ALPHA = 32          # Adapter scaling
+LORA_DROPOUT = 0.05
+LORA_TARGET_MODULES = ["q", "k", "v", "o", "wi", "wo"]  # T5 attention and feed-forward projections
+LORA_BATCH_SIZE = 16     # Frozen base weights leave room for larger batches
 
 # Early stopping
 EARLY_STOPPING_PATIENCE = 3  # Stop if no improvement for 3 evals
 
+# Incremental training (trainer.py --incremental): warm start from the final model
+TRAINED_SAMPLES_FILE = "trained_samples.json"  # Saved in the model dir: keys of samples trained on
+OPTIMIZER_STATE_FILE = "optimizer.pt"          # Saved in the model dir: AdamW state for warm starts
+PREVIOUS_MODEL_DIR = MODEL_OUTPUT_DIR / "final-previous"  # Backup of the model an incremental run replaced
+STAGING_MODEL_DIR = MODEL_OUTPUT_DIR / "final-new"        # New model is saved here, then swapped into final
+INCREMENTAL_REPLAY_RATIO = 1.0   # Already-trained samples replayed per new sample
+INCREMENTAL_EPOCHS = 3
+INCREMENTAL_LEARNING_RATE = 2e-5 # Lower than from-scratch fine-tuning
+INCREMENTAL_EVAL_STEPS = 50      # Evaluate (and checkpoint) more often on small runs
+INCREMENTAL_PATIENCE = 2         # Stop after 2 evals without validation loss improvement
+MIN_NEW_SAMPLES = 1              # Skip the run when fewer new samples than this
+
+# Distillation (distill.py): compact student trained from the final model
+STUDENT_MODEL_NAME = "Salesforce/codet5-small"  # Same tokenizer/vocabulary as codet5-base
+STUDENT_LAYERS = 0           # > 0: student is the teacher cut to this many evenly spaced layers instead
+DISTILLED_MODEL_DIR = MODEL_OUTPUT_DIR / "distilled"
+TEACHER_CACHE_DIR = MODEL_OUTPUT_DIR / "teacher-cache"  # Teacher outputs on the training split
+DISTILL_TARGETS = "teacher"  # Student targets: "teacher" (teacher-generated fixes) or "gold" (dataset fixes)
+DISTILL_TOP_K = 16           # Teacher logits cached per target token
+DISTILL_TEMPERATURE = 2.0    # Softens teacher and student distributions
+DISTILL_ALPHA = 0.5          # Weight of the teacher-logit loss (1 - alpha: cross-entropy on targets)
+DISTILL_EPOCHS = 10
+DISTILL_LEARNING_RATE = 3e-4 # Small pre-trained models take higher rates than codet5-base
+DISTILL_BATCH_SIZE = 16
+TEACHER_BATCH_SIZE = 8       # Batch size of teacher generation and forward passes
+
 # Device
-DEVICE = "cuda"  # Use GPU (you have NVIDIA)
\ No newline at end of file
+DEVICE = "cuda"  # Use GPU (you have NVIDIA)
+
+# Inference
+INFERENCE_BACKEND = "pytorch"  # "pytorch" or "onnx" (ONNX Runtime on CPU)
+QUANTIZE_INT8 = False    # Load int8 dynamically quantized model (CPU only)
+BENCHMARK_SAMPLES = 50   # Test samples used by inference benchmarks
+EVAL_SCORES_FILE = MODEL_OUTPUT_DIR / "eval_scores.jsonl"  # Per-sample evaluation scores
+
+# Generation
+NUM_BEAMS = 5                # Beam search width (1 = greedy fast path)
+MAX_NEW_TOKENS_RATIO = 1.5   # Output budget relative to input token length
+MIN_NEW_TOKENS_BUDGET = 32   # Floor on the output budget for short inputs
+INPUT_END_MATCH_TOKENS = 8   # End a beam once it reproduces the input's last N tokens (0 = off)
+INPUT_END_SLACK_TOKENS = 16  # ...but only once the output is within N tokens of the input's length
+SPECULATIVE_DECODING = False # Greedy decoding with drafts copied from the input
+SPECULATIVE_NGRAM_SIZE = 3   # Longest output suffix matched against the input
+SPECULATIVE_DRAFT_TOKENS = 10  # Max draft tokens verified per decoder pass
+
+# Large files (windowing.py)
+WINDOW_CONTEXT_LINES = 15    # Lines each side of a target line outside any method
+
+# Retrieval of similar historical fixes
+RETRIEVAL_INDEX_DIR = MODELS_DIR / "retrieval-index"
+MINHASH_PERMUTATIONS = 128   # MinHash signature length
+LSH_BANDS = 32               # Bands of 4 rows: pairs above ~0.5 similarity become candidates
+SHINGLE_SIZE = 5             # Tokens per shingle
+RETRIEVAL_TOP_K = 5
+RETRIEVAL_MIN_SIMILARITY = 0.5  # Minimum estimated Jaccard similarity returned
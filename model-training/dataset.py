@@ -1,35 +1,76 @@
 import json
+import random
 import torch
 from torch.utils.data import Dataset
 from transformers import RobertaTokenizer
+from edit_script import make_edit_script, model_input, number_lines, parse_edit_script
 import config
+from code_text import sample_key  # shared/code_text.py
 
 class BugFixDataset(Dataset):
     """
     Dataset for bug fix pairs
     """
-    def __init__(self, data_file, tokenizer, max_input_length, max_target_length):
+    def __init__(self, data_file, tokenizer, max_input_length, max_target_length, target_format="full",
+                 items=None, drop_unlearnable=False):
         """
         Args:
             data_file: Path to JSON file (train/val/test)
             tokenizer: Tokenizer for encoding text
             max_input_length: Max length for input (buggy code)
             max_target_length: Max length for target (fixed code)
+            target_format: "full" (fixed code) or "edit_script" (hunks against the input)
+            items: Samples to use instead of reading data_file (data_file is then only a label)
+            drop_unlearnable: Drop edit-script samples whose script would be truncated or
+                              edits lines past the truncated input (for training splits)
         """
         self.tokenizer = tokenizer
         self.max_input_length = max_input_length
         self.max_target_length = max_target_length
+        self.target_format = target_format
         
         # Load data
-        print(f"Loading data from {data_file}...")
-        with open(data_file, 'r', encoding='utf-8') as f:
-            self.data = json.load(f)
+        if items is not None:
+            self.data = items
+        else:
+            print(f"Loading data from {data_file}...")
+            self.data = load_items(data_file)
+        
+        # Model targets ('target' in the data always stays the full fixed code)
+        if target_format == "edit_script":
+            self.targets = [make_edit_script(item['input'], item['target']) for item in self.data]
+            if drop_unlearnable:
+                kept = [
+                    (item, script) for item, script in zip(self.data, self.targets)
+                    if self.is_learnable(item['input'], script)
+                ]
+                print(f"Dropped {len(self.data) - len(kept)} samples with a truncated edit script "
+                      f"or hunks past the input limit")
+                self.data = [item for item, _ in kept]
+                self.targets = [script for _, script in kept]
+        elif target_format == "full":
+            self.targets = [item['target'] for item in self.data]
+        else:
+            raise ValueError(f"Unknown target format: {target_format}")
         
         print(f"Loaded {len(self.data)} samples")
     
     def __len__(self):
         return len(self.data)
     
+    def is_learnable(self, buggy_code, script):
+        """
+        Whether an edit script fits the target length (EOS included) and only
+        edits lines the model can see after input truncation
+        """
+        if len(self.tokenizer(script)['input_ids']) > self.max_target_length:
+            return False
+        hunks = parse_edit_script(script)
+        if not hunks:
+            return True
+        last_line = max(start + max(count, 1) for start, count, _ in hunks)
+        return last_line <= visible_lines(buggy_code, self.tokenizer, self.max_input_length)
+    
     def __getitem__(self, idx):
         """
         Get a single sample
@@ -37,8 +78,8 @@ class BugFixDataset(Dataset):
         """
         item = self.data[idx]
         
-        buggy_code = item['input']
-        fixed_code = item['target']
+        buggy_code = model_input(item['input'], self.target_format)
+        fixed_code = self.targets[idx]
         
         # Tokenize buggy code (input)
         input_encoding = self.tokenizer(
@@ -69,7 +110,49 @@ class BugFixDataset(Dataset):
         }
 
 
-def load_datasets(tokenizer):
+def visible_lines(code, tokenizer, max_input_length):
+    """Number of complete (numbered) input lines that survive truncation to max_input_length"""
+    input_ids = tokenizer(number_lines(code))['input_ids']
+    if len(input_ids) <= max_input_length:
+        return code.count('\n') + 1
+    # Drop the end-of-sequence token the truncated encoding keeps in its place
+    prefix = tokenizer.decode(input_ids[:max_input_length - 1], skip_special_tokens=True)
+    return prefix.count('\n')
+
+
+def load_items(data_file):
+    """Samples of a processed split file"""
+    with open(data_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def select_incremental(items, trained_keys, replay_ratio=config.INCREMENTAL_REPLAY_RATIO, seed=42):
+    """
+    Samples for an incremental run: everything not trained on yet, plus a
+    random replay of already-trained samples so the model doesn't forget them
+    Args:
+        items: Current training split
+        trained_keys: sample_key() of every sample the previous model was trained on
+        replay_ratio: Old samples replayed per new sample
+        seed: Random seed for the replay sample
+    Returns: Tuple of (new samples, replayed samples)
+    """
+    new_items = [item for item in items if sample_key(item) not in trained_keys]
+    old_items = [item for item in items if sample_key(item) in trained_keys]
+
+    replay_count = min(len(old_items), round(len(new_items) * replay_ratio))
+    replayed = random.Random(seed).sample(old_items, replay_count)
+    return new_items, replayed
+
+
+def max_target_length(target_format):
+    """Max target tokens for a target format"""
+    if target_format == "edit_script":
+        return config.MAX_EDIT_SCRIPT_LENGTH
+    return config.MAX_TARGET_LENGTH
+
+
+def load_datasets(tokenizer, target_format=config.TARGET_FORMAT):
     """
     Load train, validation, and test datasets
     Returns: Tuple of (train_dataset, val_dataset, test_dataset)
@@ -78,21 +161,25 @@ def load_datasets(tokenizer):
         config.TRAIN_FILE,
         tokenizer,
         config.MAX_INPUT_LENGTH,
-        config.MAX_TARGET_LENGTH
+        max_target_length(target_format),
+        target_format,
+        drop_unlearnable=True
     )
     
     val_dataset = BugFixDataset(
         config.VAL_FILE,
         tokenizer,
         config.MAX_INPUT_LENGTH,
-        config.MAX_TARGET_LENGTH
+        max_target_length(target_format),
+        target_format
     )
     
     test_dataset = BugFixDataset(
         config.TEST_FILE,
         tokenizer,
         config.MAX_INPUT_LENGTH,
-        config.MAX_TARGET_LENGTH
+        max_target_length(target_format),
+        target_format
     )
     
     return train_dataset, val_dataset, test_dataset
\ No newline at end of file
@@ -0,0 +1,613 @@
+import argparse
+import hashlib
+import json
+import re
+from pathlib import Path
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+from transformers import (
+    T5Config,
+    T5ForConditionalGeneration,
+    RobertaTokenizer,
+    Trainer,
+    TrainingArguments,
+    EarlyStoppingCallback,
+    default_data_collator
+)
+from dataset import BugFixDataset, load_items, max_target_length
+from edit_script import model_input
+from callbacks import ThroughputCallback
+from benchmark import benchmark_evaluator, print_comparison, save_report
+import config
+from code_text import sample_key  # shared/code_text.py
+
+
+def teacher_fingerprint(model_path):
+    """Identity of a saved model: names, sizes and mtimes of its files"""
+    digest = hashlib.sha1()
+    for path in sorted(Path(model_path).iterdir()):
+        if path.is_file():
+            stat = path.stat()
+            digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+class TeacherCache:
+    """
+    Teacher outputs on the training split, computed once and reused by every distillation run
+    On disk:
+        teacher_fixes.jsonl - teacher-generated fix per sample (append-only, so generation resumes)
+        labels.i32          - target token ids of all samples, concatenated (memory-mapped)
+        topk_values.f16     - teacher's top-k logits at each target token (memory-mapped)
+        topk_indices.i32    - vocabulary ids of those logits (memory-mapped)
+        offsets.u64         - first token of each sample (count + 1 entries)
+        meta.json           - teacher, targets and settings the token files were built with
+    The token files are rebuilt when the teacher, the samples or the settings change.
+    """
+    def __init__(self, cache_dir=config.TEACHER_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.meta_file = self.cache_dir / "meta.json"
+        self.fixes_file = self.cache_dir / "teacher_fixes.jsonl"
+        self.labels_file = self.cache_dir / "labels.i32"
+        self.values_file = self.cache_dir / "topk_values.f16"
+        self.indices_file = self.cache_dir / "topk_indices.i32"
+        self.offsets_file = self.cache_dir / "offsets.u64"
+
+        self.meta = None
+        if self.meta_file.exists():
+            with open(self.meta_file, 'r') as f:
+                self.meta = json.load(f)
+
+    def __len__(self):
+        return self.meta["count"] if self.meta else 0
+
+    @staticmethod
+    def settings(teacher_path, items, targets, top_k):
+        """What the cached token files depend on"""
+        keys = hashlib.sha1(''.join(sample_key(item) for item in items).encode('utf-8')).hexdigest()
+        return {
+            "teacher": str(teacher_path),
+            "teacher_fingerprint": teacher_fingerprint(teacher_path),
+            "target_format": getattr(T5Config.from_pretrained(str(teacher_path)), "target_format", "full"),
+            "targets": targets,
+            "top_k": top_k,
+            "max_input_length": config.MAX_INPUT_LENGTH,
+            "samples": keys,
+        }
+
+    def is_current(self, settings):
+        """True if the token files were built with these settings"""
+        if self.meta is None:
+            return False
+        return all(self.meta.get(key) == value for key, value in settings.items())
+
+    def load(self):
+        """Memory-map the token files"""
+        top_k = self.meta["top_k"]
+        self.offsets = np.memmap(self.offsets_file, dtype=np.uint64, mode='r')
+        total = int(self.offsets[-1])
+        if total == 0:
+            self.labels = np.zeros(0, dtype=np.int32)
+            self.values = np.zeros((0, top_k), dtype=np.float16)
+            self.indices = np.zeros((0, top_k), dtype=np.int32)
+            return
+        self.labels = np.memmap(self.labels_file, dtype=np.int32, mode='r', shape=(total,))
+        self.values = np.memmap(self.values_file, dtype=np.float16, mode='r', shape=(total, top_k))
+        self.indices = np.memmap(self.indices_file, dtype=np.int32, mode='r', shape=(total, top_k))
+
+    def sample(self, index):
+        """
+        Cached targets of one sample
+        Returns: Tuple of (label ids, top-k logit values, top-k vocabulary ids)
+        """
+        start, end = int(self.offsets[index]), int(self.offsets[index + 1])
+        return self.labels[start:end], self.values[start:end], self.indices[start:end]
+
+    def load_fixes(self, fingerprint):
+        """Teacher-generated fixes of this teacher, by sample key (fixes of other teachers are dropped)"""
+        fixes, stale = {}, False
+        if self.fixes_file.exists():
+            with open(self.fixes_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    record = json.loads(line)
+                    if record['teacher'] == fingerprint:
+                        fixes[record['key']] = record['fix']
+                    else:
+                        stale = True
+
+        if stale:
+            with open(self.fixes_file, 'w', encoding='utf-8') as f:
+                for key, fix in fixes.items():
+                    f.write(json.dumps({"key": key, "teacher": fingerprint, "fix": fix}, ensure_ascii=False) + "\n")
+        return fixes
+
+    def generate_fixes(self, evaluator, items, fingerprint, batch_size=config.TEACHER_BATCH_SIZE):
+        """
+        Teacher fix for every sample, generating only the ones not cached yet
+        Returns: Dictionary of sample key -> fixed code
+        """
+        from tqdm import tqdm
+
+        fixes = self.load_fixes(fingerprint)
+        todo = [item for item in items if sample_key(item) not in fixes]
+        print(f"Teacher fixes: {len(items) - len(todo)} cached, {len(todo)} to generate")
+
+        with open(self.fixes_file, 'a', encoding='utf-8') as f:
+            for start in tqdm(range(0, len(todo), batch_size)):
+                batch = todo[start:start + batch_size]
+                for item, fix in zip(batch, evaluator.generate_fixes([item['input'] for item in batch])):
+                    fixes[sample_key(item)] = fix
+                    f.write(json.dumps({"key": sample_key(item), "teacher": fingerprint, "fix": fix},
+                                       ensure_ascii=False) + "\n")
+                f.flush()
+
+        return fixes
+
+    def build(self, teacher_path, items, targets=config.DISTILL_TARGETS, top_k=config.DISTILL_TOP_K,
+              batch_size=config.TEACHER_BATCH_SIZE):
+        """
+        Run the teacher over the training samples (only if the cache is out of date)
+        Args:
+            teacher_path: Fine-tuned model directory
+            items: Training samples
+            targets: "teacher" (student learns the teacher's fixes) or "gold" (the dataset's fixes)
+            top_k: Teacher logits kept per target token
+            batch_size: Teacher batch size
+        """
+        print("\n" + "="*60)
+        print("TEACHER CACHE")
+        print("="*60)
+
+        if targets not in ("teacher", "gold"):
+            raise ValueError(f"Unknown distillation targets: {targets}")
+
+        settings = self.settings(teacher_path, items, targets, top_k)
+        if self.is_current(settings):
+            print(f"\n✅ Up to date ({len(self)} samples): {self.cache_dir}")
+            self.load()
+            return
+
+        from tqdm import tqdm
+        from evaluate import ModelEvaluator
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        evaluator = ModelEvaluator(str(teacher_path), quantize=False, backend="pytorch")
+        target_format = evaluator.target_format
+
+        if targets == "teacher":
+            fixes = self.generate_fixes(evaluator, items, settings["teacher_fingerprint"], batch_size)
+            # Keep the dataset fix where the teacher produced nothing
+            items = [dict(item, target=fixes.get(sample_key(item)) or item['target']) for item in items]
+
+        # Same target text (full code or edit script) the model was trained on
+        target_texts = BugFixDataset(
+            config.TRAIN_FILE, evaluator.tokenizer, config.MAX_INPUT_LENGTH,
+            max_target_length(target_format), target_format, items=items
+        ).targets
+
+        print(f"Caching top-{top_k} teacher logits per target token...")
+        offsets = [0]
+        with open(self.labels_file, 'wb') as labels_out, \
+                open(self.values_file, 'wb') as values_out, \
+                open(self.indices_file, 'wb') as indices_out:
+            for start in tqdm(range(0, len(items), batch_size)):
+                inputs = evaluator.tokenizer(
+                    [model_input(item['input'], target_format) for item in items[start:start + batch_size]],
+                    max_length=config.MAX_INPUT_LENGTH,
+                    padding=True,
+                    truncation=True,
+                    return_tensors='pt'
+                )
+                target_encoding = evaluator.tokenizer(
+                    target_texts[start:start + batch_size],
+                    max_length=max_target_length(target_format),
+                    padding=True,
+                    truncation=True,
+                    return_tensors='pt'
+                )
+                labels = target_encoding['input_ids'].clone()
+                labels[target_encoding['attention_mask'] == 0] = -100
+
+                with torch.no_grad():
+                    logits = evaluator.model(
+                        input_ids=inputs['input_ids'].to(evaluator.device),
+                        attention_mask=inputs['attention_mask'].to(evaluator.device),
+                        labels=labels.to(evaluator.device)
+                    ).logits
+                values, indices = logits.topk(top_k, dim=-1)
+                values = values.to(torch.float16).cpu().numpy()
+                indices = indices.to(torch.int32).cpu().numpy()
+
+                for row, length in enumerate(target_encoding['attention_mask'].sum(dim=1).tolist()):
+                    labels_out.write(target_encoding['input_ids'][row, :length].numpy().astype(np.int32).tobytes())
+                    values_out.write(values[row, :length].tobytes())
+                    indices_out.write(indices[row, :length].tobytes())
+                    offsets.append(offsets[-1] + length)
+
+        with open(self.offsets_file, 'wb') as f:
+            f.write(np.array(offsets, dtype=np.uint64).tobytes())
+
+        # Written last: an interrupted build is rebuilt next time
+        self.meta = dict(settings, count=len(items), tokens=offsets[-1])
+        with open(self.meta_file, 'w') as f:
+            json.dump(self.meta, indent=2, fp=f)
+        self.load()
+
+        print(f"\n✅ Cached {len(items)} samples ({offsets[-1]} target tokens)")
+        print(f"📁 Cache saved to: {self.cache_dir}")
+
+
+class DistillationDataset(Dataset):
+    """
+    Training samples with the teacher's cached targets and top-k logits
+    """
+    def __init__(self, cache, items, tokenizer, max_input_length, max_target_length):
+        """
+        Args:
+            cache: Built TeacherCache (same items, same order)
+            items: Training samples
+            tokenizer: Tokenizer shared by teacher and student
+            max_input_length: Max length for input (buggy code)
+            max_target_length: Max length for target (cached targets are never longer)
+        """
+        if len(cache) != len(items):
+            raise ValueError(f"Teacher cache has {len(cache)} samples, expected {len(items)}")
+
+        self.cache = cache
+        self.data = items
+        self.tokenizer = tokenizer
+        self.max_input_length = max_input_length
+        self.max_target_length = max_target_length
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, idx):
+        """
+        Get a single sample
+        Returns: Dictionary with input_ids, attention_mask, labels, teacher_values, teacher_indices
+        """
+        input_encoding = self.tokenizer(
+            model_input(self.data[idx]['input'], self.cache.meta["target_format"]),
+            max_length=self.max_input_length,
+            padding='max_length',
+            truncation=True,
+            return_tensors='pt'
+        )
+
+        # Copies: the memory-mapped cache is read-only
+        cached_labels, values, indices = self.cache.sample(idx)
+        length = len(cached_labels)
+        top_k = values.shape[1]
+
+        # Pad to max_target_length like BugFixDataset (-100 is ignored in the loss)
+        labels = torch.full((self.max_target_length,), -100, dtype=torch.long)
+        labels[:length] = torch.from_numpy(np.array(cached_labels, dtype=np.int64))
+        teacher_values = torch.zeros((self.max_target_length, top_k), dtype=torch.float16)
+        teacher_values[:length] = torch.from_numpy(np.array(values))
+        teacher_indices = torch.zeros((self.max_target_length, top_k), dtype=torch.long)
+        teacher_indices[:length] = torch.from_numpy(np.array(indices, dtype=np.int64))
+
+        return {
+            'input_ids': input_encoding['input_ids'].squeeze(),
+            'attention_mask': input_encoding['attention_mask'].squeeze(),
+            'labels': labels,
+            'teacher_values': teacher_values,
+            'teacher_indices': teacher_indices
+        }
+
+
+def distillation_loss(student_logits, labels, teacher_values, teacher_indices, temperature):
+    """
+    Cross-entropy of the student against the teacher's softened top-k distribution
+    (teacher probabilities renormalized over its top k; scaled by T^2 so gradients
+    keep their size across temperatures)
+    Args:
+        student_logits: (batch, length, vocab)
+        labels: (batch, length), -100 at padding
+        teacher_values, teacher_indices: (batch, length, k) cached top-k logits and their ids
+        temperature: Softmax temperature
+    Returns: Scalar loss
+    """
+    mask = labels != -100
+    teacher_probs = torch.softmax(teacher_values.float() / temperature, dim=-1)
+    student_log_probs = torch.log_softmax(student_logits.float() / temperature, dim=-1)
+    student_log_probs = student_log_probs.gather(-1, teacher_indices)
+
+    per_token = -(teacher_probs * student_log_probs).sum(dim=-1)
+    return per_token[mask].mean() * temperature ** 2
+
+
+class DistillationTrainer(Trainer):
+    """
+    Trainer whose loss mixes the teacher's cached logits with cross-entropy on the targets
+    Batches without teacher logits (validation) use plain cross-entropy.
+    """
+    def __init__(self, *args, temperature=config.DISTILL_TEMPERATURE, alpha=config.DISTILL_ALPHA, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.temperature = temperature
+        self.alpha = alpha
+
+    def compute_loss(self, model, inputs, return_outputs=False, **kwargs):
+        teacher_values = inputs.pop('teacher_values', None)
+        teacher_indices = inputs.pop('teacher_indices', None)
+
+        outputs = model(**inputs)
+        loss = outputs.loss
+        if teacher_values is not None and self.alpha > 0:
+            soft_loss = distillation_loss(
+                outputs.logits, inputs['labels'], teacher_values, teacher_indices, self.temperature
+            )
+            loss = self.alpha * soft_loss + (1 - self.alpha) * loss
+
+        return (loss, outputs) if return_outputs else loss
+
+
+def reduced_student(teacher, num_layers):
+    """
+    Student made of evenly spaced encoder and decoder layers of the teacher
+    (first and last layers kept; layer 0 holds T5's relative position biases)
+    Args:
+        teacher: T5ForConditionalGeneration
+        num_layers: Layers kept in the encoder and in the decoder
+    Returns: T5ForConditionalGeneration
+    """
+    student_config = T5Config.from_dict(teacher.config.to_dict())
+    student_config.num_layers = min(num_layers, teacher.config.num_layers)
+    student_config.num_decoder_layers = min(num_layers, teacher.config.num_decoder_layers)
+
+    def spread(kept, total):
+        if kept == 1:
+            return [0]
+        return [round(i * (total - 1) / (kept - 1)) for i in range(kept)]
+
+    keep = {
+        "encoder": spread(student_config.num_layers, teacher.config.num_layers),
+        "decoder": spread(student_config.num_decoder_layers, teacher.config.num_decoder_layers),
+    }
+
+    state = {}
+    for key, value in teacher.state_dict().items():
+        match = re.match(r'(encoder|decoder)\.block\.(\d+)\.(.*)', key)
+        if match is None:
+            state[key] = value
+        elif int(match.group(2)) in keep[match.group(1)]:
+            new_index = keep[match.group(1)].index(int(match.group(2)))
+            state[f"{match.group(1)}.block.{new_index}.{match.group(3)}"] = value
+
+    student = T5ForConditionalGeneration(student_config)
+    student.load_state_dict(state)
+    print(f"Student layers: encoder {keep['encoder']}, decoder {keep['decoder']} of the teacher")
+    return student
+
+
+class BugFixDistiller:
+    def __init__(self, teacher_path=config.MODEL_OUTPUT_DIR / "final", student_layers=config.STUDENT_LAYERS,
+                 targets=config.DISTILL_TARGETS):
+        """
+        Initialize distillation
+        Args:
+            teacher_path: Fine-tuned model to distill
+            student_layers: > 0 cuts the teacher to this many layers, otherwise
+                            STUDENT_MODEL_NAME is fine-tuned as the student
+            targets: "teacher" or "gold" targets for the student (see TeacherCache.build)
+        """
+        print("="*60)
+        print("BUG FIX MODEL DISTILLATION")
+        print("="*60)
+
+        self.device = torch.device(config.DEVICE if torch.cuda.is_available() else "cpu")
+        print(f"\nDevice: {self.device}")
+        print(f"Teacher: {teacher_path}")
+
+        # Teacher runs once; later runs (new student, new hyperparameters) reuse its outputs
+        train_items = load_items(config.TRAIN_FILE)
+        self.cache = TeacherCache()
+        self.cache.build(teacher_path, train_items, targets)
+        self.target_format = self.cache.meta["target_format"]
+
+        self.tokenizer = RobertaTokenizer.from_pretrained(str(teacher_path))
+
+        print("\nLoading student...")
+        if student_layers:
+            from evaluate import load_model
+            teacher = load_model(str(teacher_path))
+            self.model = reduced_student(teacher, student_layers)
+            del teacher
+        else:
+            print(f"Student: {config.STUDENT_MODEL_NAME}")
+            self.model = T5ForConditionalGeneration.from_pretrained(config.STUDENT_MODEL_NAME)
+            teacher_config = T5Config.from_pretrained(str(teacher_path))
+            if self.model.config.vocab_size != teacher_config.vocab_size:
+                raise ValueError(
+                    f"Student vocabulary ({self.model.config.vocab_size}) doesn't match "
+                    f"the teacher's ({teacher_config.vocab_size})"
+                )
+        self.model.to(self.device)
+
+        # Saved with the model so evaluation knows how to decode its outputs
+        self.model.config.target_format = self.target_format
+        print(f"Target format: {self.target_format}")
+        print(f"Student parameters: {self.model.num_parameters() / 1e6:.1f}M")
+
+        print("\nLoading datasets...")
+        self.train_dataset = DistillationDataset(
+            self.cache, train_items, self.tokenizer,
+            config.MAX_INPUT_LENGTH, max_target_length(self.target_format)
+        )
+        # Validation loss is against the dataset fixes, like BugFixTrainer
+        self.val_dataset = BugFixDataset(
+            config.VAL_FILE, self.tokenizer, config.MAX_INPUT_LENGTH,
+            max_target_length(self.target_format), self.target_format
+        )
+
+        print(f"  Train: {len(self.train_dataset)} samples")
+        print(f"  Validation: {len(self.val_dataset)} samples")
+
+    def train(self):
+        """
+        Train the student
+        Returns: Trainer, or None if interrupted
+        """
+        print("\n" + "="*60)
+        print("STARTING DISTILLATION")
+        print("="*60)
+
+        training_args = TrainingArguments(
+            output_dir=str(config.MODEL_OUTPUT_DIR / "distill"),
+
+            # Training parameters
+            num_train_epochs=config.DISTILL_EPOCHS,
+            per_device_train_batch_size=config.DISTILL_BATCH_SIZE,
+            per_device_eval_batch_size=config.DISTILL_BATCH_SIZE,
+            learning_rate=config.DISTILL_LEARNING_RATE,
+            warmup_steps=config.WARMUP_STEPS,
+
+            # Logging and saving
+            logging_steps=config.LOGGING_STEPS,
+            save_steps=config.SAVE_STEPS,
+            eval_steps=config.EVAL_STEPS,
+            save_total_limit=3,
+            save_safetensors=True,
+
+            # Evaluation
+            eval_strategy="steps",
+            load_best_model_at_end=True,
+            metric_for_best_model="eval_loss",
+            greater_is_better=False,
+            prediction_loss_only=True,  # Don't collect vocabulary-sized logits during evaluation
+
+            # Performance
+            fp16=torch.cuda.is_available(),
+
+            # Other
+            report_to="none",
+            remove_unused_columns=False,  # Keep the teacher logit columns
+        )
+
+        # Batches are fixed-size tensors, so stacking is enough
+        throughput = ThroughputCallback(default_data_collator)
+
+        trainer = DistillationTrainer(
+            model=self.model,
+            args=training_args,
+            train_dataset=self.train_dataset,
+            eval_dataset=self.val_dataset,
+            tokenizer=self.tokenizer,
+            data_collator=throughput.collate,
+            callbacks=[
+                EarlyStoppingCallback(
+                    early_stopping_patience=config.EARLY_STOPPING_PATIENCE
+                ),
+                throughput
+            ]
+        )
+
+        print("\nTraining started...")
+        print(f"Epochs: {config.DISTILL_EPOCHS}")
+        print(f"Batch size: {config.DISTILL_BATCH_SIZE}")
+        print(f"Learning rate: {config.DISTILL_LEARNING_RATE}")
+        print(f"Loss: {config.DISTILL_ALPHA} x teacher logits (T={config.DISTILL_TEMPERATURE}) "
+              f"+ {1 - config.DISTILL_ALPHA:.2f} x cross-entropy on {self.cache.meta['targets']} targets")
+
+        try:
+            train_result = trainer.train()
+
+            print("\n" + "="*60)
+            print("DISTILLATION COMPLETE!")
+            print("="*60)
+            print(f"\nFinal train loss: {train_result.training_loss:.4f}")
+
+            trainer.save_model(str(config.DISTILLED_MODEL_DIR))
+            self.tokenizer.save_pretrained(str(config.DISTILLED_MODEL_DIR))
+            print(f"\n✅ Student saved to: {config.DISTILLED_MODEL_DIR}")
+
+            return trainer
+
+        except KeyboardInterrupt:
+            print("\n\n⚠️  Distillation interrupted by user")
+            trainer.save_model(str(config.MODEL_OUTPUT_DIR / "distill-interrupted"))
+            print("Checkpoint saved.")
+            return None
+
+
+def add_quality_scores(result, samples):
+    """Add token edit similarity and BLEU of a benchmark result's predictions"""
+    from metrics import score_predictions
+
+    _, scores = score_predictions(
+        [sample['input'] for sample in samples],
+        [sample['target'] for sample in samples],
+        result['predictions']
+    )
+    result['edit_similarity'] = scores['mean_edit_similarity']
+    result['bleu'] = scores['corpus_bleu']
+    return result
+
+
+def compare_teacher_student(teacher_path, student_path, num_samples=config.BENCHMARK_SAMPLES):
+    """
+    Run teacher and student on the test split (CPU) and report latency, size and quality side by side
+    Args:
+        teacher_path: Fine-tuned teacher model
+        student_path: Distilled student model
+        num_samples: Number of test samples to benchmark on
+    Returns: List of benchmark results (teacher first)
+    """
+    from evaluate import ModelEvaluator
+
+    # Compare on CPU, which is where the student would be deployed
+    original_device = config.DEVICE
+    config.DEVICE = "cpu"
+
+    try:
+        teacher = ModelEvaluator(str(teacher_path), quantize=False, backend="pytorch")
+        samples = teacher.test_dataset.data[:num_samples]
+        teacher_result = add_quality_scores(benchmark_evaluator(teacher, samples, "teacher"), samples)
+        del teacher
+
+        student = ModelEvaluator(str(student_path), quantize=False, backend="pytorch")
+        student_result = add_quality_scores(benchmark_evaluator(student, samples, "student"), samples)
+    finally:
+        config.DEVICE = original_device
+
+    results = [teacher_result, student_result]
+    print_comparison(results)
+    save_report(results, config.MODEL_OUTPUT_DIR / "distillation_report.json")
+
+    return results
+
+
+if __name__ == "__main__":
+    from profiler import add_profile_argument, profiled
+
+    parser = argparse.ArgumentParser(description="Distill the fine-tuned model into a smaller student")
+    parser.add_argument("command", choices=["cache", "train", "compare"],
+                        help="cache: run the teacher only; train: distill (caching first); "
+                             "compare: benchmark teacher vs student")
+    parser.add_argument("--student-layers", type=int, default=config.STUDENT_LAYERS,
+                        help=f"Cut the teacher to N layers instead of training {config.STUDENT_MODEL_NAME}")
+    parser.add_argument("--targets", choices=["teacher", "gold"], default=config.DISTILL_TARGETS,
+                        help="Student targets: teacher-generated or dataset fixes")
+    parser.add_argument("--num-samples", type=int, default=config.BENCHMARK_SAMPLES)
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with profiled("distill", args, config.PROFILE_DIR):
+        teacher_path = config.MODEL_OUTPUT_DIR / "final"
+
+        if not teacher_path.exists():
+            print(f"❌ Teacher model not found at {teacher_path}")
+            print("Train the model first using trainer.py")
+        elif args.command == "cache":
+            TeacherCache().build(teacher_path, load_items(config.TRAIN_FILE), args.targets)
+        elif args.command == "train":
+            distiller = BugFixDistiller(teacher_path, student_layers=args.student_layers, targets=args.targets)
+            if distiller.train() is not None:
+                compare_teacher_student(teacher_path, config.DISTILLED_MODEL_DIR, num_samples=args.num_samples)
+        elif not config.DISTILLED_MODEL_DIR.exists():
+            print(f"❌ Student model not found at {config.DISTILLED_MODEL_DIR}")
+            print("Distill it first: python distill.py train")
+        else:
+            compare_teacher_student(teacher_path, config.DISTILLED_MODEL_DIR, num_samples=args.num_samples)
@@ -0,0 +1,187 @@
+import difflib
+import json
+import re
+import config
+
+# Hunk header: "@@ <first line (1-based)>,<number of input lines replaced>"
+HUNK_HEADER = re.compile(r'^@@ (\d+),(\d+)$')
+
+# Edit-script models see each input line prefixed with its number, so hunk
+# headers can be copied from the input instead of counted
+LINE_NUMBER_PREFIX = "{}| "
+
+
+def number_lines(code):
+    """
+    Prefix every line with its 1-based line number (model input for edit scripts)
+    Args:
+        code: Source code
+    Returns: Numbered code, e.g. "1| class A {\n2| }"
+    """
+    return '\n'.join(
+        LINE_NUMBER_PREFIX.format(number) + line
+        for number, line in enumerate(code.split('\n'), start=1)
+    )
+
+
+def model_input(code, target_format):
+    """Input text the model sees for a target format (edit-script models get numbered lines)"""
+    if target_format == "edit_script":
+        return number_lines(code)
+    return code
+
+
+def make_edit_script(source, target):
+    """
+    Compact line-anchored edit script that turns source into target
+    Each hunk replaces a range of source lines with zero or more new lines:
+        @@ 12,1
+        +    if (items == null) return;
+    A count of 0 inserts before the line; a hunk with no '+' lines deletes.
+    Args:
+        source: Buggy code
+        target: Fixed code
+    Returns: Edit script string (empty if the code is unchanged)
+    """
+    source_lines = source.split('\n')
+    target_lines = target.split('\n')
+
+    matcher = difflib.SequenceMatcher(None, source_lines, target_lines, autojunk=False)
+
+    hunks = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        hunks.append(f"@@ {i1 + 1},{i2 - i1}")
+        hunks.extend('+' + line for line in target_lines[j1:j2])
+
+    return '\n'.join(hunks)
+
+
+def parse_edit_script(script, strict=False):
+    """
+    Parse an edit script into hunks, skipping anything malformed
+    (model predictions are not guaranteed to be well formed)
+    Args:
+        script: Edit script
+        strict: Raise ValueError on the first malformed line instead of skipping it
+    Returns: List of (start index, count, new lines) tuples
+    """
+    hunks = []
+    current = None
+
+    if not script:
+        return hunks
+
+    for number, line in enumerate(script.split('\n'), start=1):
+        header = HUNK_HEADER.match(line.strip())
+        if header:
+            current = (int(header.group(1)) - 1, int(header.group(2)), [])
+            hunks.append(current)
+        elif line.startswith('+') and current is not None:
+            current[2].append(line[1:])
+        elif strict:
+            raise ValueError(f"Malformed edit script line {number}: {line!r}")
+
+    return hunks
+
+
+def check_edit_script(source, script):
+    """
+    Validate a predicted edit script against its source
+    Args:
+        source: Buggy code
+        script: Edit script (e.g. a model prediction)
+    Returns: Parsed hunks
+    Raises: ValueError if a line is malformed, a hunk falls outside the source
+            or hunks overlap
+    """
+    line_count = len(source.split('\n'))
+    hunks = parse_edit_script(script, strict=True)
+
+    covered_until = 0
+    for start, count, _ in hunks:
+        if start < covered_until or start + count > line_count:
+            raise ValueError(f"Hunk @@ {start + 1},{count} does not fit a {line_count}-line source")
+        covered_until = start + count
+
+    return hunks
+
+
+def apply_edit_script(source, script):
+    """
+    Apply an edit script to source code
+    Hunks that fall outside the source or overlap an earlier hunk are ignored
+    Args:
+        source: Buggy code
+        script: Edit script (e.g. a model prediction)
+    Returns: Fixed code
+    """
+    lines = source.split('\n')
+
+    # Keep the first of any overlapping hunks, then apply bottom-up so
+    # earlier line numbers stay valid
+    valid_hunks = []
+    covered_until = 0
+    for start, count, new_lines in sorted(parse_edit_script(script), key=lambda hunk: hunk[0]):
+        if start < covered_until or start > len(lines) or start + count > len(lines):
+            continue
+        valid_hunks.append((start, count, new_lines))
+        covered_until = start + count
+
+    for start, count, new_lines in reversed(valid_hunks):
+        lines[start:start + count] = new_lines
+
+    return '\n'.join(lines)
+
+
+def target_length_stats(data_file, tokenizer):
+    """
+    Compare tokenized target lengths of full fixed code and edit scripts
+    Returns: Dictionary of mean/p90 lengths for both formats
+    """
+    from benchmark import percentile
+
+    with open(data_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    full_lengths = []
+    script_lengths = []
+    for item in data:
+        full_lengths.append(len(tokenizer(item['target'])['input_ids']))
+        script = make_edit_script(item['input'], item['target'])
+        script_lengths.append(len(tokenizer(script)['input_ids']))
+
+    return {
+        "samples": len(data),
+        "full_mean": sum(full_lengths) / max(len(full_lengths), 1),
+        "full_p90": percentile(full_lengths, 90),
+        "edit_script_mean": sum(script_lengths) / max(len(script_lengths), 1),
+        "edit_script_p90": percentile(script_lengths, 90),
+        "edit_script_over_limit": sum(1 for length in script_lengths if length > config.MAX_EDIT_SCRIPT_LENGTH)
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    from profiler import add_profile_argument, profiled
+
+    parser = argparse.ArgumentParser(description="Compare full-code and edit-script target lengths")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with profiled("edit_script", args, config.PROFILE_DIR):
+        from transformers import RobertaTokenizer
+
+        tokenizer = RobertaTokenizer.from_pretrained(config.MODEL_NAME)
+        stats = target_length_stats(config.TRAIN_FILE, tokenizer)
+
+        print("="*60)
+        print("TARGET LENGTHS (tokens)")
+        print("="*60)
+        print(f"\nSamples: {stats['samples']}")
+        print(f"Full fixed code:  mean {stats['full_mean']:.1f}, p90 {stats['full_p90']}")
+        print(f"Edit script:      mean {stats['edit_script_mean']:.1f}, p90 {stats['edit_script_p90']}")
+        print(f"Reduction:        {stats['full_mean'] / max(stats['edit_script_mean'], 1e-9):.1f}x")
+        print(f"Edit scripts over MAX_EDIT_SCRIPT_LENGTH ({config.MAX_EDIT_SCRIPT_LENGTH}): "
+              f"{stats['edit_script_over_limit']}")
@@ -1,39 +1,163 @@
-import torch
-from transformers import T5ForConditionalGeneration, RobertaTokenizer
-from dataset import BugFixDataset
+import time
+from pathlib import Path
+from edit_script import apply_edit_script, check_edit_script, model_input
+from benchmark import current_rss_mb
 import config
-from tqdm import tqdm
+
+
+def load_model(model_path):
+    """
+    Load a trained PyTorch model for inference
+    Reads memory-mapped safetensors weights when available and skips the
+    random weight initialization and extra state-dict copy of a plain load
+    Args:
+        model_path: Path to trained model (full weights or LoRA adapter)
+    Returns: T5ForConditionalGeneration
+    """
+    from transformers import T5ForConditionalGeneration
+    from lora import is_adapter_dir, load_merged_model
+    
+    if is_adapter_dir(model_path):
+        return load_merged_model(model_path)
+    
+    has_safetensors = any(
+        (Path(model_path) / name).exists()
+        for name in ("model.safetensors", "model.safetensors.index.json")
+    )
+    if not has_safetensors:
+        print("⚠️  No safetensors weights found, loading .bin (convert with: python startup_benchmark.py --convert)")
+    
+    return T5ForConditionalGeneration.from_pretrained(
+        model_path,
+        use_safetensors=has_safetensors,
+        low_cpu_mem_usage=True
+    )
+
 
 class ModelEvaluator:
-    def __init__(self, model_path):
+    def __init__(self, model_path, quantize=config.QUANTIZE_INT8, backend=config.INFERENCE_BACKEND,
+                 generation_policy=None):
         """
         Initialize evaluator
+        The test dataset is only loaded when first used, so callers that just
+        need generate_fix skip it; per-phase timings are kept in startup_timings
         Args:
-            model_path: Path to trained model
+            model_path: Path to trained model (exported ONNX directory for the onnx backend)
+            quantize: Load an int8 dynamically quantized copy (CPU only)
+            backend: "pytorch" or "onnx" (ONNX Runtime, CPU provider)
+            generation_policy: GenerationPolicy for decoding (defaults from config)
         """
         print("="*60)
         print("MODEL EVALUATOR")
         print("="*60)
         
-        self.device = torch.device(config.DEVICE if torch.cuda.is_available() else "cpu")
+        if backend not in ("pytorch", "onnx"):
+            raise ValueError(f"Unknown inference backend: {backend}")
+        if quantize and backend != "pytorch":
+            raise ValueError("int8 quantization is only supported with the pytorch backend")
+        
+        self.model_path = model_path
+        self.quantize = quantize
+        self.backend = backend
+        self.startup_timings = {}
+        self._speculative_decoder = None
+        self._test_dataset = None
+        self._fallback_evaluator = None
+        
+        # Heavy imports are deferred until a model is actually needed
+        phase_start = time.perf_counter()
+        import torch
+        from transformers import RobertaTokenizer
+        from generation import GenerationPolicy
+        self.startup_timings['imports'] = time.perf_counter() - phase_start
+        
+        self.generation_policy = generation_policy or GenerationPolicy()
+        
+        # Quantized kernels and the ONNX Runtime provider only exist on CPU
+        if quantize or backend == "onnx":
+            self.device = torch.device("cpu")
+        else:
+            self.device = torch.device(config.DEVICE if torch.cuda.is_available() else "cpu")
         print(f"\nDevice: {self.device}")
+        print(f"Backend: {backend}")
         
         # Load model and tokenizer
         print(f"\nLoading model from: {model_path}")
-        self.model = T5ForConditionalGeneration.from_pretrained(model_path)
-        self.model.to(self.device)
-        self.model.eval()  # Set to evaluation mode
+        phase_start = time.perf_counter()
+        rss_before = current_rss_mb()
+        if backend == "onnx":
+            from onnx_export import load_onnx_model
+            self.model = load_onnx_model(model_path)
+        else:
+            self.model = load_model(model_path)
+            self.model.to(self.device)
+            self.model.eval()  # Set to evaluation mode
+        
+        if quantize:
+            from quantize import quantize_dynamic_int8
+            print("Quantizing linear layers to int8...")
+            self.model = quantize_dynamic_int8(self.model)
         
+        self.load_rss_mb = current_rss_mb() - rss_before
+        self.startup_timings['model_load'] = time.perf_counter() - phase_start
+        
+        # Models trained on edit scripts predict hunks against the input
+        self.target_format = getattr(self.model.config, 'target_format', 'full')
+        print(f"Target format: {self.target_format}")
+        
+        phase_start = time.perf_counter()
         self.tokenizer = RobertaTokenizer.from_pretrained(model_path)
+        self.startup_timings['tokenizer_load'] = time.perf_counter() - phase_start
         
-        # Load test dataset
-        print("Loading test dataset...")
-        self.test_dataset = BugFixDataset(
-            config.TEST_FILE,
-            self.tokenizer,
-            config.MAX_INPUT_LENGTH,
-            config.MAX_TARGET_LENGTH
-        )
+        print("Startup: " + ", ".join(
+            f"{phase} {seconds:.2f}s" for phase, seconds in self.startup_timings.items()
+        ))
+    
+    @property
+    def test_dataset(self):
+        """Test split (loaded on first access)"""
+        if self._test_dataset is None:
+            from dataset import BugFixDataset, max_target_length
+            
+            phase_start = time.perf_counter()
+            print("Loading test dataset...")
+            self._test_dataset = BugFixDataset(
+                config.TEST_FILE,
+                self.tokenizer,
+                config.MAX_INPUT_LENGTH,
+                max_target_length(self.target_format),
+                self.target_format
+            )
+            self.startup_timings['test_dataset_load'] = time.perf_counter() - phase_start
+        return self._test_dataset
+    
+    @property
+    def speculative_decoder(self):
+        """Prompt-lookup decoder for the loaded model (created on first use)"""
+        if self._speculative_decoder is None:
+            if self.backend != "pytorch":
+                raise ValueError("Speculative decoding is only supported with the pytorch backend")
+            from speculative import PromptLookupDecoder
+            self._speculative_decoder = PromptLookupDecoder(self.model)
+        return self._speculative_decoder
+    
+    @property
+    def fallback_evaluator(self):
+        """
+        Full-rewrite model used when an edit script is rejected
+        (config.FULL_REWRITE_MODEL_DIR, loaded on first use; None if not configured)
+        """
+        if self._fallback_evaluator is None and config.FULL_REWRITE_MODEL_DIR:
+            fallback = ModelEvaluator(str(config.FULL_REWRITE_MODEL_DIR), quantize=self.quantize,
+                                      generation_policy=self.generation_policy)
+            if fallback.target_format != "full":
+                raise ValueError(f"Fallback model must produce full code, got: {fallback.target_format}")
+            self._fallback_evaluator = fallback
+        return self._fallback_evaluator
+    
+    def ended_with_eos(self, output_ids):
+        """Whether generated ids contain end-of-sequence (i.e. the output was not cut off)"""
+        return self.tokenizer.eos_token_id in output_ids.tolist()
     
     def generate_fix(self, buggy_code):
         """
@@ -42,11 +166,10 @@ class ModelEvaluator:
             buggy_code: String of buggy code
         Returns: String of fixed code
         """
-        # Tokenize input
+        # Tokenize input (no padding: a single sequence needs none)
         input_encoding = self.tokenizer(
-            buggy_code,
+            model_input(buggy_code, self.target_format),
             max_length=config.MAX_INPUT_LENGTH,
-            padding='max_length',
             truncation=True,
             return_tensors='pt'
         )
@@ -54,26 +177,179 @@ class ModelEvaluator:
         input_ids = input_encoding['input_ids'].to(self.device)
         attention_mask = input_encoding['attention_mask'].to(self.device)
         
+        # Decoding budget and beams derived from this input
+        generate_kwargs = self.generation_policy.generate_kwargs(
+            input_ids, attention_mask, self.tokenizer, self.target_format
+        )
+        
+        import torch
+        
         # Generate output
+        if self.generation_policy.speculative:
+            outputs = self.speculative_decoder.generate(
+                input_ids,
+                attention_mask,
+                self.generation_policy.max_new_tokens(input_ids.shape[1], self.target_format),
+                logits_processor=generate_kwargs.get('logits_processor'),
+                special_token_ids=self.tokenizer.all_special_ids
+            )
+        else:
+            with torch.no_grad():
+                outputs = self.model.generate(
+                    input_ids=input_ids,
+                    attention_mask=attention_mask,
+                    **generate_kwargs
+                )
+        
+        # Decode output
+        fixed_code = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+        
+        return self.to_fixed_code(buggy_code, fixed_code, self.ended_with_eos(outputs[0]))
+    
+    def to_fixed_code(self, buggy_code, output, complete=True):
+        """
+        Turn decoded model output into the full fixed code
+        (predicted hunks are applied to the input; full outputs are returned as is)
+        An edit script that was cut off before end-of-sequence, has a malformed
+        line or a hunk that does not fit the input is rejected, and the fix comes
+        from the full-rewrite fallback model instead (the input is returned
+        unchanged if none is configured)
+        Args:
+            buggy_code: String of buggy code
+            output: Decoded model output
+            complete: Whether generation ended with end-of-sequence
+        Returns: String of fixed code
+        """
+        if self.target_format != "edit_script":
+            return output
+        if complete:
+            try:
+                check_edit_script(buggy_code, output)
+                return apply_edit_script(buggy_code, output)
+            except ValueError:
+                pass
+        if self.fallback_evaluator is None:
+            return buggy_code
+        return self.fallback_evaluator.generate_fix(buggy_code)
+    
+    def stream_fix(self, buggy_code, cancel_event=None, outcome=None):
+        """
+        Generate fixed code greedily, yielding decoded text as it is produced
+        Generation runs on a background thread and stops early when cancel_event
+        is set or the generator is closed. Edit-script models stream their hunks;
+        pass the joined text to to_fixed_code() for the full fixed code.
+        Args:
+            buggy_code: String of buggy code
+            cancel_event: Optional threading.Event that stops generation when set
+            outcome: Optional dict; 'complete' is set once generation finishes
+                     (whether it ended with end-of-sequence)
+        Yields: Chunks of decoded model output
+        """
+        import threading
+        import torch
+        from transformers import StoppingCriteriaList, TextIteratorStreamer
+        from generation import CancelledStoppingCriteria
+        
+        cancel_event = cancel_event or threading.Event()
+        outcome = {} if outcome is None else outcome
+        
+        input_encoding = self.tokenizer(
+            model_input(buggy_code, self.target_format),
+            max_length=config.MAX_INPUT_LENGTH,
+            truncation=True,
+            return_tensors='pt'
+        )
+        input_ids = input_encoding['input_ids'].to(self.device)
+        attention_mask = input_encoding['attention_mask'].to(self.device)
+        
+        # Streamers only support a single sequence, so no beams
+        generate_kwargs = self.generation_policy.greedy().generate_kwargs(
+            input_ids, attention_mask, self.tokenizer, self.target_format
+        )
+        
+        # skip_prompt drops the decoder start token
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        errors = []
+        
+        def run():
+            try:
+                with torch.no_grad():
+                    outputs = self.model.generate(
+                        input_ids=input_ids,
+                        attention_mask=attention_mask,
+                        streamer=streamer,
+                        stopping_criteria=StoppingCriteriaList([CancelledStoppingCriteria(cancel_event)]),
+                        **generate_kwargs
+                    )
+                outcome['complete'] = self.ended_with_eos(outputs[0])
+            except Exception as e:
+                errors.append(e)
+                # Unblock the consumer
+                streamer.end()
+        
+        thread = threading.Thread(target=run, name="stream-generate", daemon=True)
+        thread.start()
+        
+        try:
+            for text in streamer:
+                if text:
+                    yield text
+        finally:
+            cancel_event.set()
+            thread.join()
+        
+        if errors:
+            raise errors[0]
+    
+    def generate_fixes(self, buggy_codes):
+        """
+        Generate fixed code for a batch of buggy code samples in one generate() call
+        Args:
+            buggy_codes: List of buggy code strings
+        Returns: List of fixed code strings (same order)
+        """
+        # Speculative decoding works on one sequence at a time
+        if self.generation_policy.speculative or len(buggy_codes) == 1:
+            return [self.generate_fix(buggy_code) for buggy_code in buggy_codes]
+        
+        import torch
+        
+        # Pad to the longest input in the batch only
+        input_encoding = self.tokenizer(
+            [model_input(buggy_code, self.target_format) for buggy_code in buggy_codes],
+            max_length=config.MAX_INPUT_LENGTH,
+            padding=True,
+            truncation=True,
+            return_tensors='pt'
+        )
+        
+        input_ids = input_encoding['input_ids'].to(self.device)
+        attention_mask = input_encoding['attention_mask'].to(self.device)
+        
+        generate_kwargs = self.generation_policy.generate_kwargs(
+            input_ids, attention_mask, self.tokenizer, self.target_format
+        )
+        
         with torch.no_grad():
             outputs = self.model.generate(
                 input_ids=input_ids,
                 attention_mask=attention_mask,
-                max_length=config.MAX_TARGET_LENGTH,
-                num_beams=5,  # Beam search for better quality
-                early_stopping=True
+                **generate_kwargs
             )
         
-        # Decode output
-        fixed_code = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+        fixed_codes = self.tokenizer.batch_decode(outputs, skip_special_tokens=True)
         
-        return fixed_code
+        return [
+            self.to_fixed_code(buggy_code, output, self.ended_with_eos(output_ids))
+            for buggy_code, output, output_ids in zip(buggy_codes, fixed_codes, outputs)
+        ]
     
     def evaluate(self, num_samples=10):
         """
         Evaluate model on test set
         Args:
             num_samples: Number of samples to show examples for
+        Returns: Dictionary of aggregate scores
         """
         print("\n" + "="*60)
         print("EVALUATING ON TEST SET")
@@ -81,39 +357,47 @@ class ModelEvaluator:
         
         print(f"\nGenerating predictions for {len(self.test_dataset)} test samples...")
         
-        correct_predictions = 0
+        from tqdm import tqdm
+        from metrics import score_predictions, write_scores
         
-        # Evaluate all samples
-        for i in tqdm(range(len(self.test_dataset))):
-            sample = self.test_dataset.data[i]
-            buggy_code = sample['input']
-            expected_fix = sample['target']
-            
-            # Generate fix
-            predicted_fix = self.generate_fix(buggy_code)
-            
-            # Simple accuracy check (exact match)
-            if predicted_fix.strip() == expected_fix.strip():
-                correct_predictions += 1
+        samples = self.test_dataset.data
+        
+        # Generate fixes for all samples
+        predictions = [self.generate_fix(sample['input']) for sample in tqdm(samples)]
+        
+        # Score the whole test set in one batch
+        per_sample, scores = score_predictions(
+            [sample['input'] for sample in samples],
+            [sample['target'] for sample in samples],
+            predictions
+        )
+        write_scores(per_sample, config.EVAL_SCORES_FILE, [sample.get('metadata') for sample in samples])
         
-        accuracy = correct_predictions / len(self.test_dataset) * 100
+        correct_predictions = sum(score['exact_match'] for score in per_sample)
         
         print("\n" + "="*60)
         print("EVALUATION RESULTS")
         print("="*60)
-        print(f"\nExact match accuracy: {accuracy:.2f}%")
-        print(f"Correct predictions: {correct_predictions}/{len(self.test_dataset)}")
+        print(f"\nExact match accuracy: {scores['exact_match']:.2f}%")
+        print(f"Correct predictions: {correct_predictions}/{len(samples)}")
+        print(f"Token edit similarity: {scores['mean_edit_similarity']:.2f}% "
+              f"(mean edit distance {scores['mean_edit_distance']:.1f} tokens)")
+        print(f"BLEU-4: {scores['corpus_bleu']:.2f}")
+        print(f"CodeBLEU (n-gram components): {scores['codebleu_ngram']:.2f}")
+        print(f"Changed lines recovered: {scores['changed_lines_recall']:.2f}% "
+              f"(precision {scores['changed_lines_precision']:.2f}%)")
+        print(f"\n📁 Per-sample scores saved to: {config.EVAL_SCORES_FILE}")
         
         # Show examples
         print("\n" + "="*60)
         print(f"SHOWING {num_samples} EXAMPLE PREDICTIONS")
         print("="*60)
         
-        for i in range(min(num_samples, len(self.test_dataset))):
-            sample = self.test_dataset.data[i]
+        for i in range(min(num_samples, len(samples))):
+            sample = samples[i]
             buggy_code = sample['input']
             expected_fix = sample['target']
-            predicted_fix = self.generate_fix(buggy_code)
+            predicted_fix = predictions[i]
             
             print(f"\n{'='*60}")
             print(f"EXAMPLE {i+1}")
@@ -132,19 +416,55 @@ class ModelEvaluator:
             print(predicted_fix[:300] + "..." if len(predicted_fix) > 300 else predicted_fix)
             
             # Check if correct
-            match = predicted_fix.strip() == expected_fix.strip()
+            match = per_sample[i]['exact_match']
             print(f"\n{'✅ CORRECT' if match else '❌ INCORRECT'}")
+            print(f"Edit similarity: {per_sample[i]['edit_similarity'] * 100:.1f}%, "
+                  f"changed lines recovered: {per_sample[i]['changed_lines_recall'] * 100:.0f}%")
         
         print("\n" + "="*60)
+        
+        return scores
 
 
 if __name__ == "__main__":
-    # Evaluate the final trained model
-    model_path = config.MODEL_OUTPUT_DIR / "final"
+    import argparse
+    from generation import add_generation_arguments, policy_from_args
+    from profiler import add_profile_argument, profiled
+    
+    parser = argparse.ArgumentParser(description="Evaluate the trained bug fix model")
+    parser.add_argument("--quantize", action="store_true",
+                        help="Use int8 dynamically quantized model (CPU)")
+    parser.add_argument("--backend", choices=["pytorch", "onnx"], default=config.INFERENCE_BACKEND,
+                        help="Generation backend (export the ONNX model first with onnx_export.py)")
+    parser.add_argument("--compare-student", action="store_true",
+                        help="Benchmark the distilled student (distill.py) against this model on CPU")
+    add_generation_arguments(parser)
+    add_profile_argument(parser)
+    args = parser.parse_args()
     
-    if not model_path.exists():
-        print(f"❌ Model not found at {model_path}")
-        print("Train the model first using trainer.py")
-    else:
-        evaluator = ModelEvaluator(str(model_path))
-        evaluator.evaluate(num_samples=5)
\ No newline at end of file
+    with profiled("evaluate", args, config.PROFILE_DIR):
+        # Evaluate the final trained model
+        if args.backend == "onnx":
+            model_path = config.ONNX_OUTPUT_DIR
+        else:
+            model_path = config.MODEL_OUTPUT_DIR / "final"
+        
+        if not model_path.exists():
+            print(f"❌ Model not found at {model_path}")
+            print("Train the model first using trainer.py")
+        elif args.compare_student:
+            from distill import compare_teacher_student
+            
+            if not config.DISTILLED_MODEL_DIR.exists():
+                print(f"❌ Student model not found at {config.DISTILLED_MODEL_DIR}")
+                print("Distill it first: python distill.py train")
+            else:
+                compare_teacher_student(model_path, config.DISTILLED_MODEL_DIR)
+        else:
+            evaluator = ModelEvaluator(
+                str(model_path),
+                quantize=args.quantize or config.QUANTIZE_INT8,
+                backend=args.backend,
+                generation_policy=policy_from_args(args)
+            )
+            evaluator.evaluate(num_samples=5)
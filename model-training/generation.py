@@ -0,0 +1,296 @@
+import argparse
+import math
+import torch
+from transformers import LogitsProcessor, LogitsProcessorList, StoppingCriteria
+import config
+from benchmark import benchmark_evaluator, print_comparison, save_report
+
+
+class InputEndLogitsProcessor(LogitsProcessor):
+    """
+    Forces EOS on any beam whose last tokens reproduce the end of its input
+    A fix is mostly a copy of the buggy code, so once the output has copied
+    the input's final tokens there is nothing left to generate. The tail only
+    counts once the output is about as long as the input: an earlier match is
+    a repeated line (e.g. a closing brace), not the end of the file.
+    """
+    def __init__(self, input_tails, min_positions, active, eos_token_id, num_beams):
+        """
+        Args:
+            input_tails: Tensor (batch, n) with the last n real tokens of each input
+            min_positions: Tensor (batch,) of output lengths before which a tail
+                           match is ignored
+            active: Bool tensor (batch,), False for inputs too short to match on
+            eos_token_id: End-of-sequence token id
+            num_beams: Beams per input (rows of input_ids per batch item)
+        """
+        self.input_tails = input_tails.repeat_interleave(num_beams, dim=0)
+        self.min_positions = min_positions.repeat_interleave(num_beams, dim=0)
+        self.active = active.repeat_interleave(num_beams, dim=0)
+        self.eos_token_id = eos_token_id
+
+    def __call__(self, input_ids, scores):
+        tail_length = self.input_tails.shape[1]
+        # input_ids starts with the decoder start token
+        generated = input_ids.shape[1] - 1
+        if generated < tail_length:
+            return scores
+
+        finished = (input_ids[:, -tail_length:] == self.input_tails.to(input_ids.device)).all(dim=1)
+        finished &= self.min_positions.to(input_ids.device) <= generated
+        finished &= self.active.to(input_ids.device)
+        if finished.any():
+            scores[finished] = -float("inf")
+            scores[finished, self.eos_token_id] = 0
+        return scores
+
+
+class PerInputBudgetLogitsProcessor(LogitsProcessor):
+    """
+    Forces EOS once a sequence reaches its own input's token budget
+    A batch is generated with the largest budget in it; this keeps shorter
+    inputs to the budget they would get on their own. It is applied to single
+    inputs too, so a sequence that hits its budget ends the same way (with a
+    forced EOS, which beam search scores and length-normalizes) whether or not
+    it was batched.
+    """
+    def __init__(self, budgets, eos_token_id, num_beams):
+        """
+        Args:
+            budgets: Tensor (batch,) of max new tokens per input
+            eos_token_id: End-of-sequence token id
+            num_beams: Beams per input (rows of input_ids per batch item)
+        """
+        self.budgets = budgets.repeat_interleave(num_beams, dim=0)
+        self.eos_token_id = eos_token_id
+
+    def __call__(self, input_ids, scores):
+        # input_ids starts with the decoder start token
+        finished = self.budgets.to(input_ids.device) <= input_ids.shape[1] - 1
+        if finished.any():
+            scores[finished] = -float("inf")
+            scores[finished, self.eos_token_id] = 0
+        return scores
+
+
+class CancelledStoppingCriteria(StoppingCriteria):
+    """
+    Stops generation once a threading.Event is set (e.g. the client went away)
+    """
+    def __init__(self, cancel_event):
+        """
+        Args:
+            cancel_event: threading.Event checked after every decoding step
+        """
+        self.cancel_event = cancel_event
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return self.cancel_event.is_set()
+
+
+class GenerationPolicy:
+    """
+    Decoding settings derived per input instead of a fixed 512-token beam search
+    """
+    def __init__(self,
+                 num_beams=config.NUM_BEAMS,
+                 max_new_tokens_ratio=config.MAX_NEW_TOKENS_RATIO,
+                 min_new_tokens=config.MIN_NEW_TOKENS_BUDGET,
+                 end_match_tokens=config.INPUT_END_MATCH_TOKENS,
+                 speculative=config.SPECULATIVE_DECODING):
+        """
+        Args:
+            num_beams: Beam count (1 = greedy fast path)
+            max_new_tokens_ratio: Output budget relative to input token length
+                                  (None = always MAX_TARGET_LENGTH)
+            min_new_tokens: Floor on the output budget for very short inputs
+            end_match_tokens: End a beam once it reproduces this many final
+                              input tokens (0 = disabled)
+            speculative: Greedy decoding with prompt-lookup drafts (see speculative.py)
+        """
+        if speculative and num_beams != 1:
+            raise ValueError("Speculative decoding requires greedy decoding (num_beams=1)")
+
+        self.num_beams = num_beams
+        self.max_new_tokens_ratio = max_new_tokens_ratio
+        self.min_new_tokens = min_new_tokens
+        self.end_match_tokens = end_match_tokens
+        self.speculative = speculative
+
+    def greedy(self):
+        """Same budget and stopping settings with plain greedy decoding (for streaming)"""
+        return GenerationPolicy(
+            num_beams=1,
+            max_new_tokens_ratio=self.max_new_tokens_ratio,
+            min_new_tokens=self.min_new_tokens,
+            end_match_tokens=self.end_match_tokens,
+            speculative=False
+        )
+
+    def max_new_tokens(self, input_length, target_format="full"):
+        """Output token budget for an input of input_length tokens"""
+        # Edit scripts only describe the changed lines, so their length
+        # does not scale with the input
+        if target_format == "edit_script":
+            return config.MAX_EDIT_SCRIPT_LENGTH
+        # Same ceiling as max_length=MAX_TARGET_LENGTH (which counts the decoder
+        # start token) and the training labels
+        ceiling = config.MAX_TARGET_LENGTH - 1
+        if self.max_new_tokens_ratio is None:
+            return ceiling
+        budget = max(self.min_new_tokens, math.ceil(input_length * self.max_new_tokens_ratio))
+        return min(budget, ceiling)
+
+    def input_tails(self, input_ids, attention_mask, special_token_ids):
+        """
+        Last end_match_tokens real (non-special) tokens of each input, and the
+        output length from which a match may end generation
+        Returns: Tuple of (tails (batch, n), min_positions (batch,), active (batch,));
+                 inputs too short to match on are inactive. None if no input is active.
+        """
+        tails, min_positions, active = [], [], []
+        for ids, mask in zip(input_ids.tolist(), attention_mask.tolist()):
+            tokens = [token for token, keep in zip(ids, mask) if keep and token not in special_token_ids]
+            if len(tokens) < self.end_match_tokens:
+                tails.append([-1] * self.end_match_tokens)
+                min_positions.append(0)
+                active.append(False)
+                continue
+            tails.append(tokens[-self.end_match_tokens:])
+            # A fix can delete a little code, so allow ending slightly early
+            min_positions.append(max(self.end_match_tokens, len(tokens) - config.INPUT_END_SLACK_TOKENS))
+            active.append(True)
+
+        if not any(active):
+            return None
+        return torch.tensor(tails, dtype=input_ids.dtype), torch.tensor(min_positions), torch.tensor(active)
+
+    def generate_kwargs(self, input_ids, attention_mask, tokenizer, target_format="full"):
+        """
+        Keyword arguments for model.generate() on this batch
+        Args:
+            input_ids: Tokenized inputs (batch, length)
+            attention_mask: Attention mask of the inputs
+            tokenizer: Tokenizer (for special token ids)
+            target_format: Output format the model was trained on
+        Returns: Dictionary of generate() arguments
+        """
+        input_lengths = attention_mask.sum(dim=1).tolist()
+        budgets = [self.max_new_tokens(length, target_format) for length in input_lengths]
+
+        kwargs = {
+            "num_beams": self.num_beams,
+            "do_sample": False,
+        }
+        processors = []
+        if self.max_new_tokens_ratio is None and target_format == "full":
+            # The original fixed budget
+            kwargs["max_length"] = config.MAX_TARGET_LENGTH
+        elif target_format == "edit_script":
+            # Same budget for every input, so nothing differs when batched
+            kwargs["max_new_tokens"] = max(budgets)
+        else:
+            # One extra step for the EOS forced at each input's own budget
+            kwargs["max_new_tokens"] = max(budgets) + 1
+            processors.append(PerInputBudgetLogitsProcessor(
+                torch.tensor(budgets), tokenizer.eos_token_id, self.num_beams
+            ))
+
+        if self.num_beams > 1:
+            kwargs["early_stopping"] = True
+
+        # Only a full-file output ends by reproducing the input's end
+        if self.end_match_tokens > 0 and target_format == "full":
+            tails = self.input_tails(input_ids, attention_mask, set(tokenizer.all_special_ids))
+            if tails is not None:
+                processors.append(InputEndLogitsProcessor(*tails, tokenizer.eos_token_id, self.num_beams))
+
+        if processors:
+            kwargs["logits_processor"] = LogitsProcessorList(processors)
+
+        return kwargs
+
+    def to_dict(self):
+        """Settings as a plain dictionary (for reports and cache keys)"""
+        return {
+            "num_beams": self.num_beams,
+            "max_new_tokens_ratio": self.max_new_tokens_ratio,
+            "min_new_tokens": self.min_new_tokens,
+            "end_match_tokens": self.end_match_tokens,
+            "speculative": self.speculative,
+        }
+
+
+def add_generation_arguments(parser):
+    """Add decoding policy options to an argparse parser"""
+    parser.add_argument("--num-beams", type=int, default=config.NUM_BEAMS,
+                        help="Beam count (1 = greedy)")
+    parser.add_argument("--greedy", action="store_true",
+                        help="Greedy fast path (same as --num-beams 1)")
+    parser.add_argument("--length-ratio", type=float, default=config.MAX_NEW_TOKENS_RATIO,
+                        help="Output token budget relative to input length (0 = fixed MAX_TARGET_LENGTH)")
+    parser.add_argument("--end-match-tokens", type=int, default=config.INPUT_END_MATCH_TOKENS,
+                        help="Stop a beam after reproducing this many final input tokens (0 = off)")
+    parser.add_argument("--speculative", action="store_true",
+                        help="Greedy decoding with prompt-lookup drafts from the input")
+
+
+def policy_from_args(args):
+    """Build a GenerationPolicy from parsed add_generation_arguments options"""
+    return GenerationPolicy(
+        num_beams=1 if args.greedy or args.speculative else args.num_beams,
+        max_new_tokens_ratio=args.length_ratio or None,
+        end_match_tokens=args.end_match_tokens,
+        speculative=args.speculative
+    )
+
+
+def compare_policies(model_path, num_samples=config.BENCHMARK_SAMPLES):
+    """
+    Latency/quality report of the fixed decoding budget against the
+    length-adaptive policy and its greedy fast path
+    Args:
+        model_path: Path to trained model
+        num_samples: Number of test samples to benchmark on
+    Returns: List of benchmark results (fixed budget first)
+    """
+    from evaluate import ModelEvaluator
+
+    policies = [
+        ("fixed-512-beam5", GenerationPolicy(num_beams=5, max_new_tokens_ratio=None, end_match_tokens=0)),
+        ("adaptive-beam", GenerationPolicy()),
+        ("adaptive-greedy", GenerationPolicy(num_beams=1)),
+    ]
+
+    evaluator = ModelEvaluator(model_path)
+    samples = evaluator.test_dataset.data[:num_samples]
+
+    results = []
+    for label, policy in policies:
+        evaluator.generation_policy = policy
+        result = benchmark_evaluator(evaluator, samples, label)
+        result['policy'] = policy.to_dict()
+        results.append(result)
+
+    print_comparison(results)
+    save_report(results, config.MODEL_OUTPUT_DIR / "generation_report.json")
+
+    return results
+
+
+if __name__ == "__main__":
+    from profiler import add_profile_argument, profiled
+
+    parser = argparse.ArgumentParser(description="Compare decoding policies on the test split")
+    parser.add_argument("--num-samples", type=int, default=config.BENCHMARK_SAMPLES)
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with profiled("generation", args, config.PROFILE_DIR):
+        model_path = config.MODEL_OUTPUT_DIR / "final"
+
+        if not model_path.exists():
+            print(f"❌ Model not found at {model_path}")
+            print("Train the model first using trainer.py")
+        else:
+            compare_policies(str(model_path), num_samples=args.num_samples)
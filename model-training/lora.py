@@ -0,0 +1,120 @@
+import argparse
+from pathlib import Path
+import config
+
+
+def apply_lora(model):
+    """
+    Wrap a model so only low-rank adapter matrices are trained
+    Args:
+        model: T5ForConditionalGeneration
+    Returns: PeftModel (base weights frozen)
+    """
+    from peft import LoraConfig, TaskType, get_peft_model
+
+    lora_config = LoraConfig(
+        task_type=TaskType.SEQ_2_SEQ_LM,
+        r=config.LORA_R,
+        lora_alpha=config.LORA_ALPHA,
+        lora_dropout=config.LORA_DROPOUT,
+        target_modules=config.LORA_TARGET_MODULES
+    )
+
+    model = get_peft_model(model, lora_config)
+    model.print_trainable_parameters()
+
+    return model
+
+
+def is_adapter_dir(model_path):
+    """True if model_path holds an adapter-only checkpoint"""
+    return (Path(model_path) / "adapter_config.json").exists()
+
+
+def load_merged_model(adapter_path):
+    """
+    Load the base model, apply a saved adapter and merge it into the weights
+    The merged model is a plain T5ForConditionalGeneration with no adapter overhead
+    Args:
+        adapter_path: Directory written by save_model() in LoRA mode
+    Returns: T5ForConditionalGeneration
+    """
+    from peft import PeftConfig, PeftModel
+    from transformers import T5Config, T5ForConditionalGeneration
+
+    peft_config = PeftConfig.from_pretrained(str(adapter_path))
+    print(f"Base model: {peft_config.base_model_name_or_path}")
+
+    # The trainer saves the model config (incl. target_format) next to the adapter
+    model_config = None
+    if (Path(adapter_path) / "config.json").exists():
+        model_config = T5Config.from_pretrained(str(adapter_path))
+
+    model = T5ForConditionalGeneration.from_pretrained(
+        peft_config.base_model_name_or_path,
+        config=model_config
+    )
+    model = PeftModel.from_pretrained(model, str(adapter_path))
+
+    print("Merging adapter into base weights...")
+    return model.merge_and_unload()
+
+
+def load_trainable_adapter(adapter_path):
+    """
+    Load the base model with a saved adapter, ready to continue training it
+    Args:
+        adapter_path: Directory written by save_model() in LoRA mode
+    Returns: Tuple of (PeftModel, model config incl. target_format)
+    """
+    from peft import PeftConfig, PeftModel
+    from transformers import T5Config, T5ForConditionalGeneration
+
+    peft_config = PeftConfig.from_pretrained(str(adapter_path))
+    model_config = T5Config.from_pretrained(str(adapter_path))
+
+    model = T5ForConditionalGeneration.from_pretrained(
+        peft_config.base_model_name_or_path,
+        config=model_config
+    )
+    model = PeftModel.from_pretrained(model, str(adapter_path), is_trainable=True)
+    model.print_trainable_parameters()
+
+    return model, model_config
+
+
+def merge_adapter(adapter_path, output_path=config.MERGED_MODEL_DIR):
+    """
+    Save a merged copy of an adapter checkpoint as a regular model directory
+    Returns: Path to merged model
+    """
+    from transformers import RobertaTokenizer
+
+    model = load_merged_model(adapter_path)
+
+    output_path = Path(output_path)
+    output_path.mkdir(parents=True, exist_ok=True)
+    model.save_pretrained(str(output_path))
+    RobertaTokenizer.from_pretrained(str(adapter_path)).save_pretrained(str(output_path))
+
+    print(f"✅ Merged model saved to: {output_path}")
+    return output_path
+
+
+if __name__ == "__main__":
+    from profiler import add_profile_argument, profiled
+
+    parser = argparse.ArgumentParser(description="Merge a LoRA adapter into the base model")
+    parser.add_argument("--adapter", default=str(config.MODEL_OUTPUT_DIR / "final"),
+                        help="Adapter checkpoint directory")
+    parser.add_argument("--output", default=str(config.MERGED_MODEL_DIR),
+                        help="Where to save the merged model")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with profiled("lora", args, config.PROFILE_DIR):
+        if not is_adapter_dir(args.adapter):
+            print(f"❌ No adapter found at {args.adapter}")
+            print("Train with USE_LORA = True first")
+        else:
+            merge_adapter(args.adapter, args.output)
@@ -1,12 +1,18 @@
+import argparse
 import sys
 from trainer import BugFixTrainer
 from evaluate import ModelEvaluator
 import config
+from profiler import add_profile_argument, profiled
 
 def main():
     """
     Run complete model training pipeline
     """
+    parser = argparse.ArgumentParser(description="Run the complete model training pipeline")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    
     print("\n" + "="*60)
     print("BUG FIX MODEL TRAINING PIPELINE")
     print("="*60)
@@ -31,8 +37,9 @@ def main():
     try:
         # Step 1: Train model
         print("\n[STEP 1/2] Training model...")
-        trainer = BugFixTrainer()
-        result = trainer.train()
+        with profiled("trainer", args, config.PROFILE_DIR):
+            trainer = BugFixTrainer()
+            result = trainer.train()
         
         if result is None:
             print("\n⚠️  Training was interrupted")
@@ -41,8 +48,9 @@ def main():
         # Step 2: Evaluate model
         print("\n[STEP 2/2] Evaluating model...")
         model_path = config.MODEL_OUTPUT_DIR / "final"
-        evaluator = ModelEvaluator(str(model_path))
-        evaluator.evaluate(num_samples=5)
+        with profiled("evaluate", args, config.PROFILE_DIR):
+            evaluator = ModelEvaluator(str(model_path))
+            evaluator.evaluate(num_samples=5)
         
         print("\n" + "="*60)
         print("✅ TRAINING PIPELINE COMPLETE!")
@@ -0,0 +1,266 @@
+import difflib
+import json
+import math
+import re
+from collections import Counter
+import numpy as np
+
+try:
+    # Compiled edit distance, used when installed
+    from rapidfuzz.distance import Levenshtein as _compiled_levenshtein
+except ImportError:
+    _compiled_levenshtein = None
+
+# Identifiers/keywords, numbers, and single punctuation/operator characters
+TOKEN_PATTERN = re.compile(r'[A-Za-z_$][\w$]*|\d+(?:\.\d+)?[fFdDlL]?|\S')
+
+# Unigrams that count more in the CodeBLEU-style weighted n-gram match
+JAVA_KEYWORDS = {
+    "abstract", "assert", "boolean", "break", "byte", "case", "catch", "char", "class",
+    "const", "continue", "default", "do", "double", "else", "enum", "extends", "final",
+    "finally", "float", "for", "goto", "if", "implements", "import", "instanceof", "int",
+    "interface", "long", "native", "new", "package", "private", "protected", "public",
+    "return", "short", "static", "strictfp", "super", "switch", "synchronized", "this",
+    "throw", "throws", "transient", "try", "void", "volatile", "while", "null", "true", "false"
+}
+KEYWORD_WEIGHT = 5.0
+
+MAX_NGRAM = 4
+EDIT_DISTANCE_CHUNK = 256  # Pairs per vectorized edit-distance batch
+
+
+def tokenize_code(code):
+    """Split code into identifier, number and symbol tokens"""
+    return TOKEN_PATTERN.findall(code)
+
+
+def batch_edit_distances(sources, targets):
+    """
+    Token-level Levenshtein distance for many sequence pairs at once
+    Pairs are sorted by length and processed in chunks; each chunk runs one
+    vectorized dynamic-programming row update per source token for all pairs.
+    Args:
+        sources: List of token lists
+        targets: List of token lists (same length as sources)
+    Returns: NumPy array of distances
+    """
+    if _compiled_levenshtein is not None:
+        return np.array([
+            _compiled_levenshtein.distance(source, target)
+            for source, target in zip(sources, targets)
+        ])
+
+    # Shared integer ids so tokens compare as ints
+    vocabulary = {}
+    encoded_sources = [np.array([vocabulary.setdefault(t, len(vocabulary)) for t in s], dtype=np.int32) for s in sources]
+    encoded_targets = [np.array([vocabulary.setdefault(t, len(vocabulary)) for t in s], dtype=np.int32) for s in targets]
+
+    distances = np.zeros(len(sources), dtype=np.int64)
+    order = sorted(range(len(sources)), key=lambda i: (len(sources[i]), len(targets[i])))
+
+    for chunk_start in range(0, len(order), EDIT_DISTANCE_CHUNK):
+        chunk = order[chunk_start:chunk_start + EDIT_DISTANCE_CHUNK]
+        source_lengths = np.array([len(encoded_sources[i]) for i in chunk])
+        target_lengths = np.array([len(encoded_targets[i]) for i in chunk])
+        rows, columns = source_lengths.max(initial=0), target_lengths.max(initial=0)
+
+        # Padding ids never match anything
+        padded_sources = np.full((len(chunk), rows), -1, dtype=np.int32)
+        padded_targets = np.full((len(chunk), columns), -2, dtype=np.int32)
+        for k, i in enumerate(chunk):
+            padded_sources[k, :source_lengths[k]] = encoded_sources[i]
+            padded_targets[k, :target_lengths[k]] = encoded_targets[i]
+
+        column_index = np.arange(columns + 1, dtype=np.int32)
+        previous = np.tile(column_index, (len(chunk), 1))
+        result = previous[np.arange(len(chunk)), target_lengths].copy()
+
+        for row in range(1, rows + 1):
+            mismatch = padded_targets != padded_sources[:, row - 1:row]
+            current = np.empty_like(previous)
+            current[:, 0] = row
+            current[:, 1:] = np.minimum(previous[:, :-1] + mismatch, previous[:, 1:] + 1)
+            # Insertions: current[j] = min(current[j], current[j - 1] + 1)
+            current = np.minimum.accumulate(current - column_index, axis=1) + column_index
+
+            finished = source_lengths == row
+            result[finished] = current[finished, target_lengths[finished]]
+            previous = current
+
+        distances[chunk] = result
+
+    return distances
+
+
+def ngram_counts(tokens, n):
+    """Counter of n-grams in a token list"""
+    return Counter(tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+
+
+def bleu_statistics(prediction, reference):
+    """
+    Clipped n-gram matches and totals (n = 1..4) plus weighted unigram
+    matches where keywords count KEYWORD_WEIGHT times
+    Returns: Dictionary of per-sample statistics (summable over a corpus)
+    """
+    matches, totals = [], []
+    for n in range(1, MAX_NGRAM + 1):
+        predicted = ngram_counts(prediction, n)
+        expected = ngram_counts(reference, n)
+        matches.append(sum(min(count, expected[gram]) for gram, count in predicted.items()))
+        totals.append(max(len(prediction) - n + 1, 0))
+
+    expected_unigrams = Counter(reference)
+
+    def weight(token):
+        return KEYWORD_WEIGHT if token in JAVA_KEYWORDS else 1.0
+
+    weighted_matches = sum(
+        weight(token) * min(count, expected_unigrams[token])
+        for token, count in Counter(prediction).items()
+    )
+    weighted_total = sum(weight(token) for token in reference)
+
+    return {
+        "matches": matches,
+        "totals": totals,
+        "prediction_length": len(prediction),
+        "reference_length": len(reference),
+        "weighted_matches": weighted_matches,
+        "weighted_total": weighted_total,
+    }
+
+
+def bleu_from_statistics(matches, totals, prediction_length, reference_length, smooth=True):
+    """
+    BLEU-4 from n-gram statistics (add-one smoothing for n > 1 when smooth)
+    """
+    if prediction_length == 0:
+        return 0.0
+
+    log_precision = 0.0
+    for n, (match, total) in enumerate(zip(matches, totals), start=1):
+        if smooth and n > 1:
+            match, total = match + 1, total + 1
+        if match == 0 or total == 0:
+            return 0.0
+        log_precision += math.log(match / total) / MAX_NGRAM
+
+    brevity_penalty = 1.0 if prediction_length > reference_length else math.exp(1 - reference_length / prediction_length)
+    return brevity_penalty * math.exp(log_precision)
+
+
+def line_changes(source, code):
+    """
+    Lines removed from and added to source to produce code
+    Returns: Counter of ('-', line) and ('+', line) with whitespace-stripped lines
+    """
+    source_lines = [line.strip() for line in source.split('\n')]
+    code_lines = [line.strip() for line in code.split('\n')]
+
+    changes = Counter()
+    matcher = difflib.SequenceMatcher(None, source_lines, code_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        changes.update(('-', line) for line in source_lines[i1:i2] if line)
+        changes.update(('+', line) for line in code_lines[j1:j2] if line)
+    return changes
+
+
+def changed_lines_scores(source, target, prediction):
+    """
+    How many of the expected line changes the prediction makes
+    Returns: Tuple of (recall, precision) over removed/added lines
+    """
+    expected = line_changes(source, target)
+    predicted = line_changes(source, prediction)
+    common = sum((expected & predicted).values())
+
+    if not expected:
+        recall = 1.0 if not predicted else 0.0
+    else:
+        recall = common / sum(expected.values())
+    precision = common / sum(predicted.values()) if predicted else (1.0 if not expected else 0.0)
+
+    return recall, precision
+
+
+def score_predictions(inputs, targets, predictions):
+    """
+    Score a whole test set
+    Args:
+        inputs: Buggy code strings
+        targets: Expected fixed code strings
+        predictions: Predicted fixed code strings
+    Returns: Tuple of (per-sample score list, aggregate score dictionary)
+    """
+    target_tokens = [tokenize_code(code) for code in targets]
+    predicted_tokens = [tokenize_code(code) for code in predictions]
+
+    distances = batch_edit_distances(predicted_tokens, target_tokens)
+
+    per_sample = []
+    corpus = {"matches": [0] * MAX_NGRAM, "totals": [0] * MAX_NGRAM,
+              "prediction_length": 0, "reference_length": 0,
+              "weighted_matches": 0.0, "weighted_total": 0.0}
+
+    for i, (source, target, prediction) in enumerate(zip(inputs, targets, predictions)):
+        stats = bleu_statistics(predicted_tokens[i], target_tokens[i])
+        for key in ("matches", "totals"):
+            corpus[key] = [a + b for a, b in zip(corpus[key], stats[key])]
+        for key in ("prediction_length", "reference_length", "weighted_matches", "weighted_total"):
+            corpus[key] += stats[key]
+
+        longest = max(len(predicted_tokens[i]), len(target_tokens[i]), 1)
+        recall, precision = changed_lines_scores(source, target, prediction)
+        bleu = bleu_from_statistics(stats["matches"], stats["totals"],
+                                    stats["prediction_length"], stats["reference_length"])
+        weighted = stats["weighted_matches"] / stats["weighted_total"] if stats["weighted_total"] else 0.0
+
+        per_sample.append({
+            "index": i,
+            "exact_match": prediction.strip() == target.strip(),
+            "edit_distance": int(distances[i]),
+            "edit_similarity": float(1 - distances[i] / longest),
+            "bleu": bleu,
+            "codebleu_ngram": 0.5 * bleu + 0.5 * weighted,
+            "changed_lines_recall": recall,
+            "changed_lines_precision": precision,
+        })
+
+    count = max(len(per_sample), 1)
+    corpus_bleu = bleu_from_statistics(corpus["matches"], corpus["totals"],
+                                       corpus["prediction_length"], corpus["reference_length"], smooth=False)
+    corpus_weighted = corpus["weighted_matches"] / corpus["weighted_total"] if corpus["weighted_total"] else 0.0
+
+    aggregate = {
+        "samples": len(per_sample),
+        "exact_match": sum(s["exact_match"] for s in per_sample) / count * 100,
+        "mean_edit_distance": sum(s["edit_distance"] for s in per_sample) / count,
+        "mean_edit_similarity": sum(s["edit_similarity"] for s in per_sample) / count * 100,
+        "corpus_bleu": corpus_bleu * 100,
+        # CodeBLEU n-gram components only (no syntax/dataflow match)
+        "codebleu_ngram": (0.5 * corpus_bleu + 0.5 * corpus_weighted) * 100,
+        "changed_lines_recall": sum(s["changed_lines_recall"] for s in per_sample) / count * 100,
+        "changed_lines_precision": sum(s["changed_lines_precision"] for s in per_sample) / count * 100,
+    }
+
+    return per_sample, aggregate
+
+
+def write_scores(per_sample, output_file, metadata=None):
+    """
+    Write per-sample scores as JSON lines
+    Args:
+        per_sample: First result of score_predictions
+        output_file: Path of the .jsonl file
+        metadata: Optional list of per-sample metadata dictionaries to include
+    """
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        for i, scores in enumerate(per_sample):
+            record = dict(scores)
+            if metadata is not None:
+                record["metadata"] = metadata[i]
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
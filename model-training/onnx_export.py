@@ -0,0 +1,164 @@
+import argparse
+import torch
+import config
+from benchmark import benchmark_evaluator, print_comparison, save_report
+
+# Max absolute logit difference tolerated between PyTorch and ONNX Runtime
+PARITY_ATOL = 1e-3
+
+
+def export_onnx(model_path, output_dir=config.ONNX_OUTPUT_DIR):
+    """
+    Export a trained model to ONNX encoder/decoder graphs
+    Writes encoder_model.onnx, decoder_model.onnx and decoder_with_past_model.onnx
+    (the KV-cache variant used after the first decoding step)
+    Args:
+        model_path: Path to trained PyTorch model
+        output_dir: Directory for the ONNX graphs and tokenizer
+    Returns: Path to output directory
+    """
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    from transformers import RobertaTokenizer
+
+    print("="*60)
+    print("ONNX EXPORT")
+    print("="*60)
+
+    # ONNX export needs full weights, so merge adapter checkpoints first
+    from lora import is_adapter_dir, merge_adapter
+    if is_adapter_dir(model_path):
+        model_path = str(merge_adapter(model_path))
+
+    print(f"\nExporting model from: {model_path}")
+    model = ORTModelForSeq2SeqLM.from_pretrained(
+        model_path,
+        export=True,
+        use_cache=True,
+        provider="CPUExecutionProvider"
+    )
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    model.save_pretrained(str(output_dir))
+    RobertaTokenizer.from_pretrained(model_path).save_pretrained(str(output_dir))
+
+    for onnx_file in sorted(output_dir.glob("*.onnx")):
+        print(f"  {onnx_file.name}: {onnx_file.stat().st_size / 1e6:.1f} MB")
+
+    print(f"\n✅ ONNX model saved to: {output_dir}")
+    return output_dir
+
+
+def load_onnx_model(onnx_dir):
+    """
+    Load exported ONNX graphs on the ONNX Runtime CPU provider
+    The returned model supports .generate() (greedy and beam search) like
+    T5ForConditionalGeneration, so generate_fix works unchanged
+    """
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+
+    return ORTModelForSeq2SeqLM.from_pretrained(
+        str(onnx_dir),
+        use_cache=True,
+        provider="CPUExecutionProvider"
+    )
+
+
+def max_logit_difference(pytorch_evaluator, onnx_evaluator, buggy_code, target_code):
+    """
+    Compare teacher-forced decoder logits of both backends on one sample
+    Returns: Maximum absolute difference
+    """
+    tokenizer = pytorch_evaluator.tokenizer
+    inputs = tokenizer(buggy_code, max_length=config.MAX_INPUT_LENGTH, truncation=True, return_tensors='pt')
+    labels = tokenizer(target_code, max_length=config.MAX_TARGET_LENGTH, truncation=True, return_tensors='pt')
+
+    decoder_input_ids = pytorch_evaluator.model._shift_right(labels['input_ids'])
+
+    with torch.no_grad():
+        pytorch_logits = pytorch_evaluator.model(
+            input_ids=inputs['input_ids'],
+            attention_mask=inputs['attention_mask'],
+            decoder_input_ids=decoder_input_ids
+        ).logits
+        onnx_logits = onnx_evaluator.model(
+            input_ids=inputs['input_ids'],
+            attention_mask=inputs['attention_mask'],
+            decoder_input_ids=decoder_input_ids
+        ).logits
+
+    return (pytorch_logits - onnx_logits).abs().max().item()
+
+
+def check_parity(model_path, onnx_dir=config.ONNX_OUTPUT_DIR, num_samples=config.BENCHMARK_SAMPLES):
+    """
+    Parity test and latency benchmark of ONNX Runtime against PyTorch on CPU
+    Checks teacher-forced logits and generated fixes on the test split
+    Returns: True if both backends agree
+    """
+    from evaluate import ModelEvaluator
+
+    original_device = config.DEVICE
+    config.DEVICE = "cpu"
+
+    try:
+        pytorch_evaluator = ModelEvaluator(model_path, quantize=False, backend="pytorch")
+        onnx_evaluator = ModelEvaluator(str(onnx_dir), quantize=False, backend="onnx")
+    finally:
+        config.DEVICE = original_device
+
+    samples = pytorch_evaluator.test_dataset.data[:num_samples]
+
+    print("\nChecking logits parity...")
+    logit_diffs = [
+        max_logit_difference(pytorch_evaluator, onnx_evaluator, sample['input'], sample['target'])
+        for sample in samples
+    ]
+    worst_diff = max(logit_diffs) if logit_diffs else 0.0
+    print(f"  Max |logit difference|: {worst_diff:.2e} (tolerance {PARITY_ATOL:.0e})")
+
+    results = [
+        benchmark_evaluator(pytorch_evaluator, samples, "pytorch"),
+        benchmark_evaluator(onnx_evaluator, samples, "onnxruntime")
+    ]
+    print_comparison(results)
+
+    mismatches = sum(
+        1 for a, b in zip(results[0]['predictions'], results[1]['predictions'])
+        if a != b
+    )
+    results[1]['max_logit_diff'] = worst_diff
+    results[1]['generation_mismatches'] = mismatches
+    save_report(results, config.MODEL_OUTPUT_DIR / "onnx_report.json")
+
+    passed = worst_diff <= PARITY_ATOL and mismatches == 0
+    print(f"\n{'✅ PARITY OK' if passed else '❌ PARITY FAILED'}: "
+          f"{mismatches}/{len(samples)} generated fixes differ")
+
+    return passed
+
+
+if __name__ == "__main__":
+    from profiler import add_profile_argument, profiled
+
+    parser = argparse.ArgumentParser(description="Export the trained model to ONNX and benchmark it")
+    parser.add_argument("command", choices=["export", "parity"],
+                        help="export: write ONNX graphs; parity: compare against PyTorch and benchmark")
+    parser.add_argument("--num-samples", type=int, default=config.BENCHMARK_SAMPLES)
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with profiled("onnx_export", args, config.PROFILE_DIR):
+        model_path = config.MODEL_OUTPUT_DIR / "final"
+
+        if not model_path.exists():
+            print(f"❌ Model not found at {model_path}")
+            print("Train the model first using trainer.py")
+        elif args.command == "export":
+            export_onnx(str(model_path))
+        elif not config.ONNX_OUTPUT_DIR.exists():
+            print(f"❌ ONNX model not found at {config.ONNX_OUTPUT_DIR}")
+            print("Export it first: python onnx_export.py export")
+        else:
+            passed = check_parity(str(model_path), num_samples=args.num_samples)
+            if not passed:
+                raise SystemExit(1)
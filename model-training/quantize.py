@@ -0,0 +1,94 @@
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+import torch
+import config
+from benchmark import benchmark_evaluator, print_comparison, save_report
+
+
+def quantize_dynamic_int8(model):
+    """
+    Quantize all Linear layers of a model to int8 (dynamic activation scales)
+    Args:
+        model: T5ForConditionalGeneration in eval mode on CPU
+    Returns: Quantized model (modified in place)
+    """
+    return torch.quantization.quantize_dynamic(
+        model,
+        {torch.nn.Linear},
+        dtype=torch.qint8,
+        inplace=True
+    )
+
+
+def run_child(model_path, variant, num_samples):
+    """
+    Benchmark one variant inside a fresh process and print the result as JSON
+    (RSS is only comparable between variants that each start from a clean process)
+    """
+    from evaluate import ModelEvaluator
+
+    # Compare on CPU, which is where the quantized model would be deployed
+    config.DEVICE = "cpu"
+
+    evaluator = ModelEvaluator(model_path, quantize=variant == "int8-dynamic", backend="pytorch")
+    samples = evaluator.test_dataset.data[:num_samples]
+    result = benchmark_evaluator(evaluator, samples, variant)
+
+    print("QUANTIZATION_RESULT " + json.dumps(result))
+
+
+def compare_quantization(model_path, num_samples=config.BENCHMARK_SAMPLES):
+    """
+    Run fp32 and int8 variants of the model on the test split, each in its own
+    process, and report latency, memory and exact-match deltas
+    Args:
+        model_path: Path to trained model
+        num_samples: Number of test samples to benchmark on
+    Returns: List of benchmark results (fp32 first), or None if a run failed
+    """
+    results = []
+    for variant in ("fp32", "int8-dynamic"):
+        result = subprocess.run(
+            [sys.executable, __file__, "--child", str(model_path), "--variant", variant,
+             "--num-samples", str(num_samples)],
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).parent
+        )
+
+        lines = [line for line in result.stdout.splitlines() if line.startswith("QUANTIZATION_RESULT ")]
+        if result.returncode != 0 or not lines:
+            print(f"❌ {variant} run failed:\n{result.stderr}")
+            return None
+        results.append(json.loads(lines[-1][len("QUANTIZATION_RESULT "):]))
+
+    print_comparison(results)
+    save_report(results, config.MODEL_OUTPUT_DIR / "quantization_report.json")
+
+    return results
+
+
+if __name__ == "__main__":
+    from profiler import add_profile_argument, profiled
+
+    parser = argparse.ArgumentParser(description="Compare fp32 and int8 CPU inference")
+    parser.add_argument("--num-samples", type=int, default=config.BENCHMARK_SAMPLES)
+    parser.add_argument("--child", metavar="MODEL_PATH", help=argparse.SUPPRESS)
+    parser.add_argument("--variant", choices=["fp32", "int8-dynamic"], help=argparse.SUPPRESS)
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.variant, args.num_samples)
+    else:
+        with profiled("quantize", args, config.PROFILE_DIR):
+            model_path = config.MODEL_OUTPUT_DIR / "final"
+
+            if not model_path.exists():
+                print(f"❌ Model not found at {model_path}")
+                print("Train the model first using trainer.py")
+            else:
+                compare_quantization(str(model_path), num_samples=args.num_samples)
@@ -0,0 +1,433 @@
+import argparse
+import json
+import os
+import time
+import zlib
+import numpy as np
+from metrics import tokenize_code
+import config
+from code_text import normalize_code, sample_key  # shared/code_text.py
+
+MERSENNE_PRIME = (1 << 31) - 1
+INDEX_FORMAT = 2  # Bumped when signatures or files change; older indexes must be rebuilt
+
+
+class MinHasher:
+    """
+    MinHash signatures over token shingles
+    """
+    def __init__(self, num_permutations=config.MINHASH_PERMUTATIONS,
+                 shingle_size=config.SHINGLE_SIZE, seed=42):
+        """
+        Args:
+            num_permutations: Signature length
+            shingle_size: Tokens per shingle
+            seed: Seed of the hash permutations (must match between build and query)
+        """
+        self.num_permutations = num_permutations
+        self.shingle_size = shingle_size
+
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, MERSENNE_PRIME, size=num_permutations).astype(np.uint64)
+        self.b = rng.randint(0, MERSENNE_PRIME, size=num_permutations).astype(np.uint64)
+
+    def shingles(self, code):
+        """32-bit hashes of the token n-grams of code (comments are ignored)"""
+        tokens = tokenize_code(normalize_code(code))
+        n = min(self.shingle_size, len(tokens))
+        if n == 0:
+            return np.zeros(0, dtype=np.uint64)
+        grams = {' '.join(tokens[i:i + n]) for i in range(len(tokens) - n + 1)}
+        return np.array([zlib.crc32(gram.encode('utf-8')) for gram in grams], dtype=np.uint64)
+
+    def signature(self, code):
+        """
+        MinHash signature of code
+        Returns: uint32 array of num_permutations values
+        """
+        hashes = self.shingles(code) % MERSENNE_PRIME
+        if len(hashes) == 0:
+            return np.full(self.num_permutations, MERSENNE_PRIME, dtype=np.uint32)
+        # a * x < 2^31 * 2^31, so uint64 never overflows
+        permuted = (np.outer(hashes, self.a) + self.b) % MERSENNE_PRIME
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+def key_prefixes(keys):
+    """First 64 bits of sample_key() hex digests as a uint64 array"""
+    return np.array([int(key[:16], 16) for key in keys], dtype=np.uint64)
+
+
+def replace_file(path, write):
+    """
+    Write a file next to path and rename it over path, so readers and crashes
+    only ever see the old or the new contents
+    Args:
+        path: Destination file
+        write: Function writing the contents to a binary file object
+    """
+    temporary = path.with_name(path.name + ".tmp")
+    with open(temporary, 'wb') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+def sync_file(path):
+    """Flush an appended file to disk"""
+    with open(path, 'rb+') as f:
+        os.fsync(f.fileno())
+
+
+class RetrievalIndex:
+    """
+    Nearest historical bugs by MinHash similarity of their buggy code
+    On disk (data files are append-only, so new data is indexed incrementally):
+        signatures.u32  - one MinHash signature per record (memory-mapped)
+        offsets.u64     - byte offset of each record in records.jsonl (memory-mapped)
+        records.jsonl   - buggy code, fix and commit metadata
+        band_keys.u64   - (bands, count) LSH band keys, each band sorted
+        band_order.u32  - record of each entry in band_keys
+        keys.u64        - sorted sample_key() prefixes, to skip pairs already indexed
+        meta.json       - MinHash settings, record count and records.jsonl size
+    meta.json is replaced atomically after everything else is written and is
+    the commit point: rows past its count (from an interrupted add) are
+    truncated on the next add, and sorted files of the wrong size are rebuilt.
+    LSH: signatures are split into bands; records sharing any band with the
+    query are candidates, which are then ranked by estimated Jaccard similarity.
+    """
+    def __init__(self, index_dir=config.RETRIEVAL_INDEX_DIR,
+                 num_permutations=config.MINHASH_PERMUTATIONS,
+                 bands=config.LSH_BANDS,
+                 shingle_size=config.SHINGLE_SIZE):
+        """
+        Args:
+            index_dir: Directory holding the index files
+            num_permutations, bands, shingle_size: Used when creating a new index;
+                an existing index keeps the settings it was built with
+        Raises: ValueError if the index was built by an older version
+        """
+        self.index_dir = index_dir
+        self.meta_file = index_dir / "meta.json"
+        self.signatures_file = index_dir / "signatures.u32"
+        self.offsets_file = index_dir / "offsets.u64"
+        self.records_file = index_dir / "records.jsonl"
+        self.band_keys_file = index_dir / "band_keys.u64"
+        self.band_order_file = index_dir / "band_order.u32"
+        self.keys_file = index_dir / "keys.u64"
+
+        if self.meta_file.exists():
+            with open(self.meta_file, 'r') as f:
+                self.meta = json.load(f)
+            if self.meta.get("format") != INDEX_FORMAT:
+                raise ValueError(f"Retrieval index at {index_dir} has an old format; "
+                                 f"delete it and run retrieval.py build")
+        else:
+            if num_permutations % bands:
+                raise ValueError(f"{num_permutations} permutations can't be split into {bands} bands")
+            self.meta = {
+                "format": INDEX_FORMAT,
+                "num_permutations": num_permutations,
+                "bands": bands,
+                "shingle_size": shingle_size,
+                "count": 0,
+                "records_bytes": 0,
+            }
+
+        self.hasher = MinHasher(self.meta["num_permutations"], self.meta["shingle_size"])
+        self.bands = self.meta["bands"]
+        self.rows = self.meta["num_permutations"] // self.bands
+        self.load()
+
+    def __len__(self):
+        return self.meta["count"]
+
+    def load(self):
+        """Memory-map the index files (sorted files are rebuilt if they don't match count)"""
+        count = self.meta["count"]
+        if count == 0:
+            self.signatures = np.zeros((0, self.meta["num_permutations"]), dtype=np.uint32)
+            self.offsets = np.zeros(0, dtype=np.uint64)
+            self.sorted_band_keys = np.zeros((self.bands, 0), dtype=np.uint64)
+            self.band_order = np.zeros((self.bands, 0), dtype=np.uint32)
+            self.keys = np.zeros(0, dtype=np.uint64)
+            return
+
+        self.signatures = np.memmap(self.signatures_file, dtype=np.uint32, mode='r',
+                                    shape=(count, self.meta["num_permutations"]))
+        self.offsets = np.memmap(self.offsets_file, dtype=np.uint64, mode='r', shape=(count,))
+
+        sorted_files = [(self.band_keys_file, self.bands * count * 8),
+                        (self.band_order_file, self.bands * count * 4),
+                        (self.keys_file, count * 8)]
+        if any(not path.exists() or path.stat().st_size != size for path, size in sorted_files):
+            print(f"⚠️  Rebuilding sorted retrieval keys in {self.index_dir}")
+            self.rebuild_sorted_files()
+
+        self.sorted_band_keys = np.memmap(self.band_keys_file, dtype=np.uint64, mode='r',
+                                          shape=(self.bands, count))
+        self.band_order = np.memmap(self.band_order_file, dtype=np.uint32, mode='r',
+                                    shape=(self.bands, count))
+        self.keys = np.memmap(self.keys_file, dtype=np.uint64, mode='r', shape=(count,))
+
+    def rebuild_sorted_files(self):
+        """Recompute band_keys/band_order/keys from signatures and records (full sort)"""
+        band_keys = self.band_hashes(self.signatures).T
+        band_order = np.argsort(band_keys, axis=1, kind='stable').astype(np.uint32)
+        sorted_keys = np.take_along_axis(band_keys, band_order.astype(np.int64), axis=1)
+
+        keys = []
+        with open(self.records_file, 'rb') as f:
+            for offset in self.offsets:
+                f.seek(int(offset))
+                keys.append(json.loads(f.readline())['key'])
+
+        replace_file(self.band_keys_file, lambda f: f.write(sorted_keys.tobytes()))
+        replace_file(self.band_order_file, lambda f: f.write(band_order.tobytes()))
+        replace_file(self.keys_file, lambda f: f.write(np.sort(key_prefixes(keys)).tobytes()))
+
+    def band_hashes(self, signatures):
+        """
+        Combine each band's rows into one 64-bit key
+        Args:
+            signatures: (n, num_permutations) array
+        Returns: (n, bands) uint64 array
+        """
+        banded = np.asarray(signatures, dtype=np.uint64).reshape(len(signatures), self.bands, self.rows)
+        keys = np.zeros((len(signatures), self.bands), dtype=np.uint64)
+        with np.errstate(over='ignore'):
+            for row in range(self.rows):
+                keys = keys * np.uint64(1000003) + banded[:, :, row]
+        return keys
+
+    def is_indexed(self, key):
+        """True if a pair with this sample_key() is in the index"""
+        prefix = key_prefixes([key])[0]
+        position = np.searchsorted(self.keys, prefix)
+        return position < len(self.keys) and self.keys[position] == prefix
+
+    def truncate_uncommitted(self):
+        """Drop rows an interrupted add() appended past the committed count"""
+        count = self.meta["count"]
+        committed = [(self.records_file, self.meta["records_bytes"]),
+                     (self.signatures_file, count * self.meta["num_permutations"] * 4),
+                     (self.offsets_file, count * 8)]
+        for path, size in committed:
+            if path.exists() and path.stat().st_size > size:
+                os.truncate(path, size)
+
+    def write_merged(self, new_band_keys, new_keys):
+        """
+        Merge new rows into the sorted band keys and sample keys
+        Only the new rows are sorted; each band is merged into the existing
+        sorted column with one searchsorted/insert pass (O(count) per band).
+        Args:
+            new_band_keys: (m, bands) band keys of records count..count+m-1
+            new_keys: uint64 key prefixes of the new records
+        """
+        count = self.meta["count"]
+        new_ids = np.arange(count, count + len(new_band_keys), dtype=np.uint32)
+
+        def write_bands(f, keys_file):
+            for band in range(self.bands):
+                order = np.argsort(new_band_keys[:, band], kind='stable')
+                column = np.asarray(self.sorted_band_keys[band])
+                positions = np.searchsorted(column, new_band_keys[order, band], side='right')
+                if keys_file:
+                    merged = np.insert(column, positions, new_band_keys[order, band])
+                else:
+                    merged = np.insert(np.asarray(self.band_order[band]), positions, new_ids[order])
+                f.write(merged.tobytes())
+
+        new_keys = np.sort(new_keys)
+        merged_keys = np.insert(np.asarray(self.keys), np.searchsorted(self.keys, new_keys), new_keys)
+
+        replace_file(self.band_keys_file, lambda f: write_bands(f, True))
+        replace_file(self.band_order_file, lambda f: write_bands(f, False))
+        replace_file(self.keys_file, lambda f: f.write(merged_keys.tobytes()))
+
+    def add(self, items):
+        """
+        Append new buggy/fixed pairs to the index
+        Args:
+            items: Processed records ({"input", "target", "metadata"})
+        Returns: Number of records added (duplicates are skipped)
+        """
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.truncate_uncommitted()
+
+        new_keys, new_signatures, new_offsets = [], [], []
+        seen = set()
+        with open(self.records_file, 'ab') as f:
+            for item in items:
+                key = sample_key(item)
+                if key in seen or self.is_indexed(key):
+                    continue
+                seen.add(key)
+
+                record = {"key": key, "input": item['input'], "target": item['target'],
+                          "metadata": item.get('metadata', {})}
+                new_offsets.append(f.tell())
+                f.write((json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8'))
+                new_keys.append(key)
+                new_signatures.append(self.hasher.signature(item['input']))
+            records_bytes = f.tell()
+
+        if not new_signatures:
+            return 0
+
+        signatures = np.stack(new_signatures).astype(np.uint32)
+        with open(self.signatures_file, 'ab') as f:
+            f.write(signatures.tobytes())
+        with open(self.offsets_file, 'ab') as f:
+            f.write(np.array(new_offsets, dtype=np.uint64).tobytes())
+        for path in (self.records_file, self.signatures_file, self.offsets_file):
+            sync_file(path)
+
+        self.write_merged(self.band_hashes(signatures), key_prefixes(new_keys))
+
+        # Commit point: until meta.json is replaced the index still has the old count
+        self.meta["count"] += len(new_signatures)
+        self.meta["records_bytes"] = records_bytes
+        replace_file(self.meta_file, lambda f: f.write(json.dumps(self.meta, indent=2).encode('utf-8')))
+        self.load()
+
+        return len(new_signatures)
+
+    def record(self, index):
+        """Read one record from records.jsonl"""
+        with open(self.records_file, 'rb') as f:
+            f.seek(int(self.offsets[index]))
+            return json.loads(f.readline())
+
+    def candidates(self, signature):
+        """Records sharing at least one LSH band with the signature"""
+        query_keys = self.band_hashes(signature[None, :])[0]
+        found = []
+        for band in range(self.bands):
+            column = self.sorted_band_keys[band]
+            start = np.searchsorted(column, query_keys[band], side='left')
+            end = np.searchsorted(column, query_keys[band], side='right')
+            if end > start:
+                found.append(self.band_order[band, start:end])
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(found)).astype(np.int64)
+
+    def search(self, code, k=config.RETRIEVAL_TOP_K, min_similarity=config.RETRIEVAL_MIN_SIMILARITY):
+        """
+        Most similar historical bugs
+        Args:
+            code: Query buggy code
+            k: Max results
+            min_similarity: Minimum estimated Jaccard similarity of token shingles
+        Returns: List of dictionaries with similarity, buggy_code, fixed_code, metadata
+        """
+        if len(self) == 0:
+            return []
+
+        signature = self.hasher.signature(code)
+        candidates = self.candidates(signature)
+        if len(candidates) == 0:
+            return []
+
+        similarity = (self.signatures[candidates] == signature).mean(axis=1)
+        keep = similarity >= min_similarity
+        candidates, similarity = candidates[keep], similarity[keep]
+
+        top = np.argsort(-similarity, kind='stable')[:k]
+        results = []
+        for i in top:
+            record = self.record(candidates[i])
+            results.append({
+                "similarity": float(similarity[i]),
+                "buggy_code": record['input'],
+                "fixed_code": record['target'],
+                "metadata": record['metadata'],
+            })
+        return results
+
+
+def build_index(data_files=None, index_dir=config.RETRIEVAL_INDEX_DIR):
+    """
+    Add the processed splits to the retrieval index (only pairs not indexed yet)
+    Args:
+        data_files: JSON split files (default: train and validation)
+        index_dir: Index directory
+    Returns: RetrievalIndex
+    """
+    print("="*60)
+    print("RETRIEVAL INDEX")
+    print("="*60)
+
+    data_files = data_files or [config.TRAIN_FILE, config.VAL_FILE]
+    index = RetrievalIndex(index_dir)
+    print(f"\nExisting records: {len(index)}")
+
+    for data_file in data_files:
+        if not data_file.exists():
+            print(f"⚠️  Skipping missing file: {data_file}")
+            continue
+
+        with open(data_file, 'r', encoding='utf-8') as f:
+            items = json.load(f)
+
+        start = time.perf_counter()
+        added = index.add(items)
+        print(f"  {data_file.name}: {added} new of {len(items)} pairs "
+              f"({time.perf_counter() - start:.1f}s)")
+
+    print(f"\n✅ Index has {len(index)} records")
+    print(f"📁 Index saved to: {index_dir}")
+    return index
+
+
+def benchmark_queries(index, num_queries=config.BENCHMARK_SAMPLES):
+    """Time queries using test split inputs"""
+    if not config.TEST_FILE.exists() or len(index) == 0:
+        print("❌ Need a test split and a non-empty index")
+        return
+
+    with open(config.TEST_FILE, 'r', encoding='utf-8') as f:
+        queries = [item['input'] for item in json.load(f)[:num_queries]]
+
+    latencies, found = [], 0
+    for code in queries:
+        start = time.perf_counter()
+        results = index.search(code)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found += bool(results)
+
+    latencies.sort()
+    print(f"\n{len(queries)} queries: p50 {latencies[len(latencies) // 2]:.2f}ms, "
+          f"max {latencies[-1]:.2f}ms, {found} with a match")
+
+
+if __name__ == "__main__":
+    from profiler import add_profile_argument, profiled
+
+    parser = argparse.ArgumentParser(description="Build or query the historical fix retrieval index")
+    parser.add_argument("command", choices=["build", "query", "benchmark"])
+    parser.add_argument("--file", help="Code file to query with")
+    parser.add_argument("-k", type=int, default=config.RETRIEVAL_TOP_K)
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with profiled("retrieval", args, config.PROFILE_DIR):
+        if args.command == "build":
+            build_index()
+        elif args.command == "benchmark":
+            benchmark_queries(RetrievalIndex())
+        else:
+            if not args.file:
+                parser.error("query needs --file")
+            with open(args.file, 'r', encoding='utf-8') as f:
+                code = f.read()
+            for result in RetrievalIndex().search(code, k=args.k):
+                print("="*60)
+                print(f"Similarity: {result['similarity']:.2f}  "
+                      f"{result['metadata'].get('repo')}@{str(result['metadata'].get('commit'))[:8]}")
+                print(f"Commit: {result['metadata'].get('message', '').strip()[:100]}")
+                print("\nFix:")
+                print(result['fixed_code'][:500])
@@ -0,0 +1,230 @@
+import argparse
+import time
+import torch
+import config
+from benchmark import benchmark_evaluator, print_comparison, save_report
+
+
+class PromptLookupDecoder:
+    """
+    Greedy decoding with drafts copied from the input (prompt lookup)
+    A fix is mostly the buggy code copied verbatim, so the tokens that followed
+    the current output suffix in the input are a good guess for what comes next.
+    Each decoder pass verifies a whole draft and keeps the longest prefix that
+    greedy decoding would have produced, so the output is the same as plain
+    greedy decoding while copied stretches cost one pass instead of one per token.
+    """
+    def __init__(self, model, ngram_size=config.SPECULATIVE_NGRAM_SIZE,
+                 num_draft_tokens=config.SPECULATIVE_DRAFT_TOKENS):
+        """
+        Args:
+            model: T5ForConditionalGeneration (PyTorch backend)
+            ngram_size: Longest output suffix matched against the input
+            num_draft_tokens: Max draft tokens verified per decoder pass
+        """
+        self.model = model
+        self.ngram_size = ngram_size
+        self.num_draft_tokens = num_draft_tokens
+
+        self.decoder_start_token_id = model.config.decoder_start_token_id
+        self.eos_token_id = model.config.eos_token_id
+
+        # Statistics since the last reset_stats()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset draft/verification counters"""
+        self.stats = {"decoder_passes": 0, "generated_tokens": 0, "draft_tokens": 0, "accepted_draft_tokens": 0}
+
+    def build_ngram_index(self, input_tokens):
+        """
+        Map every n-gram (n = 1..ngram_size) of the input to the positions right after it
+        Returns: Dictionary of tuple -> list of continuation positions
+        """
+        index = {}
+        for n in range(1, self.ngram_size + 1):
+            for start in range(len(input_tokens) - n):
+                index.setdefault(tuple(input_tokens[start:start + n]), []).append(start + n)
+        return index
+
+    def find_draft(self, input_tokens, ngram_index, output_tokens, cursor):
+        """
+        Draft continuation of output_tokens, copied from the input
+        Args:
+            input_tokens: Input token ids (no special tokens)
+            ngram_index: Result of build_ngram_index(input_tokens)
+            output_tokens: Tokens generated so far (without the start token)
+            cursor: Input position the previous draft was copied up to
+        Returns: Tuple of (draft token list, new cursor)
+        """
+        for n in range(min(self.ngram_size, len(output_tokens)), 0, -1):
+            positions = ngram_index.get(tuple(output_tokens[-n:]))
+            if not positions:
+                continue
+            # Prefer the first match at or after where we were copying from,
+            # otherwise repeated lines (e.g. "}") would jump back to the top
+            position = next((p for p in positions if p >= cursor), positions[0])
+            draft = input_tokens[position:position + self.num_draft_tokens]
+            return draft, position
+        return [], cursor
+
+    @staticmethod
+    def crop_cache(past_key_values, length):
+        """Drop self-attention cache entries past length (cross-attention is unchanged)"""
+        return tuple(
+            (layer[0][:, :, :length], layer[1][:, :, :length]) + tuple(layer[2:])
+            for layer in past_key_values
+        )
+
+    def generate(self, input_ids, attention_mask, max_new_tokens, logits_processor=None, special_token_ids=()):
+        """
+        Greedy decode a single input
+        Args:
+            input_ids: Tokenized input (1, length)
+            attention_mask: Attention mask of the input
+            max_new_tokens: Output token budget
+            logits_processor: Optional LogitsProcessorList applied as in greedy search
+            special_token_ids: Token ids never used as draft anchors
+        Returns: Tensor (1, length) of generated ids, starting with the decoder start token
+        """
+        if input_ids.shape[0] != 1:
+            raise ValueError("Speculative decoding supports a single input at a time")
+
+        device = input_ids.device
+        special_token_ids = set(special_token_ids)
+        input_tokens = [
+            token for token, keep in zip(input_ids[0].tolist(), attention_mask[0].tolist())
+            if keep and token not in special_token_ids
+        ]
+        ngram_index = self.build_ngram_index(input_tokens)
+
+        with torch.no_grad():
+            encoder_outputs = self.model.get_encoder()(input_ids=input_ids, attention_mask=attention_mask)
+
+            sequence = [self.decoder_start_token_id]
+            past_key_values = None
+            past_length = 0
+            cursor = 0
+
+            while len(sequence) - 1 < max_new_tokens:
+                draft, cursor = self.find_draft(input_tokens, ngram_index, sequence[1:], cursor)
+                # Leave room for the token the verification pass adds itself
+                draft = draft[:max_new_tokens - len(sequence)]
+
+                step_tokens = sequence[past_length:] + draft
+                outputs = self.model(
+                    encoder_outputs=encoder_outputs,
+                    attention_mask=attention_mask,
+                    decoder_input_ids=torch.tensor([step_tokens], device=device),
+                    past_key_values=past_key_values,
+                    use_cache=True
+                )
+                self.stats["decoder_passes"] += 1
+                self.stats["draft_tokens"] += len(draft)
+
+                # Logits for the position after the last already-accepted token
+                logits = outputs.logits[0, len(step_tokens) - len(draft) - 1:]
+
+                accepted = []
+                for position in range(len(draft) + 1):
+                    scores = logits[position:position + 1]
+                    if logits_processor is not None:
+                        prefix = torch.tensor([sequence + accepted], device=device)
+                        scores = logits_processor(prefix, scores.clone())
+                    token = int(scores.argmax(dim=-1).item())
+                    accepted.append(token)
+
+                    if token == self.eos_token_id or len(sequence) - 1 + len(accepted) >= max_new_tokens:
+                        break
+                    if position == len(draft) or draft[position] != token:
+                        break
+
+                matched = 0
+                for expected, token in zip(draft, accepted):
+                    if expected != token:
+                        break
+                    matched += 1
+                self.stats["accepted_draft_tokens"] += matched
+                self.stats["generated_tokens"] += len(accepted)
+
+                sequence.extend(accepted)
+                if accepted[-1] == self.eos_token_id:
+                    break
+
+                # Keep the cache only for tokens whose keys are now final;
+                # the last accepted token is fed on the next pass
+                past_length = len(sequence) - 1
+                past_key_values = self.crop_cache(outputs.past_key_values, past_length)
+                if draft:
+                    cursor += matched
+
+        return torch.tensor([sequence], device=device)
+
+
+def compare_speculative(model_path, num_samples=config.BENCHMARK_SAMPLES):
+    """
+    Benchmark prompt-lookup speculative decoding against plain greedy decoding
+    Outputs are expected to be identical; only latency should change
+    Args:
+        model_path: Path to trained model
+        num_samples: Number of test samples to benchmark on
+    Returns: List of benchmark results (greedy first)
+    """
+    from evaluate import ModelEvaluator
+    from generation import GenerationPolicy
+
+    evaluator = ModelEvaluator(model_path, quantize=False, backend="pytorch")
+    samples = evaluator.test_dataset.data[:num_samples]
+
+    evaluator.generation_policy = GenerationPolicy(num_beams=1)
+    greedy_result = benchmark_evaluator(evaluator, samples, "greedy")
+
+    evaluator.generation_policy = GenerationPolicy(num_beams=1, speculative=True)
+    evaluator.speculative_decoder.reset_stats()
+    start = time.perf_counter()
+    speculative_result = benchmark_evaluator(evaluator, samples, "prompt-lookup")
+    elapsed = time.perf_counter() - start
+
+    stats = evaluator.speculative_decoder.stats
+    speculative_result.update(stats)
+    if stats["decoder_passes"]:
+        speculative_result["tokens_per_pass"] = stats["generated_tokens"] / stats["decoder_passes"]
+    if stats["draft_tokens"]:
+        speculative_result["draft_acceptance"] = stats["accepted_draft_tokens"] / stats["draft_tokens"]
+
+    results = [greedy_result, speculative_result]
+    print_comparison(results)
+
+    mismatches = sum(
+        1 for a, b in zip(greedy_result['predictions'], speculative_result['predictions'])
+        if a != b
+    )
+    speculative_result['greedy_mismatches'] = mismatches
+
+    print(f"Decoder passes: {stats['decoder_passes']} for {stats['generated_tokens']} tokens "
+          f"({speculative_result.get('tokens_per_pass', 0):.2f} tokens/pass) in {elapsed:.1f}s")
+    print(f"Draft acceptance: {speculative_result.get('draft_acceptance', 0) * 100:.1f}%")
+    print(f"Speedup: {greedy_result['mean_latency_ms'] / max(speculative_result['mean_latency_ms'], 1e-9):.2f}x")
+    print(f"{'✅' if mismatches == 0 else '❌'} {mismatches}/{len(samples)} outputs differ from greedy")
+
+    save_report(results, config.MODEL_OUTPUT_DIR / "speculative_report.json")
+
+    return results
+
+
+if __name__ == "__main__":
+    from profiler import add_profile_argument, profiled
+
+    parser = argparse.ArgumentParser(description="Benchmark prompt-lookup speculative decoding")
+    parser.add_argument("--num-samples", type=int, default=config.BENCHMARK_SAMPLES)
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with profiled("speculative", args, config.PROFILE_DIR):
+        model_path = config.MODEL_OUTPUT_DIR / "final"
+
+        if not model_path.exists():
+            print(f"❌ Model not found at {model_path}")
+            print("Train the model first using trainer.py")
+        else:
+            compare_speculative(str(model_path), num_samples=args.num_samples)
@@ -0,0 +1,126 @@
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+import config
+
+# Sample used for the first prediction of each cold start
+SAMPLE_CODE = """public int sum(int[] values) {
+    int total = 0;
+    for (int i = 0; i <= values.length; i++) {
+        total += values[i];
+    }
+    return total;
+}"""
+
+
+def convert_to_safetensors(model_path):
+    """
+    Re-save a model that only has .bin weights as safetensors
+    (models trained before save_safetensors was enabled)
+    """
+    from transformers import T5ForConditionalGeneration
+
+    model_path = Path(model_path)
+    if (model_path / "model.safetensors").exists():
+        print(f"✅ Already has safetensors weights: {model_path}")
+        return
+
+    print(f"Converting {model_path} to safetensors...")
+    model = T5ForConditionalGeneration.from_pretrained(str(model_path))
+    model.save_pretrained(str(model_path), safe_serialization=True)
+    print(f"✅ Saved: {model_path / 'model.safetensors'}")
+
+
+def run_child(model_path):
+    """
+    Measure one cold start inside a fresh process and print timings as JSON
+    """
+    start = time.perf_counter()
+    from evaluate import ModelEvaluator
+    module_import = time.perf_counter() - start
+
+    evaluator = ModelEvaluator(model_path)
+
+    phase_start = time.perf_counter()
+    evaluator.generate_fix(SAMPLE_CODE)
+    first_prediction = time.perf_counter() - phase_start
+
+    timings = {"module_import": module_import}
+    timings.update(evaluator.startup_timings)
+    timings["first_prediction"] = first_prediction
+    timings["start_to_first_prediction"] = time.perf_counter() - start
+
+    print("STARTUP_TIMINGS " + json.dumps(timings))
+
+
+def benchmark_startup(model_path, runs=3):
+    """
+    Start fresh processes and report startup phase timings
+    Args:
+        model_path: Path to trained model
+        runs: Number of cold starts to average over
+    Returns: Dictionary of mean seconds per phase
+    """
+    print("="*60)
+    print("STARTUP BENCHMARK")
+    print("="*60)
+
+    all_timings = []
+    for run in range(1, runs + 1):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, __file__, "--child", str(model_path)],
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).parent
+        )
+        wall_time = time.perf_counter() - start
+
+        lines = [line for line in result.stdout.splitlines() if line.startswith("STARTUP_TIMINGS ")]
+        if result.returncode != 0 or not lines:
+            print(f"❌ Run {run} failed:\n{result.stderr}")
+            return None
+
+        timings = json.loads(lines[-1][len("STARTUP_TIMINGS "):])
+        # Includes interpreter startup, which in-process timers cannot see
+        timings["process_wall_time"] = wall_time
+        all_timings.append(timings)
+        print(f"  Run {run}: {wall_time:.2f}s to first prediction")
+
+    phases = list(all_timings[0].keys())
+    means = {phase: sum(t.get(phase, 0.0) for t in all_timings) / len(all_timings) for phase in phases}
+
+    print(f"\nMean over {runs} cold starts:")
+    for phase, seconds in means.items():
+        print(f"  {phase:<28} {seconds:8.3f}s")
+
+    output_file = config.MODEL_OUTPUT_DIR / "startup_report.json"
+    with open(output_file, 'w') as f:
+        json.dump({"runs": all_timings, "mean": means}, indent=2, fp=f)
+    print(f"\n📁 Report saved to: {output_file}")
+
+    return means
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure ModelEvaluator cold-start time")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--convert", action="store_true",
+                        help="Convert .bin weights of the final model to safetensors")
+    parser.add_argument("--child", metavar="MODEL_PATH", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    model_path = config.MODEL_OUTPUT_DIR / "final"
+
+    if args.child:
+        run_child(args.child)
+    elif not model_path.exists():
+        print(f"❌ Model not found at {model_path}")
+        print("Train the model first using trainer.py")
+    elif args.convert:
+        convert_to_safetensors(model_path)
+    else:
+        benchmark_startup(model_path, runs=args.runs)
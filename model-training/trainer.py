@@ -4,19 +4,65 @@ from transformers import (
     RobertaTokenizer,
     Trainer,
     TrainingArguments,
-    EarlyStoppingCallback
+    EarlyStoppingCallback,
+    DataCollatorWithPadding
 )
-from dataset import load_datasets
+from dataset import (
+    BugFixDataset,
+    load_datasets,
+    load_items,
+    max_target_length,
+    select_incremental
+)
+from callbacks import ThroughputCallback
 import config
+from code_text import sample_key  # shared/code_text.py
+import json
+import math
 import os
+import shutil
+import time
+from pathlib import Path
+
+
+def load_trained_keys(model_path):
+    """Sample keys a saved model was trained on, or None if it has no manifest"""
+    manifest = model_path / config.TRAINED_SAMPLES_FILE
+    if not manifest.exists():
+        return None
+    with open(manifest, 'r') as f:
+        return set(json.load(f))
+
+
+def save_trained_keys(model_path, keys):
+    """Write the trained-sample manifest next to the model"""
+    with open(model_path / config.TRAINED_SAMPLES_FILE, 'w') as f:
+        json.dump(sorted(keys), f)
+
 
 class BugFixTrainer:
-    def __init__(self):
-        """Initialize trainer"""
+    def __init__(self, incremental=False):
+        """
+        Initialize trainer
+        Args:
+            incremental: Warm-start from the final model and optimizer state and
+                         train only on samples it hasn't seen (plus a replay of old ones)
+        """
         print("="*60)
-        print("BUG FIX MODEL TRAINER")
+        print("BUG FIX MODEL TRAINER" + (" (INCREMENTAL)" if incremental else ""))
         print("="*60)
         
+        self.incremental = incremental
+        self.final_model_path = config.MODEL_OUTPUT_DIR / "final"
+        
+        if incremental:
+            self.trained_keys = load_trained_keys(self.final_model_path)
+            if self.trained_keys is None:
+                raise FileNotFoundError(
+                    f"No {config.TRAINED_SAMPLES_FILE} in {self.final_model_path}; "
+                    "run a full training first"
+                )
+        
         # Check GPU availability
         self.device = torch.device(config.DEVICE if torch.cuda.is_available() else "cpu")
         print(f"\nDevice: {self.device}")
@@ -27,6 +73,28 @@ class BugFixTrainer:
         else:
             print("⚠️  WARNING: GPU not available, training will be SLOW")
         
+        if incremental:
+            self.load_previous_model()
+        else:
+            self.load_pretrained_model()
+        
+        self.batch_size = config.LORA_BATCH_SIZE if self.use_lora else config.BATCH_SIZE
+        
+        # Load datasets
+        print("\nLoading datasets...")
+        if incremental:
+            self.load_incremental_datasets()
+        else:
+            self.train_dataset, self.val_dataset, self.test_dataset = load_datasets(
+                self.tokenizer, self.target_format
+            )
+        
+        print(f"  Train: {len(self.train_dataset)} samples")
+        print(f"  Validation: {len(self.val_dataset)} samples")
+        print(f"  Test: {len(self.test_dataset)} samples")
+        
+    def load_pretrained_model(self):
+        """Start from the pre-trained CodeT5 checkpoint"""
         # Load tokenizer
         print(f"\nLoading tokenizer: {config.MODEL_NAME}")
         self.tokenizer = RobertaTokenizer.from_pretrained(config.MODEL_NAME)
@@ -36,38 +104,193 @@ class BugFixTrainer:
         self.model = T5ForConditionalGeneration.from_pretrained(config.MODEL_NAME)
         self.model.to(self.device)
         
+        # Saved with the model so evaluation knows how to decode its outputs
+        self.target_format = config.TARGET_FORMAT
+        self.model.config.target_format = self.target_format
+        print(f"Target format: {self.target_format}")
+        
         print(f"Model parameters: {self.model.num_parameters() / 1e6:.1f}M")
         
-        # Load datasets
-        print("\nLoading datasets...")
-        self.train_dataset, self.val_dataset, self.test_dataset = load_datasets(self.tokenizer)
+        # Parameter-efficient mode: train low-rank adapters only
+        self.use_lora = config.USE_LORA
+        if self.use_lora:
+            from lora import apply_lora
+            print("\nLoRA mode: training adapters only")
+            self.model_config = self.model.config
+            self.model = apply_lora(self.model)
+    
+    def load_previous_model(self):
+        """Continue from the last final model (full weights or adapter, whichever it is)"""
+        from lora import is_adapter_dir
         
-        print(f"  Train: {len(self.train_dataset)} samples")
-        print(f"  Validation: {len(self.val_dataset)} samples")
-        print(f"  Test: {len(self.test_dataset)} samples")
+        print(f"\nLoading previous model: {self.final_model_path}")
+        self.tokenizer = RobertaTokenizer.from_pretrained(str(self.final_model_path))
         
+        self.use_lora = is_adapter_dir(self.final_model_path)
+        if self.use_lora:
+            from lora import load_trainable_adapter
+            print("LoRA checkpoint: continuing to train its adapters")
+            self.model, self.model_config = load_trainable_adapter(self.final_model_path)
+        else:
+            self.model = T5ForConditionalGeneration.from_pretrained(str(self.final_model_path))
+        self.model.to(self.device)
+        
+        # Keep the format the model was trained with, whatever config says now
+        self.target_format = getattr(self.model.config, "target_format", "full")
+        print(f"Target format: {self.target_format}")
+    
+    def load_incremental_datasets(self):
+        """New training samples plus a replay sample of ones the model has seen"""
+        target_length = max_target_length(self.target_format)
+        
+        train_items = load_items(config.TRAIN_FILE)
+        self.new_items, replayed = select_incremental(train_items, self.trained_keys)
+        print(f"  New samples: {len(self.new_items)} "
+              f"(+{len(replayed)} replayed of {len(train_items) - len(self.new_items)} already trained)")
+        
+        self.train_dataset = BugFixDataset(
+            config.TRAIN_FILE, self.tokenizer, config.MAX_INPUT_LENGTH, target_length,
+            self.target_format, items=self.new_items + replayed, drop_unlearnable=True
+        )
+        # Validation covers old and new data, so forgetting shows up in eval_loss;
+        # samples the previous model trained on (e.g. from a split made before
+        # splits were assigned by key) would favor it in the comparison
+        val_items = load_items(config.VAL_FILE)
+        unseen_val_items = [item for item in val_items if sample_key(item) not in self.trained_keys]
+        if len(unseen_val_items) < len(val_items):
+            print(f"  Validation: excluded {len(val_items) - len(unseen_val_items)} samples "
+                  f"the previous model trained on")
+        self.val_dataset = BugFixDataset(
+            config.VAL_FILE, self.tokenizer, config.MAX_INPUT_LENGTH, target_length,
+            self.target_format, items=unseen_val_items
+        )
+        self.test_dataset = BugFixDataset(
+            config.TEST_FILE, self.tokenizer, config.MAX_INPUT_LENGTH, target_length, self.target_format
+        )
+    
+    def load_optimizer_state(self, trainer):
+        """
+        Create the trainer's optimizer from the state saved with the previous model
+        AdamW moments carry over; the learning rate is reset for the new run
+        Returns: True if the state was loaded
+        """
+        optimizer_file = self.final_model_path / config.OPTIMIZER_STATE_FILE
+        trainer.create_optimizer()
+        if not optimizer_file.exists():
+            print(f"⚠️  No {config.OPTIMIZER_STATE_FILE} with the previous model, starting a fresh optimizer")
+            return False
+        
+        try:
+            trainer.optimizer.load_state_dict(torch.load(optimizer_file, map_location=self.device))
+        except (ValueError, KeyError, RuntimeError) as e:
+            print(f"⚠️  Optimizer state doesn't match the model ({e}), starting a fresh optimizer")
+            trainer.optimizer = None
+            trainer.create_optimizer()
+            return False
+        
+        for group in trainer.optimizer.param_groups:
+            group['lr'] = config.INCREMENTAL_LEARNING_RATE
+            # Left by the previous run's scheduler; the new one must start from the new lr
+            group.pop('initial_lr', None)
+        print(f"Optimizer state loaded from: {optimizer_file}")
+        return True
+    
+    def save_optimizer_state(self, trainer, output_dir):
+        """
+        Save the optimizer state that belongs to the saved weights
+        With load_best_model_at_end the weights come from the best checkpoint,
+        so its optimizer.pt is used rather than the state after the last step
+        """
+        from transformers.trainer import OPTIMIZER_NAME
+        
+        best_checkpoint = trainer.state.best_model_checkpoint
+        if best_checkpoint and (Path(best_checkpoint) / OPTIMIZER_NAME).exists():
+            shutil.copyfile(Path(best_checkpoint) / OPTIMIZER_NAME, output_dir / config.OPTIMIZER_STATE_FILE)
+            print(f"Optimizer state from best checkpoint: {best_checkpoint}")
+        else:
+            torch.save(trainer.optimizer.state_dict(), output_dir / config.OPTIMIZER_STATE_FILE)
+    
+    def save_final_model(self, trainer, trained_keys):
+        """
+        Save model, tokenizer, optimizer state and trained-sample manifest to final
+        Everything is written to STAGING_MODEL_DIR first and only then swapped in,
+        so a failed save never leaves final missing or half written. An incremental
+        run keeps the model it replaces in PREVIOUS_MODEL_DIR.
+        """
+        staging_path = config.STAGING_MODEL_DIR
+        if staging_path.exists():
+            shutil.rmtree(staging_path)
+        
+        trainer.save_model(str(staging_path))
+        self.tokenizer.save_pretrained(str(staging_path))
+        
+        # Adapter checkpoints only hold the LoRA weights; keep the model
+        # config alongside so the merged model keeps target_format
+        if self.use_lora:
+            self.model_config.save_pretrained(str(staging_path))
+            print("Adapter-only checkpoint (merge with lora.py or load directly in ModelEvaluator)")
+        
+        # What the next incremental run warm-starts from
+        self.save_optimizer_state(trainer, staging_path)
+        save_trained_keys(staging_path, trained_keys)
+        
+        if self.final_model_path.exists():
+            if self.incremental:
+                if config.PREVIOUS_MODEL_DIR.exists():
+                    shutil.rmtree(config.PREVIOUS_MODEL_DIR)
+                os.replace(self.final_model_path, config.PREVIOUS_MODEL_DIR)
+                print(f"Previous model moved to: {config.PREVIOUS_MODEL_DIR}")
+            else:
+                shutil.rmtree(self.final_model_path)
+        os.replace(staging_path, self.final_model_path)
+    
     def train(self):
-        """Train the model"""
+        """
+        Train the model
+        Returns: Trainer, or None if interrupted (or, for an incremental run,
+                 if there was nothing new or the new model wasn't better)
+        """
         print("\n" + "="*60)
-        print("STARTING TRAINING")
+        print("STARTING " + ("INCREMENTAL " if self.incremental else "") + "TRAINING")
         print("="*60)
         
+        if self.incremental and len(self.new_items) < config.MIN_NEW_SAMPLES:
+            print(f"\n✅ No new samples since the last training ({len(self.new_items)}), model unchanged")
+            return None
+        
+        if self.incremental:
+            # Short run on a small dataset: lower lr, evaluate often, stop early
+            epochs = config.INCREMENTAL_EPOCHS
+            learning_rate = config.INCREMENTAL_LEARNING_RATE
+            warmup_steps = 0  # Optimizer moments are already warm
+            eval_steps = config.INCREMENTAL_EVAL_STEPS
+            patience = config.INCREMENTAL_PATIENCE
+            output_dir = config.MODEL_OUTPUT_DIR / "incremental"
+        else:
+            epochs = config.NUM_EPOCHS
+            learning_rate = config.LEARNING_RATE
+            warmup_steps = config.WARMUP_STEPS
+            eval_steps = config.EVAL_STEPS
+            patience = config.EARLY_STOPPING_PATIENCE
+            output_dir = config.MODEL_OUTPUT_DIR
+        
         # Training arguments
         training_args = TrainingArguments(
-            output_dir=str(config.MODEL_OUTPUT_DIR),
+            output_dir=str(output_dir),
             
             # Training parameters
-            num_train_epochs=config.NUM_EPOCHS,
-            per_device_train_batch_size=config.BATCH_SIZE,
-            per_device_eval_batch_size=config.BATCH_SIZE,
-            learning_rate=config.LEARNING_RATE,
-            warmup_steps=config.WARMUP_STEPS,
+            num_train_epochs=epochs,
+            per_device_train_batch_size=self.batch_size,
+            per_device_eval_batch_size=self.batch_size,
+            learning_rate=learning_rate,
+            warmup_steps=warmup_steps,
             
             # Logging and saving
             logging_steps=config.LOGGING_STEPS,
-            save_steps=config.SAVE_STEPS,
-            eval_steps=config.EVAL_STEPS,
+            save_steps=eval_steps if self.incremental else config.SAVE_STEPS,
+            eval_steps=eval_steps,
             save_total_limit=3,  # Keep only 3 best checkpoints
+            save_safetensors=True,  # Memory-mappable weights for fast loading
             
             # Evaluation
             eval_strategy="steps",
@@ -77,13 +300,16 @@ class BugFixTrainer:
             
             # Performance
             fp16=torch.cuda.is_available(),  # Mixed precision if GPU
-            gradient_accumulation_steps=2,  # Effective batch size = 4*2=8
+            gradient_accumulation_steps=config.GRADIENT_ACCUMULATION_STEPS,
             
             # Other
             report_to="none",  # Don't use wandb/tensorboard
             remove_unused_columns=False,
         )
         
+        # Throughput/data-pipeline metrics (wraps the Trainer's default collator)
+        throughput = ThroughputCallback(DataCollatorWithPadding(self.tokenizer))
+        
         # Initialize trainer
         trainer = Trainer(
             model=self.model,
@@ -91,22 +317,38 @@ class BugFixTrainer:
             train_dataset=self.train_dataset,
             eval_dataset=self.val_dataset,
             tokenizer=self.tokenizer,
+            data_collator=throughput.collate,
             callbacks=[
                 EarlyStoppingCallback(
-                    early_stopping_patience=config.EARLY_STOPPING_PATIENCE
-                )
+                    early_stopping_patience=patience
+                ),
+                throughput
             ]
         )
         
+        baseline_loss = None
+        if self.incremental:
+            self.load_optimizer_state(trainer)
+            print("\nEvaluating previous model...")
+            baseline_loss = trainer.evaluate()["eval_loss"]
+            print(f"Previous model validation loss: {baseline_loss:.4f}")
+        
         # Start training
         print("\nTraining started...")
-        print(f"Total steps: {len(self.train_dataset) // config.BATCH_SIZE * config.NUM_EPOCHS}")
-        print(f"Epochs: {config.NUM_EPOCHS}")
-        print(f"Batch size: {config.BATCH_SIZE}")
-        print(f"Learning rate: {config.LEARNING_RATE}")
-        print("\nThis will take 20-40 minutes on GPU...\n")
+        # One optimizer step per GRADIENT_ACCUMULATION_STEPS batches
+        batches_per_epoch = math.ceil(len(self.train_dataset) / self.batch_size)
+        steps_per_epoch = max(batches_per_epoch // config.GRADIENT_ACCUMULATION_STEPS, 1)
+        print(f"Total steps: {steps_per_epoch * epochs}")
+        print(f"Epochs: {epochs}")
+        print(f"Batch size: {self.batch_size} "
+              f"(effective {self.batch_size * config.GRADIENT_ACCUMULATION_STEPS} "
+              f"with {config.GRADIENT_ACCUMULATION_STEPS} accumulation steps)")
+        print(f"Learning rate: {learning_rate}")
+        if not self.incremental:
+            print("\nThis will take 20-40 minutes on GPU...\n")
         
         try:
+            start = time.perf_counter()
             train_result = trainer.train()
             
             # Save final model
@@ -115,13 +357,21 @@ class BugFixTrainer:
             print("="*60)
             
             print(f"\nFinal train loss: {train_result.training_loss:.4f}")
+            print(f"Training time: {(time.perf_counter() - start) / 60:.1f} min")
             
-            # Save model and tokenizer
-            final_model_path = config.MODEL_OUTPUT_DIR / "final"
-            trainer.save_model(str(final_model_path))
-            self.tokenizer.save_pretrained(str(final_model_path))
+            if self.incremental:
+                # Best checkpoint is loaded at the end; only replace the model if it improved
+                new_loss = trainer.evaluate()["eval_loss"]
+                print(f"Validation loss: {baseline_loss:.4f} -> {new_loss:.4f}")
+                if new_loss >= baseline_loss:
+                    print("\n⚠️  No improvement on validation loss, keeping the previous model")
+                    return None
+                trained_keys = self.trained_keys | {sample_key(item) for item in self.new_items}
+            else:
+                trained_keys = {sample_key(item) for item in self.train_dataset.data}
             
-            print(f"\n✅ Model saved to: {final_model_path}")
+            self.save_final_model(trainer, trained_keys)
+            print(f"\n✅ Model saved to: {self.final_model_path}")
             
             return trainer
             
@@ -138,5 +388,19 @@ class BugFixTrainer:
 
 
 if __name__ == "__main__":
-    trainer = BugFixTrainer()
-    trainer.train()
\ No newline at end of file
+    import argparse
+    from profiler import add_profile_argument, profiled
+    
+    parser = argparse.ArgumentParser(description="Fine-tune CodeT5 on the bug fix data")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Refresh the final model on newly mined samples instead of training from scratch")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    
+    with profiled("trainer", args, config.PROFILE_DIR):
+        try:
+            trainer = BugFixTrainer(incremental=args.incremental)
+        except FileNotFoundError as e:
+            print(f"❌ {e}")
+        else:
+            trainer.train()
\ No newline at end of file
@@ -0,0 +1,334 @@
+import argparse
+import difflib
+import time
+import config
+
+# Tokens that end the declaration before a method (its start is the next token);
+# ',' separates enum constants with bodies
+DECLARATION_BOUNDARIES = {';', '{', '}', ','}
+
+
+def method_windows(code):
+    """
+    Line ranges of top-level method and constructor bodies (with their declarations)
+    Uses the javalang tokenizer and brace matching rather than the parser, so
+    code that doesn't compile (the usual state of a file being fixed) still works.
+    Methods of anonymous/local classes stay part of their enclosing method.
+    Args:
+        code: Java source
+    Returns: List of (first line, last line) tuples, 0-based inclusive, or None if
+             the code can't be tokenized
+    """
+    import javalang
+
+    try:
+        tokens = list(javalang.tokenizer.tokenize(code))
+    except (javalang.tokenizer.LexerError, TypeError):
+        return None
+
+    windows = []
+    open_braces = []   # Token index of each unmatched '{'
+    parens = {}        # Index of ')' -> index of its '('
+    paren_stack = []
+    method_depth = None  # Brace depth of the method body being scanned
+    method_start = None
+
+    for i, token in enumerate(tokens):
+        value = token.value
+        if value == '(':
+            paren_stack.append(i)
+        elif value == ')' and paren_stack:
+            parens[i] = paren_stack.pop()
+        elif value == '{':
+            if method_depth is None and is_method_body(tokens, i, parens):
+                method_depth = len(open_braces)
+                method_start = declaration_start(tokens, i, parens)
+            open_braces.append(i)
+        elif value == '}' and open_braces:
+            open_braces.pop()
+            if method_depth is not None and len(open_braces) == method_depth:
+                windows.append((tokens[method_start].position.line - 1, token.position.line - 1))
+                method_depth = None
+
+    return windows
+
+
+def is_method_body(tokens, brace, parens):
+    """
+    Whether the '{' at index brace opens a method/constructor body:
+    [modifiers] [type] name ( params ) [throws A, B] {
+    and not new a.b.Name(...) {, record Name(...) {, @Annotation(...) class Name {
+    or if/for/while (...) {
+    """
+    i = brace - 1
+
+    # Only a throws clause may come between ')' and '{'
+    if i >= 0 and tokens[i].value != ')':
+        while i >= 0 and tokens[i].value != 'throws':
+            if not (is_token(tokens[i], 'Identifier') or tokens[i].value in ('.', ',')):
+                return False
+            i -= 1
+        i -= 1
+
+    if i < 0 or tokens[i].value != ')' or i not in parens:
+        return False
+
+    name = parens[i] - 1
+    if name < 0 or not is_token(tokens[name], 'Identifier'):
+        return False
+    if name == 0:
+        return True
+    return declares_name(tokens, name - 1, parens)
+
+
+def is_token(token, kind):
+    """Whether a javalang token is of the given class (e.g. 'Identifier')"""
+    return type(token).__name__ == kind
+
+
+def declares_name(tokens, i, parens):
+    """
+    Whether the token at index i can precede a method/constructor name:
+    a return type, a modifier, an annotation, or the end of the previous member
+    """
+    token = tokens[i]
+    if is_token(token, 'Identifier'):
+        # record Point(int x, int y) { is a class
+        return token.value != 'record'
+    if is_token(token, 'BasicType') or is_token(token, 'Modifier'):
+        return True
+    if token.value == 'void' or token.value == ']' or set(token.value) == {'>'}:
+        return True
+    if token.value in DECLARATION_BOUNDARIES:
+        # Package-private constructor or enum constant body
+        return True
+    if token.value == ')' and i in parens:
+        # Arguments of an annotation: @a.b.Name(...)
+        j = parens[i] - 1
+        while j >= 0 and (is_token(tokens[j], 'Identifier') or tokens[j].value == '.'):
+            j -= 1
+        return j < parens[i] - 1 and j >= 0 and tokens[j].value == '@'
+    # '@', '.', new, return, =, ...
+    return False
+
+
+def declaration_start(tokens, brace, parens):
+    """Index of the first token of the declaration (annotations, modifiers, type) of a method body"""
+    i = brace - 1
+    angle_depth = 0  # ',' inside type parameters/arguments doesn't end the declaration
+    while i >= 0:
+        value = tokens[i].value
+        if value in DECLARATION_BOUNDARIES and not (value == ',' and angle_depth > 0):
+            break
+        if set(value) == {'>'}:
+            angle_depth += len(value)
+        elif value == '<':
+            angle_depth = max(angle_depth - 1, 0)
+        elif value == ')' and i in parens:
+            # Annotation arguments may contain anything
+            i = parens[i]
+        i -= 1
+    return i + 1
+
+
+def plan_windows(code, target_lines, context_lines=config.WINDOW_CONTEXT_LINES, fits=None):
+    """
+    Windows to regenerate for the given lines
+    Target lines inside a method select that whole method; lines outside any
+    method (fields, imports) or in code that can't be tokenized get a window of
+    context_lines around them, merged when they overlap and never cut into a method.
+    Args:
+        code: Whole file
+        target_lines: Cursor/edited lines (0-based)
+        context_lines: Lines of context on each side for non-method windows
+        fits: Optional function telling whether a window's text fits the model;
+              a method that doesn't gets a line window inside it instead
+    Returns: Sorted list of non-overlapping (first line, last line) tuples
+    """
+    line_count = code.count('\n') + 1
+    targets = sorted({line for line in target_lines if 0 <= line < line_count})
+    methods = method_windows(code) or []
+
+    selected = set()
+    loose = []
+    for line in targets:
+        method = next((m for m in methods if m[0] <= line <= m[1]), None)
+        if method is not None and (fits is None or fits(window_text(code, method))):
+            selected.add(method)
+        elif method is not None:
+            loose.append((max(method[0], line - context_lines), min(method[1], line + context_lines)))
+        else:
+            start, end = max(0, line - context_lines), min(line_count - 1, line + context_lines)
+            # Stop at methods instead of cutting into them
+            for method_start, method_end in methods:
+                if method_end < line and method_end >= start:
+                    start = method_end + 1
+                if method_start > line and method_start <= end:
+                    end = method_start - 1
+            loose.append((start, end))
+
+    # Merge overlapping line windows
+    merged = []
+    for start, end in sorted(loose):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+
+    # Cut selected methods out of the line windows so nothing is generated twice
+    windows = set(selected)
+    for start, end in merged:
+        for method_start, method_end in sorted(selected):
+            if method_end < start or method_start > end:
+                continue
+            if method_start > start:
+                windows.add((start, method_start - 1))
+            start = method_end + 1
+        if start <= end:
+            windows.add((start, end))
+
+    # Start each window after the previous one ends, so every line is
+    # generated at most once even if method detection returned nested ranges
+    planned = []
+    for start, end in sorted(windows):
+        if planned:
+            start = max(start, planned[-1][1] + 1)
+        if start <= end:
+            planned.append((start, end))
+    return planned
+
+
+def stitch(code, windows, fixes):
+    """
+    Replace each window's lines with its fix
+    Args:
+        code: Whole file
+        windows: Non-overlapping (first line, last line) tuples
+        fixes: Replacement text per window (None keeps the original lines)
+    Returns: New file contents
+    """
+    lines = code.split('\n')
+    # Bottom-up so earlier line numbers stay valid
+    for (start, end), fix in sorted(zip(windows, fixes), reverse=True):
+        if fix is not None:
+            lines[start:end + 1] = fix.split('\n')
+    return '\n'.join(lines)
+
+
+def make_patch(original, fixed, path="file.java"):
+    """Unified diff between two versions of a file"""
+    return ''.join(difflib.unified_diff(
+        original.splitlines(keepends=True),
+        fixed.splitlines(keepends=True),
+        fromfile=f"a/{path}",
+        tofile=f"b/{path}"
+    ))
+
+
+def window_text(code, window):
+    """Source lines of one window"""
+    start, end = window
+    return '\n'.join(code.split('\n')[start:end + 1])
+
+
+def fits_model(tokenizer, text):
+    """Whether text fits in MAX_INPUT_LENGTH tokens (longer windows would be truncated)"""
+    return len(tokenizer(text, truncation=False)['input_ids']) <= config.MAX_INPUT_LENGTH
+
+
+def prepare_windows(tokenizer, code, target_lines):
+    """
+    Windows to regenerate and which of them fit the model
+    Args:
+        tokenizer: Model tokenizer
+        code: Whole file
+        target_lines: Cursor/edited lines (0-based)
+    Returns: Tuple of (windows, window texts, fits flags)
+    """
+    def fits(text):
+        return fits_model(tokenizer, text)
+
+    windows = plan_windows(code, target_lines, fits=fits)
+    texts = [window_text(code, window) for window in windows]
+    return windows, texts, [fits(text) for text in texts]
+
+
+def assemble_fix(code, windows, texts, fitting, generated, path="file.java"):
+    """
+    Stitch generated windows back into the file
+    Args:
+        code: Whole file
+        windows, texts, fitting: Result of prepare_windows
+        generated: Fixes for the windows that fit, in order
+        path: File path used in the patch header
+    Returns: Dictionary with fixed_code, patch and per-window details
+    """
+    generated = iter(generated)
+    fixes = [next(generated) if ok else None for ok in fitting]
+    # Keep the original lines where the model returned nothing
+    fixes = [fix if fix and fix.strip() else None for fix in fixes]
+
+    fixed_code = stitch(code, windows, fixes)
+    return {
+        "fixed_code": fixed_code,
+        "patch": make_patch(code, fixed_code, path),
+        "windows": [
+            {"start_line": start + 1, "end_line": end + 1, "generated": ok,
+             "changed": fix is not None and fix != text}
+            for (start, end), text, ok, fix in zip(windows, texts, fitting, fixes)
+        ],
+    }
+
+
+def fix_file(evaluator, code, target_lines, path="file.java"):
+    """
+    Suggest a fix for a large file by regenerating only the windows around target_lines
+    Args:
+        evaluator: ModelEvaluator
+        code: Whole file
+        target_lines: Cursor/edited lines (0-based)
+        path: File path used in the patch header
+    Returns: Dictionary with fixed_code, patch and per-window details
+    """
+    windows, texts, fitting = prepare_windows(evaluator.tokenizer, code, target_lines)
+    to_generate = [text for text, ok in zip(texts, fitting) if ok]
+
+    # One batched generate() for all windows
+    generated = evaluator.generate_fixes(to_generate) if to_generate else []
+    return assemble_fix(code, windows, texts, fitting, generated, path)
+
+
+if __name__ == "__main__":
+    from profiler import add_profile_argument, profiled
+
+    parser = argparse.ArgumentParser(description="Suggest a fix for a region of a large Java file")
+    parser.add_argument("file", help="Java file")
+    parser.add_argument("--lines", required=True,
+                        help="Cursor/edited lines, 1-based, comma-separated (e.g. 120,121)")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with profiled("windowing", args, config.PROFILE_DIR):
+        from evaluate import ModelEvaluator
+
+        model_path = config.MODEL_OUTPUT_DIR / "final"
+        if not model_path.exists():
+            print(f"❌ Model not found at {model_path}")
+            print("Train the model first using trainer.py")
+        else:
+            with open(args.file, 'r', encoding='utf-8') as f:
+                source = f.read()
+            lines = [int(line) - 1 for line in args.lines.split(',')]
+
+            evaluator = ModelEvaluator(str(model_path))
+            start = time.perf_counter()
+            result = fix_file(evaluator, source, lines, path=args.file)
+            elapsed = time.perf_counter() - start
+
+            print("\n" + "="*60)
+            print(f"WINDOWED FIX ({source.count(chr(10)) + 1} lines, {elapsed:.2f}s)")
+            print("="*60)
+            for window in result["windows"]:
+                status = "changed" if window["changed"] else ("unchanged" if window["generated"] else "⚠️  too long, skipped")
+                print(f"  Lines {window['start_line']}-{window['end_line']}: {status}")
+            print("\n" + (result["patch"] or "No changes suggested"))
@@ -0,0 +1,29 @@
+import hashlib
+import re
+
+# String/char literals are matched first so comment markers inside them are kept
+CODE_TOKEN_PATTERN = re.compile(
+    r'"(?:\\.|[^"\\\n])*"'      # String literal
+    r"|'(?:\\.|[^'\\\n])*'"     # Char literal
+    r'|(?:\s+|//[^\n]*|/\*.*?\*/)+',  # Run of whitespace and comments
+    re.DOTALL
+)
+
+
+def normalize_code(code):
+    """
+    Drop comments and collapse whitespace runs to one space
+    String and char literals are left untouched.
+    """
+    def replace(match):
+        token = match.group(0)
+        if token[0] in "\"'":
+            return token
+        return " "
+
+    return CODE_TOKEN_PATTERN.sub(replace, code).strip()
+
+
+def sample_key(item):
+    """Stable identity of a buggy/fixed pair (survives re-mining and re-splitting)"""
+    return hashlib.sha1((item['input'] + '\0' + item['target']).encode('utf-8')).hexdigest()
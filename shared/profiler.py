@@ -0,0 +1,205 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+from datetime import datetime
+from pathlib import Path
+
+DEFAULT_INTERVAL_MS = 5   # Time between samples
+DEFAULT_TOP_N = 20        # Functions listed in the summary
+
+# Innermost frames of threads parked waiting for work, as (file, function);
+# skipped when sampling all threads so idle pools don't dilute the percentages
+IDLE_FRAMES = {
+    ("threading.py", "wait"),                   # Event/Condition wait
+    ("threading.py", "_wait_for_tstate_lock"),  # Thread.join
+    ("queue.py", "get"),
+    ("selectors.py", "select"),                 # Idle event loops
+    ("thread.py", "_worker"),                   # ThreadPoolExecutor worker waiting for a task
+}
+
+
+def is_idle(frame):
+    """Whether a thread's innermost frame is a known blocking wait"""
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+
+
+def frame_label(frame):
+    """'function (file.py:line)' for one frame; no ';' so it's safe in collapsed stacks"""
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(';', ',')
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for one pipeline stage
+    A background thread snapshots the Python stack of the thread that started
+    profiling at a fixed interval, so time blocked in I/O, subprocess waits
+    (GitPython) or native calls (tokenizers, torch) is attributed to the Python
+    call that made it. With all_threads every thread is sampled instead, minus
+    samples of threads idling in a known blocking wait (IDLE_FRAMES).
+    Overhead is one sys._current_frames() call per interval.
+    Writes a collapsed-stack file (flamegraph.pl / speedscope / inferno) and
+    prints the functions with the most samples.
+    """
+    def __init__(self, stage, output_dir, interval_ms=DEFAULT_INTERVAL_MS, top_n=DEFAULT_TOP_N,
+                 all_threads=False):
+        """
+        Args:
+            stage: Name of the profiled stage (used in the output file name)
+            output_dir: Directory for collapsed-stack files
+            interval_ms: Sampling interval
+            top_n: Functions listed in the summary
+            all_threads: Sample every thread (skipping idle ones), not just the starting thread
+        """
+        self.stage = stage
+        self.output_dir = Path(output_dir)
+        self.interval = interval_ms / 1000
+        self.top_n = top_n
+        self.all_threads = all_threads
+
+        self.stacks = Counter()
+        self.samples = 0
+        self.idle_samples = 0
+        self.target_thread = None
+        self.running = threading.Event()
+        self.thread = None
+        self.start_time = None
+        self.elapsed = 0.0
+
+    def sample(self):
+        """Record the current stack of the profiled thread (or of every other busy thread)"""
+        frames = sys._current_frames()
+        if self.all_threads:
+            own_id = threading.get_ident()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            sampled = [(thread_id, frame) for thread_id, frame in frames.items() if thread_id != own_id]
+        else:
+            names = {self.target_thread.ident: self.target_thread.name}
+            frame = frames.get(self.target_thread.ident)
+            sampled = [(self.target_thread.ident, frame)] if frame is not None else []
+
+        for thread_id, frame in sampled:
+            if self.all_threads and is_idle(frame):
+                self.idle_samples += 1
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, f"thread-{thread_id}").replace(';', ','))
+            self.stacks[tuple(reversed(stack))] += 1
+        self.samples += 1
+
+    def run(self):
+        """Sampling loop"""
+        next_sample = time.perf_counter()
+        while self.running.is_set():
+            self.sample()
+            next_sample += self.interval
+            delay = next_sample - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Fell behind (e.g. GIL held by a long C call): don't burst
+                next_sample = time.perf_counter()
+
+    def start(self):
+        self.target_thread = threading.current_thread()
+        self.start_time = time.perf_counter()
+        self.running.set()
+        self.thread = threading.Thread(target=self.run, name="sampling-profiler", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running.clear()
+        self.thread.join()
+        self.elapsed = time.perf_counter() - self.start_time
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.stop()
+        self.report()
+        return False
+
+    def write_collapsed(self):
+        """
+        Write 'thread;outer;...;inner count' lines
+        Returns: Path of the file
+        """
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        output_file = self.output_dir / f"{self.stage}_{datetime.now():%Y%m%d_%H%M%S}.collapsed"
+        with open(output_file, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(';'.join(stack) + f" {count}\n")
+        return output_file
+
+    def hot_functions(self):
+        """
+        Sample counts per function
+        Returns: Tuple of (self counts, inclusive counts) Counters; self is the
+                 innermost frame, inclusive counts each function once per stack
+        """
+        own, inclusive = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack[1:]  # Drop the thread name
+            if not frames:
+                continue
+            own[frames[-1]] += count
+            for label in set(frames):
+                inclusive[label] += count
+        return own, inclusive
+
+    def report(self):
+        """Write the collapsed stacks and print the top functions"""
+        output_file = self.write_collapsed()
+        total = sum(self.stacks.values())
+        own, inclusive = self.hot_functions()
+
+        print("\n" + "="*60)
+        print(f"PROFILE: {self.stage}")
+        print("="*60)
+        if self.all_threads:
+            threads = f"all threads, {self.idle_samples} idle thread samples skipped"
+        else:
+            threads = f"thread {self.target_thread.name}"
+        print(f"\n{self.samples} samples over {self.elapsed:.1f}s "
+              f"({self.interval * 1000:.0f}ms interval, {threads})")
+
+        for title, counts in (("Self time (innermost frame)", own), ("Total time (on the stack)", inclusive)):
+            print(f"\n{title}:")
+            for label, count in counts.most_common(self.top_n):
+                print(f"  {count / total * 100 if total else 0:6.1f}%  {label}")
+
+        print(f"\n📁 Collapsed stacks: {output_file}")
+        print("   (flamegraph.pl, speedscope.app or inferno-flamegraph can render them)")
+
+
+def add_profile_argument(parser):
+    """Add the --profile switch to an argparse parser"""
+    parser.add_argument("--profile", action="store_true",
+                        help="Sample stacks while running and write a collapsed-stack profile")
+    parser.add_argument("--profile-interval", type=float, default=DEFAULT_INTERVAL_MS,
+                        help="Milliseconds between profile samples")
+    parser.add_argument("--profile-all-threads", action="store_true",
+                        help="Sample every thread (idle ones skipped), not just the main thread")
+
+
+def profiled(stage, args, output_dir):
+    """
+    Context manager profiling a stage when --profile was given, otherwise a no-op
+    Args:
+        stage: Stage name
+        args: Parsed arguments (from a parser set up with add_profile_argument)
+        output_dir: Directory for collapsed-stack files
+    """
+    if not getattr(args, 'profile', False):
+        return nullcontext()
+    return SamplingProfiler(stage, output_dir, interval_ms=args.profile_interval,
+                            all_threads=getattr(args, 'profile_all_threads', False))
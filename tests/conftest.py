@@ -0,0 +1,48 @@
+import json
+import sys
+from pathlib import Path
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# Modules import each other by name, as when run from their own directory
+for directory in ("model-training", "backend-api", "shared"):
+    path = str(PROJECT_ROOT / directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+@pytest.fixture(scope="session")
+def tiny_model_dir(tmp_path_factory):
+    """
+    Randomly initialized two-layer T5 with a byte-level tokenizer, saved like a
+    trained model (no download; outputs are arbitrary but deterministic)
+    """
+    import torch
+    from transformers import RobertaTokenizer, T5Config, T5ForConditionalGeneration
+    from transformers.models.gpt2.tokenization_gpt2 import bytes_to_unicode
+
+    model_dir = tmp_path_factory.mktemp("tiny-model")
+
+    vocab = {"<s>": 0, "<pad>": 1, "</s>": 2, "<unk>": 3}
+    for char in bytes_to_unicode().values():
+        vocab[char] = len(vocab)
+    vocab["<mask>"] = len(vocab)
+    with open(model_dir / "vocab.json", 'w') as f:
+        json.dump(vocab, f)
+    with open(model_dir / "merges.txt", 'w') as f:
+        f.write("#version: 0.2\n")
+    tokenizer = RobertaTokenizer(str(model_dir / "vocab.json"), str(model_dir / "merges.txt"))
+
+    torch.manual_seed(0)
+    model_config = T5Config(
+        vocab_size=len(vocab), d_model=64, d_ff=128, num_layers=2, num_heads=2, d_kv=16,
+        decoder_start_token_id=tokenizer.pad_token_id, pad_token_id=tokenizer.pad_token_id,
+        eos_token_id=tokenizer.eos_token_id, initializer_factor=5.0
+    )
+    model = T5ForConditionalGeneration(model_config)
+    model.config.target_format = "full"
+
+    model.save_pretrained(str(model_dir))
+    tokenizer.save_pretrained(str(model_dir))
+    return model_dir
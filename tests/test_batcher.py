@@ -0,0 +1,39 @@
+import asyncio
+import threading
+import pytest
+from batcher import MicroBatcher
+
+
+def test_stop_fails_in_flight_batch():
+    release = threading.Event()
+
+    def generate_batch(items):
+        release.wait(timeout=5)
+        return items
+
+    async def scenario():
+        batcher = MicroBatcher(generate_batch, max_batch_size=4, max_wait_ms=1, max_queue_size=8)
+        batcher.start()
+        request = asyncio.ensure_future(batcher.submit("code"))
+        while not batcher.current_batch:
+            await asyncio.sleep(0.001)
+
+        await batcher.stop()
+        release.set()
+        with pytest.raises(RuntimeError, match="shutting down"):
+            await asyncio.wait_for(request, timeout=1)
+
+    asyncio.run(scenario())
+
+
+def test_batches_requests():
+    async def scenario():
+        batcher = MicroBatcher(lambda items: [item.upper() for item in items], max_wait_ms=20)
+        batcher.start()
+        results = await asyncio.gather(*(batcher.submit(code) for code in ["a", "b", "c"]))
+        await batcher.stop()
+        return results, batcher.stats
+
+    results, stats = asyncio.run(scenario())
+    assert results == ["A", "B", "C"]
+    assert stats["batches"] == 1 and stats["batched_requests"] == 3
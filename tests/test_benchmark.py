@@ -0,0 +1,18 @@
+from benchmark import model_size_mb, percentile
+
+
+def test_model_size_from_saved_weights(tiny_model_dir):
+    from evaluate import ModelEvaluator
+
+    fp32 = ModelEvaluator(str(tiny_model_dir), quantize=False, backend="pytorch")
+    int8 = ModelEvaluator(str(tiny_model_dir), quantize=True, backend="pytorch")
+
+    weights = next(tiny_model_dir.glob("model.safetensors"), None) or tiny_model_dir / "pytorch_model.bin"
+    assert model_size_mb(fp32) == weights.stat().st_size / 1e6
+    assert 0 < model_size_mb(int8)
+
+
+def test_percentile():
+    assert percentile([], 50) == 0.0
+    assert percentile([5, 1, 3, 2, 4], 50) == 3
+    assert percentile(list(range(1, 101)), 90) == 90
@@ -0,0 +1,80 @@
+import asyncio
+import pytest
+from cache import ResponseCache, cache_key, model_version, reuse_fix
+
+SOURCE = "int f(int x) {\n    // first caller\n    return x - 1;\n}"
+FIXED = "int f(int x) {\n    // first caller\n    return x + 1;\n}"
+
+
+def test_reuse_fix_keeps_callers_comments():
+    code = "int f(int x) {\n    // second caller\n    return x - 1;\n}"
+    assert reuse_fix(SOURCE, FIXED, SOURCE) == FIXED
+    assert reuse_fix(SOURCE, FIXED, code) == "int f(int x) {\n    // second caller\n    return x + 1;\n}"
+
+
+def test_reuse_fix_rejects_changed_lines_that_differ():
+    # Same normalized code, but the fixed line itself carries a different comment
+    code = "int f(int x) {\n    // first caller\n    return x - 1; // why\n}"
+    assert reuse_fix(SOURCE, FIXED, code) is None
+    # Different line structure
+    assert reuse_fix(SOURCE, FIXED, "int f(int x) { return x - 1; }") is None
+
+
+def test_get_or_compute_serves_each_caller_their_own_code():
+    calls = []
+
+    async def scenario():
+        cache = ResponseCache(disk_path=None)
+        other = SOURCE.replace("first caller", "second caller")
+        unverifiable = SOURCE.replace("return x - 1;", "return x - 1; // why")
+
+        async def compute(code):
+            calls.append(code)
+            await asyncio.sleep(0.01)
+            return code.replace("x - 1", "x + 1")
+
+        key = cache_key(SOURCE, "v1", {})
+        assert key == cache_key(other, "v1", {}) == cache_key(unverifiable, "v1", {})
+
+        first, second = await asyncio.gather(
+            cache.get_or_compute(key, SOURCE, lambda: compute(SOURCE)),
+            cache.get_or_compute(key, other, lambda: compute(other)),
+        )
+        third = await cache.get_or_compute(key, unverifiable, lambda: compute(unverifiable))
+        return first, second, third, cache.stats
+
+    first, second, third, stats = asyncio.run(scenario())
+    assert first == (FIXED, "miss")
+    assert second == (FIXED.replace("first caller", "second caller"), "coalesced")
+    assert third == ("int f(int x) {\n    // first caller\n    return x + 1; // why\n}", "miss")
+    assert len(calls) == 2 and stats["unverified"] == 1
+
+
+def test_failed_fill_is_not_cached():
+    async def scenario():
+        cache = ResponseCache(disk_path=None)
+
+        async def fail():
+            raise RuntimeError("generation failed")
+
+        with pytest.raises(RuntimeError):
+            await cache.get_or_compute("key", SOURCE, fail)
+        await asyncio.sleep(0)
+        return cache
+
+    cache = asyncio.run(scenario())
+    assert cache.in_flight == {} and cache.entries == {}
+
+
+def test_model_version_covers_onnx_graphs(tmp_path):
+    class Evaluator:
+        model_path = str(tmp_path)
+        backend = "onnx"
+        quantize = False
+
+    (tmp_path / "encoder_model.onnx").write_bytes(b"encoder")
+    (tmp_path / "decoder_model.onnx").write_bytes(b"decoder")
+    before = model_version(Evaluator())
+
+    (tmp_path / "decoder_model.onnx").write_bytes(b"re-exported decoder")
+    assert model_version(Evaluator()) != before
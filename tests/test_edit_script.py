@@ -0,0 +1,81 @@
+import pytest
+from edit_script import apply_edit_script, check_edit_script, make_edit_script, number_lines, parse_edit_script
+
+SOURCE = "class A {\n    int f(int x) {\n        return x;\n    }\n}"
+
+CASES = {
+    "unchanged": SOURCE,
+    "replace": SOURCE.replace("return x;", "return x + 1;"),
+    "insert": SOURCE.replace("        return x;", "        if (x < 0) return 0;\n        return x;"),
+    "delete": SOURCE.replace("        return x;\n", ""),
+    "insert at end": SOURCE + "\n// end",
+    "empty target": "",
+}
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_round_trip(name):
+    target = CASES[name]
+    assert apply_edit_script(SOURCE, make_edit_script(SOURCE, target)) == target
+
+
+def test_unchanged_code_has_empty_script():
+    assert make_edit_script(SOURCE, SOURCE) == ""
+
+
+def test_replace_script_format():
+    script = make_edit_script(SOURCE, CASES["replace"])
+    assert script == "@@ 3,1\n+        return x + 1;"
+    assert parse_edit_script(script) == [(2, 1, ["        return x + 1;"])]
+
+
+def test_malformed_lines_are_skipped():
+    script = "+orphan line\n@@ nonsense\n@@ 3,1\n+        return 0;\ntrailing text"
+    assert apply_edit_script(SOURCE, script) == SOURCE.replace("return x;", "return 0;")
+
+
+def test_out_of_range_and_overlapping_hunks_are_ignored():
+    script = "@@ 3,1\n+        return 1;\n@@ 3,2\n+        return 2;\n@@ 9,1\n+never"
+    assert apply_edit_script(SOURCE, script) == SOURCE.replace("return x;", "return 1;")
+
+
+def test_number_lines():
+    assert number_lines("a\n\nb") == "1| a\n2| \n3| b"
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_generated_scripts_pass_the_strict_check(name):
+    script = make_edit_script(SOURCE, CASES[name])
+    check_edit_script(SOURCE, script)
+
+
+@pytest.mark.parametrize("script", [
+    "+orphan line\n@@ 3,1\n+        return 0;",
+    "@@ 3,1\n+        return 0;\ntrailing text",
+    "@@ 3,1\n+        return 1;\n@@ 3,2\n+        return 2;",
+    "@@ 9,1\n+never",
+])
+def test_strict_check_rejects_incomplete_scripts(script):
+    with pytest.raises(ValueError):
+        check_edit_script(SOURCE, script)
+
+
+def test_dataset_drops_scripts_past_the_limits(tiny_model_dir):
+    from transformers import RobertaTokenizer
+    from dataset import BugFixDataset
+
+    tokenizer = RobertaTokenizer.from_pretrained(str(tiny_model_dir))
+    long_source = "\n".join(f"int v{i} = {i};" for i in range(40))
+    items = [
+        {"input": SOURCE, "target": CASES["replace"]},
+        # Script longer than the target limit
+        {"input": SOURCE, "target": SOURCE + "\n" + "x" * 200},
+        # Edits the last line, which input truncation cuts off
+        {"input": long_source, "target": long_source.replace("int v39", "long v39")},
+    ]
+    dataset = BugFixDataset("train", tokenizer, 128, 64, "edit_script", items=items, drop_unlearnable=True)
+
+    assert dataset.data == items[:1]
+    assert dataset.targets == [make_edit_script(SOURCE, CASES["replace"])]
+    # Inputs are numbered so hunk headers can be read off the input
+    assert tokenizer.decode(dataset[0]["input_ids"], skip_special_tokens=True) == number_lines(SOURCE)
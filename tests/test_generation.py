@@ -0,0 +1,92 @@
+import torch
+import config
+from generation import GenerationPolicy, InputEndLogitsProcessor
+
+EOS = 2
+
+
+def end_processor_finished(generated_tokens, tail, min_position):
+    processor = InputEndLogitsProcessor(
+        torch.tensor([tail]), torch.tensor([min_position]), torch.tensor([True]), EOS, num_beams=1
+    )
+    # Decoder start token first, as in generate()
+    input_ids = torch.tensor([[0] + generated_tokens])
+    scores = processor(input_ids, torch.zeros(1, 10))
+    return bool(scores[0, EOS] == 0 and torch.isinf(scores[0, :EOS]).all())
+
+
+def test_input_end_ignores_early_tail_match():
+    assert not end_processor_finished([7, 8, 5, 6], tail=[5, 6], min_position=6)
+
+
+def test_input_end_stops_at_aligned_tail_match():
+    assert end_processor_finished([7, 8, 9, 7, 5, 6], tail=[5, 6], min_position=6)
+
+
+def test_fixed_policy_matches_original_max_length():
+    policy = GenerationPolicy(num_beams=5, max_new_tokens_ratio=None, end_match_tokens=0)
+    input_ids = torch.tensor([[0, 10, 11, 2]])
+
+    class Tokenizer:
+        eos_token_id = EOS
+        all_special_ids = [0, 1, 2]
+
+    kwargs = policy.generate_kwargs(input_ids, torch.ones_like(input_ids), Tokenizer())
+    assert kwargs["max_length"] == config.MAX_TARGET_LENGTH
+    assert "max_new_tokens" not in kwargs
+    assert policy.max_new_tokens(4) == config.MAX_TARGET_LENGTH - 1
+
+
+def test_input_tails_masks_short_inputs():
+    policy = GenerationPolicy(end_match_tokens=3)
+    input_ids = torch.tensor([[0, 10, 11, 12, 13, 2], [0, 10, 2, 1, 1, 1]])
+    attention_mask = torch.tensor([[1, 1, 1, 1, 1, 1], [1, 1, 1, 0, 0, 0]])
+
+    tails, min_positions, active = policy.input_tails(input_ids, attention_mask, {0, 1, 2})
+
+    assert tails[0].tolist() == [11, 12, 13]
+    assert active.tolist() == [True, False]
+    assert min_positions[0] == 3
+    assert policy.input_tails(input_ids[1:], attention_mask[1:], {0, 1, 2}) is None
+
+
+def test_batched_fixes_match_single_fixes(tiny_model_dir):
+    from evaluate import ModelEvaluator
+
+    policy = GenerationPolicy(num_beams=3, max_new_tokens_ratio=1.5, min_new_tokens=4, end_match_tokens=4)
+    evaluator = ModelEvaluator(str(tiny_model_dir), quantize=False, backend="pytorch", generation_policy=policy)
+    codes = [
+        "public int add(int a, int b) { return a - b; }",
+        "x;",
+        "for (int i = 0; i <= n; i++) { total += values[i]; }",
+    ]
+
+    assert evaluator.generate_fixes(codes) == [evaluator.generate_fix(code) for code in codes]
+
+
+def test_adaptive_budget_shares_fixed_ceiling():
+    adaptive = GenerationPolicy(max_new_tokens_ratio=1.5)
+    fixed = GenerationPolicy(max_new_tokens_ratio=None)
+    assert adaptive.max_new_tokens(10_000) == fixed.max_new_tokens(10_000) == config.MAX_TARGET_LENGTH - 1
+
+
+def test_rejected_edit_scripts_fall_back(tiny_model_dir, monkeypatch):
+    from evaluate import ModelEvaluator
+
+    evaluator = ModelEvaluator(str(tiny_model_dir), quantize=False, backend="pytorch")
+    evaluator.target_format = "edit_script"
+    code = "int f() {\n    return 1;\n}"
+    fixed = code.replace("return 1", "return 2")
+
+    assert evaluator.to_fixed_code(code, "@@ 2,1\n+    return 2;") == fixed
+    # Cut off before end-of-sequence, malformed, or out of range: input unchanged
+    assert evaluator.to_fixed_code(code, "@@ 2,1\n+    return 2;", complete=False) == code
+    assert evaluator.to_fixed_code(code, "@@ 2,1\n+    return 2;\nreturn 3;") == code
+    assert evaluator.to_fixed_code(code, "@@ 7,1\n+    return 2;") == code
+
+    class FullRewrite:
+        def generate_fix(self, buggy_code):
+            return fixed
+
+    monkeypatch.setattr(evaluator, "_fallback_evaluator", FullRewrite())
+    assert evaluator.to_fixed_code(code, "@@ 2,1\n+    return 2;", complete=False) == fixed
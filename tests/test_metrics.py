@@ -0,0 +1,76 @@
+import pytest
+import metrics
+from metrics import bleu_from_statistics, bleu_statistics, score_predictions, tokenize_code
+
+
+def reference_levenshtein(source, target):
+    previous = list(range(len(target) + 1))
+    for i, a in enumerate(source, start=1):
+        current = [i]
+        for j, b in enumerate(target, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a != b)))
+        previous = current
+    return previous[-1]
+
+
+PAIRS = [
+    ("", ""),
+    ("", "a b c"),
+    ("a b c", ""),
+    ("kitten", "sitting"),
+    ("return x ;", "return x + 1 ;"),
+    ("if ( a ) { b ( ) ; }", "if ( ! a ) { b ( ) ; } else { c ( ) ; }"),
+    ("a a a a b", "b a a a a"),
+]
+
+
+@pytest.mark.parametrize("use_compiled", [False, True])
+def test_batch_edit_distances(monkeypatch, use_compiled):
+    if use_compiled and metrics._compiled_levenshtein is None:
+        pytest.skip("rapidfuzz not installed")
+    if not use_compiled:
+        monkeypatch.setattr(metrics, "_compiled_levenshtein", None)
+
+    # "kitten"/"sitting" as characters, everything else as tokens
+    sources = [list(s) if " " not in s and s else s.split() for s, _ in PAIRS]
+    targets = [list(t) if " " not in t and t else t.split() for _, t in PAIRS]
+
+    distances = metrics.batch_edit_distances(sources, targets)
+
+    assert distances.tolist() == [reference_levenshtein(s, t) for s, t in zip(sources, targets)]
+    assert distances[3] == 3  # kitten -> sitting
+    assert distances[5] == 8  # "!" and "else { c ( ) ; }"
+
+
+def test_bleu_identical_and_empty():
+    tokens = tokenize_code("int total = a + b; return total * 2;")
+    stats = bleu_statistics(tokens, tokens)
+    assert bleu_from_statistics(stats["matches"], stats["totals"], len(tokens), len(tokens)) == pytest.approx(1.0)
+    assert bleu_from_statistics(stats["matches"], stats["totals"], len(tokens), len(tokens), smooth=False) == pytest.approx(1.0)
+
+    stats = bleu_statistics([], tokens)
+    assert bleu_from_statistics(stats["matches"], stats["totals"], 0, len(tokens)) == 0.0
+
+
+def test_bleu_brevity_penalty():
+    reference = tokenize_code("a b c d e f g h")
+    prediction = reference[:4]
+    stats = bleu_statistics(prediction, reference)
+    # All n-grams match, so only the brevity penalty exp(1 - 8/4) remains
+    assert bleu_from_statistics(stats["matches"], stats["totals"], 4, 8, smooth=False) == pytest.approx(0.36787944)
+
+
+def test_score_predictions():
+    inputs = ["return a - b;", "x = 1;"]
+    targets = ["return a + b;", "x = 2;"]
+    predictions = ["return a + b;", "y = 3;"]
+
+    per_sample, aggregate = score_predictions(inputs, targets, predictions)
+
+    assert per_sample[0]["exact_match"] and per_sample[0]["edit_distance"] == 0
+    assert per_sample[0]["bleu"] == pytest.approx(1.0)
+    assert per_sample[0]["changed_lines_recall"] == 1.0
+    assert per_sample[1]["edit_distance"] == 2
+    assert per_sample[1]["edit_similarity"] == pytest.approx(1 - 2 / 4)
+    assert aggregate["exact_match"] == pytest.approx(50.0)
+    assert aggregate["mean_edit_distance"] == pytest.approx(1.0)
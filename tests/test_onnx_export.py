@@ -0,0 +1,30 @@
+import pytest
+
+pytest.importorskip("optimum.onnxruntime")
+
+from evaluate import ModelEvaluator
+from onnx_export import PARITY_ATOL, export_onnx, max_logit_difference
+
+SAMPLES = [
+    ("public int add(int a, int b) { return a - b; }", "public int add(int a, int b) { return a + b; }"),
+    ("if (list.size() > 0) { list.get(1); }", "if (list.size() > 0) { list.get(0); }"),
+]
+
+
+@pytest.fixture(scope="module")
+def evaluators(tiny_model_dir, tmp_path_factory):
+    onnx_dir = export_onnx(str(tiny_model_dir), tmp_path_factory.mktemp("onnx"))
+    pytorch_evaluator = ModelEvaluator(str(tiny_model_dir), quantize=False, backend="pytorch")
+    onnx_evaluator = ModelEvaluator(str(onnx_dir), quantize=False, backend="onnx")
+    return pytorch_evaluator, onnx_evaluator
+
+
+def test_logits_match(evaluators):
+    for buggy_code, fixed_code in SAMPLES:
+        assert max_logit_difference(*evaluators, buggy_code, fixed_code) <= PARITY_ATOL
+
+
+def test_generated_fixes_match(evaluators):
+    pytorch_evaluator, onnx_evaluator = evaluators
+    for buggy_code, _ in SAMPLES:
+        assert onnx_evaluator.generate_fix(buggy_code) == pytorch_evaluator.generate_fix(buggy_code)
@@ -0,0 +1,16 @@
+from prefork import RestartBackoff
+
+
+def test_fast_failures_back_off_then_give_up():
+    backoff = RestartBackoff(base_delay=1.0, max_delay=3.0, fast_failure=10.0, max_fast_failures=4)
+    assert [backoff.record_exit(0, uptime=0.5) for _ in range(3)] == [1.0, 2.0, 3.0]
+    assert backoff.record_exit(0, uptime=0.5) is None
+
+
+def test_slots_back_off_independently_and_reset_after_a_long_run():
+    backoff = RestartBackoff(base_delay=1.0, max_delay=60.0, fast_failure=10.0, max_fast_failures=5)
+    backoff.record_exit(0, uptime=0.5)
+    backoff.record_exit(0, uptime=0.5)
+    assert backoff.record_exit(1, uptime=0.5) == 1.0
+    assert backoff.record_exit(0, uptime=120.0) == 0.0
+    assert backoff.record_exit(0, uptime=0.5) == 1.0
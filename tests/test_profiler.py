@@ -0,0 +1,30 @@
+import threading
+import time
+from profiler import SamplingProfiler
+
+
+def profile_with_idle_thread(tmp_path, all_threads):
+    release = threading.Event()
+    idle = threading.Thread(target=release.wait, name="idle-worker", daemon=True)
+    idle.start()
+    profiler = SamplingProfiler("test", tmp_path, interval_ms=1, all_threads=all_threads)
+    with profiler:
+        deadline = time.perf_counter() + 0.1
+        while time.perf_counter() < deadline:
+            pass
+    release.set()
+    idle.join()
+    return profiler
+
+
+def test_samples_only_the_starting_thread_by_default(tmp_path):
+    profiler = profile_with_idle_thread(tmp_path, all_threads=False)
+    assert profiler.stacks
+    assert {stack[0] for stack in profiler.stacks} == {threading.current_thread().name}
+
+
+def test_all_threads_skips_idle_waits(tmp_path):
+    profiler = profile_with_idle_thread(tmp_path, all_threads=True)
+    assert profiler.idle_samples > 0
+    assert "idle-worker" not in {stack[0] for stack in profiler.stacks}
+    assert threading.current_thread().name in {stack[0] for stack in profiler.stacks}
@@ -0,0 +1,78 @@
+import json
+import os
+import numpy as np
+import pytest
+from retrieval import RetrievalIndex
+
+SNIPPETS = [
+    "public int add(int a, int b) { return a - b; }",
+    "for (int i = 0; i <= values.length; i++) { total += values[i]; }",
+    "if (name == null) { throw new IllegalArgumentException(\"name\"); }",
+    "String trimmed = input.trim(); return trimmed.isEmpty() ? null : trimmed;",
+]
+
+
+def items(snippets):
+    return [{"input": code, "target": code + " // fixed", "metadata": {"n": i}} for i, code in enumerate(snippets)]
+
+
+def test_search_ignores_comments(tmp_path):
+    index = RetrievalIndex(tmp_path / "index")
+    assert index.add(items(SNIPPETS)) == len(SNIPPETS)
+
+    query = "/* copied */ public int add(int a,\n    int b) { // bug\n  return a - b; }"
+    results = index.search(query, k=1)
+    assert results and results[0]["buggy_code"] == SNIPPETS[0]
+    assert results[0]["similarity"] == 1.0
+
+
+def test_incremental_add_matches_full_build(tmp_path):
+    incremental = RetrievalIndex(tmp_path / "incremental")
+    incremental.add(items(SNIPPETS[:2]))
+    assert incremental.add(items(SNIPPETS[:3])) == 1  # Already indexed pairs are skipped
+    incremental.add(items(SNIPPETS))
+
+    full = RetrievalIndex(tmp_path / "full")
+    full.add(items(SNIPPETS))
+
+    reopened = RetrievalIndex(tmp_path / "incremental")
+    assert len(reopened) == len(SNIPPETS)
+    assert np.array_equal(np.asarray(reopened.sorted_band_keys), np.asarray(full.sorted_band_keys))
+    for band in range(reopened.bands):
+        # Same keys in sorted order; record ids agree up to ties
+        assert np.array_equal(
+            np.asarray(reopened.band_hashes(reopened.signatures))[np.asarray(reopened.band_order[band]), band],
+            np.asarray(reopened.sorted_band_keys[band])
+        )
+    for code in SNIPPETS:
+        assert reopened.search(code, k=1)[0]["buggy_code"] == code
+
+
+def test_interrupted_add_is_rolled_back(tmp_path):
+    index_dir = tmp_path / "index"
+    index = RetrievalIndex(index_dir)
+    index.add(items(SNIPPETS[:2]))
+    with open(index_dir / "meta.json") as f:
+        committed = json.load(f)
+
+    # Simulate a crash after appending data files but before meta.json was replaced
+    index.add(items(SNIPPETS[2:]))
+    with open(index_dir / "meta.json", 'w') as f:
+        json.dump(committed, f)
+
+    reopened = RetrievalIndex(index_dir)
+    assert len(reopened) == 2
+    assert reopened.add(items(SNIPPETS[2:])) == 2
+    assert os.path.getsize(index_dir / "signatures.u32") == 4 * reopened.meta["num_permutations"] * 4
+    for code in SNIPPETS:
+        assert reopened.search(code, k=1)[0]["buggy_code"] == code
+
+
+def test_old_format_needs_rebuild(tmp_path):
+    index_dir = tmp_path / "index"
+    index_dir.mkdir()
+    with open(index_dir / "meta.json", 'w') as f:
+        json.dump({"num_permutations": 128, "bands": 32, "shingle_size": 5, "count": 0}, f)
+
+    with pytest.raises(ValueError, match="old format"):
+        RetrievalIndex(index_dir)
@@ -0,0 +1,58 @@
+import pytest
+import torch
+from transformers import LogitsProcessor, LogitsProcessorList, RobertaTokenizer
+from evaluate import load_model
+from speculative import PromptLookupDecoder
+
+CODE = "public int add(int a, int b) { return a - b; }"
+MAX_NEW_TOKENS = 40
+
+
+class CopyBiasLogitsProcessor(LogitsProcessor):
+    """
+    Pushes the random test model towards copying its input, so prompt-lookup
+    drafts get (partly) accepted; the model's own logits still decide the rest
+    """
+    def __init__(self, input_tokens, bias):
+        self.input_tokens = input_tokens
+        self.bias = bias
+
+    def __call__(self, input_ids, scores):
+        position = input_ids.shape[1] - 1
+        if position < len(self.input_tokens):
+            scores[:, self.input_tokens[position]] += self.bias
+        return scores
+
+
+@pytest.fixture(scope="module")
+def model_and_tokenizer(tiny_model_dir):
+    model = load_model(str(tiny_model_dir))
+    model.eval()
+    return model, RobertaTokenizer.from_pretrained(str(tiny_model_dir))
+
+
+@pytest.mark.parametrize("bias", [0.0, 80.0, 120.0])
+def test_speculative_matches_greedy(model_and_tokenizer, bias):
+    model, tokenizer = model_and_tokenizer
+    encoding = tokenizer(CODE, return_tensors='pt')
+    input_tokens = [
+        token for token in encoding['input_ids'][0].tolist() if token not in tokenizer.all_special_ids
+    ]
+    logits_processor = LogitsProcessorList([CopyBiasLogitsProcessor(input_tokens, bias)])
+
+    with torch.no_grad():
+        expected = model.generate(
+            **encoding, max_new_tokens=MAX_NEW_TOKENS, num_beams=1, do_sample=False,
+            logits_processor=logits_processor
+        )
+
+    decoder = PromptLookupDecoder(model)
+    output = decoder.generate(
+        encoding['input_ids'], encoding['attention_mask'], MAX_NEW_TOKENS,
+        logits_processor=logits_processor, special_token_ids=tokenizer.all_special_ids
+    )
+
+    assert output.tolist() == expected.tolist()
+    if bias:
+        assert decoder.stats["accepted_draft_tokens"] > 0
+        assert decoder.stats["decoder_passes"] < decoder.stats["generated_tokens"]
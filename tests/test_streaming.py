@@ -0,0 +1,54 @@
+import asyncio
+import threading
+import time
+import httpx
+import settings
+from app import create_app
+from generation import GenerationPolicy
+
+
+class SlowEvaluator:
+    """Streams one token once release is set"""
+    model_path = "unused"
+    backend = "pytorch"
+    quantize = False
+    generation_policy = GenerationPolicy(num_beams=1)
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def stream_fix(self, code, cancel_event=None, outcome=None):
+        self.release.wait(timeout=5)
+        yield code.upper()
+
+    def to_fixed_code(self, code, output, complete=True):
+        return output
+
+    def generate_fixes(self, codes):
+        return [code.upper() for code in codes]
+
+
+def test_stream_limit_is_enforced_for_concurrent_requests(monkeypatch):
+    monkeypatch.setattr(settings, "MAX_CONCURRENT_STREAMS", 2)
+    evaluator = SlowEvaluator()
+    app = create_app(evaluator=evaluator, cache=None)
+    state = app.state.service
+
+    async def scenario():
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                requests = [asyncio.ensure_future(client.post("/fix/stream", json={"code": "x = 1;"}))
+                            for _ in range(3)]
+                # Let all three get past admission before any stream produces output
+                deadline = time.monotonic() + 5
+                while sum(request.done() for request in requests) < 1 and time.monotonic() < deadline:
+                    await asyncio.sleep(0.01)
+                evaluator.release.set()
+                responses = await asyncio.gather(*requests)
+        return responses
+
+    responses = asyncio.run(scenario())
+    assert sorted(response.status_code for response in responses) == [200, 200, 503]
+    assert state["streams"]["active"] == 0
+    assert state["streams"]["completed"] == 2
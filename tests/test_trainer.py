@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+import pytest
+import torch
+import config
+from trainer import BugFixTrainer, load_trained_keys
+
+
+class FakeHFTrainer:
+    """Just enough of transformers.Trainer for save_final_model"""
+    def __init__(self, best_checkpoint, fail_on_save=False):
+        self.state = SimpleNamespace(best_model_checkpoint=str(best_checkpoint) if best_checkpoint else None)
+        self.optimizer = SimpleNamespace(state_dict=lambda: {"from": "last step"})
+        self.fail_on_save = fail_on_save
+
+    def save_model(self, path):
+        if self.fail_on_save:
+            raise OSError("disk full")
+        (config.STAGING_MODEL_DIR).mkdir(parents=True)
+        (config.STAGING_MODEL_DIR / "model.safetensors").write_text("new weights")
+
+
+def make_trainer(tmp_path, monkeypatch, incremental=True):
+    monkeypatch.setattr(config, "STAGING_MODEL_DIR", tmp_path / "final-new")
+    monkeypatch.setattr(config, "PREVIOUS_MODEL_DIR", tmp_path / "final-previous")
+    final = tmp_path / "final"
+    final.mkdir()
+    (final / "model.safetensors").write_text("old weights")
+    return SimpleNamespace(
+        final_model_path=final, incremental=incremental, use_lora=False,
+        tokenizer=SimpleNamespace(save_pretrained=lambda path: None),
+        save_optimizer_state=lambda trainer, path: BugFixTrainer.save_optimizer_state(None, trainer, path),
+    )
+
+
+def test_swap_keeps_previous_model_and_best_optimizer_state(tmp_path, monkeypatch):
+    best = tmp_path / "checkpoint-100"
+    best.mkdir()
+    torch.save({"from": "best checkpoint"}, best / "optimizer.pt")
+    owner = make_trainer(tmp_path, monkeypatch)
+
+    BugFixTrainer.save_final_model(owner, FakeHFTrainer(best), {"a", "b"})
+
+    assert (tmp_path / "final" / "model.safetensors").read_text() == "new weights"
+    assert (tmp_path / "final-previous" / "model.safetensors").read_text() == "old weights"
+    assert not (tmp_path / "final-new").exists()
+    assert torch.load(tmp_path / "final" / config.OPTIMIZER_STATE_FILE) == {"from": "best checkpoint"}
+    assert load_trained_keys(tmp_path / "final") == {"a", "b"}
+
+
+def test_failed_save_leaves_final_untouched(tmp_path, monkeypatch):
+    owner = make_trainer(tmp_path, monkeypatch)
+
+    with pytest.raises(OSError):
+        BugFixTrainer.save_final_model(owner, FakeHFTrainer(None, fail_on_save=True), set())
+
+    assert (tmp_path / "final" / "model.safetensors").read_text() == "old weights"
+    assert not (tmp_path / "final-previous").exists()
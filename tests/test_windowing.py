@@ -0,0 +1,92 @@
+import pytest
+import windowing
+from windowing import method_windows, plan_windows, stitch, window_text
+
+pytest.importorskip("javalang")
+
+SPRING_CONTROLLER = """\
+@RestController
+@RequestMapping("/api")
+public class Foo {
+    private final Service service;
+
+    @GetMapping(value = "/items", produces = "application/json")
+    public List<Item> items() {
+        return service.items();
+    }
+
+    Foo(Service service) {
+        this.service = service;
+    }
+}"""
+
+ENUM_WITH_BODIES = """\
+enum Op {
+    ADD(1) {
+        int apply(int a, int b) { return a + b; }
+    },
+    SUB(2) {
+        int apply(int a, int b) { return a - b; }
+    };
+
+    abstract int apply(int a, int b);
+}"""
+
+ANONYMOUS_CLASSES = """\
+class Runner {
+    void run() {
+        Runnable a = new Runnable() {
+            public void run() { work(); }
+        };
+        Object b = new java.lang.Object() {
+            public String toString() { return "b"; }
+        };
+    }
+
+    record Point(int x, int y) {
+        Point {
+            check(x);
+        }
+
+        int sum() { return x + y; }
+    }
+}"""
+
+
+def test_annotated_class_is_not_a_method():
+    assert method_windows(SPRING_CONTROLLER) == [(5, 8), (10, 12)]
+
+
+def test_enum_constant_bodies_do_not_overlap():
+    windows = method_windows(ENUM_WITH_BODIES)
+    assert windows == [(1, 3), (4, 6)]
+    assert plan_windows(ENUM_WITH_BODIES, [2, 5], context_lines=3) == [(1, 3), (4, 6)]
+
+
+def test_anonymous_classes_and_records_stay_whole():
+    # Anonymous class methods belong to run(); the record is a class, not a method
+    assert method_windows(ANONYMOUS_CLASSES) == [(1, 8), (15, 15)]
+
+
+def test_plan_windows_never_overlap():
+    lines = list(range(SPRING_CONTROLLER.count('\n') + 1))
+    windows = plan_windows(SPRING_CONTROLLER, lines, context_lines=2)
+    assert all(a[1] < b[0] for a, b in zip(windows, windows[1:]))
+
+
+def test_plan_windows_clamps_nested_methods(monkeypatch):
+    code = "\n".join(f"line {i}" for i in range(10))
+    # A method nested in another (as a detection bug could report) plus a loose line
+    monkeypatch.setattr(windowing, "method_windows", lambda code: [(3, 4), (1, 6)])
+    assert plan_windows(code, [2, 3, 8], context_lines=0) == [(1, 6), (8, 8)]
+
+
+def test_stitch_round_trip():
+    windows = plan_windows(SPRING_CONTROLLER, [7, 11], context_lines=1)
+    texts = [window_text(SPRING_CONTROLLER, window) for window in windows]
+    assert stitch(SPRING_CONTROLLER, windows, texts) == SPRING_CONTROLLER
+
+    fixes = [text.replace("service.items()", "service.items(true)") for text in texts]
+    fixed = stitch(SPRING_CONTROLLER, windows, fixes)
+    assert fixed == SPRING_CONTROLLER.replace("service.items()", "service.items(true)")
+    assert stitch(SPRING_CONTROLLER, windows, [None] * len(windows)) == SPRING_CONTROLLER